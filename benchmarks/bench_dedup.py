@@ -0,0 +1,111 @@
+"""Duplicate-grouping benchmark: blocked union-find build vs. all-pairs scoring.
+
+Usage:
+    python benchmarks/bench_dedup.py [--bookmarks 50000] [--threshold 0.9] [--reference]
+
+Titles are drawn from a Zipf-distributed synthetic vocabulary and all bookmarks
+share one folder (the worst case for soft matching); ``--folders N --cross-folder``
+spreads them over N folders and times the MinHash/LSH near-duplicate stage. ``--uniform`` draws
+words uniformly instead, so far fewer titles share a token and most of the work
+goes to character-level matching. The reference is quadratic; only pass
+``--reference`` for moderate sizes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import random
+import string
+import time
+from typing import Dict, List, Optional
+
+from cbclean.dedup import _title_sim, group_duplicates
+from cbclean.utils import Bookmark
+
+
+def group_all_pairs(bookmarks: List[Bookmark], *, title_threshold: float) -> List[List[str]]:
+    """Reference implementation: score every same-folder pair, then merge components."""
+    nodes = [b for b in bookmarks if b.normalized_url or b.url]
+    parent = list(range(len(nodes)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    for i, a in enumerate(nodes):
+        for j in range(i + 1, len(nodes)):
+            b = nodes[j]
+            if (a.normalized_url or a.url) == (b.normalized_url or b.url) or (
+                a.folder_path == b.folder_path
+                and a.url
+                and b.url
+                and _title_sim(a.title, b.title) >= title_threshold
+            ):
+                parent[find(j)] = find(i)
+    comps: Dict[int, List[str]] = {}
+    for i, b in enumerate(nodes):
+        comps.setdefault(find(i), []).append(b.id)
+    return sorted(sorted(c) for c in comps.values() if len(c) > 1)
+
+
+def make_folder(n: int, *, uniform: bool, folders: int = 1, seed: int = 0) -> List[Bookmark]:
+    rng = random.Random(seed)
+    vocab = [
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+        for _ in range(200_000 if not uniform else 20_000)
+    ]
+    cum = (
+        None
+        if uniform
+        else list(itertools.accumulate(1 / (r + 1) ** 1.1 for r in range(len(vocab))))
+    )
+    out = []
+    for i in range(n):
+        words = rng.choices(vocab, cum_weights=cum, k=rng.randint(2, 8))
+        out.append(
+            Bookmark(
+                id=str(i),
+                title=" ".join(words),
+                url=f"https://example{i % 997}.com/page/{i}",
+                folder_path=f"Bookmarks/Folder {i % folders}" if folders > 1 else "Bookmarks/Inbox",
+            )
+        )
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--bookmarks", type=int, default=50000)
+    ap.add_argument("--threshold", type=float, default=0.9)
+    ap.add_argument("--uniform", action="store_true")
+    ap.add_argument("--reference", action="store_true")
+    ap.add_argument("--folders", type=int, default=1, help="spread bookmarks over N folders")
+    ap.add_argument("--cross-folder", action="store_true", help="enable the MinHash/LSH stage")
+    args = ap.parse_args(argv)
+    if args.reference and args.cross_folder:
+        ap.error("--reference only models same-folder title matching")
+
+    bookmarks = make_folder(args.bookmarks, uniform=args.uniform, folders=args.folders)
+    t0 = time.perf_counter()
+    groups = group_duplicates(
+        bookmarks,
+        title_threshold=args.threshold,
+        prefer_shorter_url=True,
+        cross_folder=args.cross_folder,
+    )
+    dt = time.perf_counter() - t0
+    dups = sum(len(g.duplicates) for g in groups)
+    print(f"{'union-find':>10}: {len(groups)} groups, {dups} duplicates in {dt:.2f}s")
+    if args.reference:
+        t0 = time.perf_counter()
+        ref = group_all_pairs(bookmarks, title_threshold=args.threshold)
+        dt = time.perf_counter() - t0
+        print(f"{'all-pairs':>10}: {len(ref)} groups in {dt:.2f}s")
+        got = sorted(sorted(b.id for b in g.members) for g in groups)
+        print("identical groups:", got == ref)
+
+
+if __name__ == "__main__":
+    main()
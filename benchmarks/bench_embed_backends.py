@@ -0,0 +1,95 @@
+"""Embedding backends compared on the sample bookmarks: throughput vs. agreement with torch.
+
+Usage:
+    python benchmarks/bench_embed_backends.py --onnx models/minilm-onnx [--quantize]
+        [--file data/samples/bookmarks_9_3_25.html] [--model all-MiniLM-L6-v2]
+
+Export the model first, e.g.
+``optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 models/minilm-onnx``.
+``--quantize`` writes ``model_quantized.onnx`` (dynamic int8) next to ``model.onnx``
+if it is missing. Each backend reports texts/s plus, against the full-precision
+torch vectors, the mean cosine similarity and how often the chosen top-k labels
+(rules example labels) are identical.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from cbclean.chrome_reader import read_bookmarks_html
+from cbclean.classify_embed import (
+    TextEncoder,
+    _default_labels_from_rules,
+    make_text,
+    select_top_labels,
+)
+from cbclean.embed_backends import OnnxSentenceEncoder, backend_available, load_model
+
+
+def quantize(export_dir: Path) -> Path:
+    from onnxruntime.quantization import QuantType, quantize_dynamic  # type: ignore
+
+    src = export_dir / "model.onnx"
+    dst = export_dir / "model_quantized.onnx"
+    if not dst.exists():
+        quantize_dynamic(str(src), str(dst), weight_type=QuantType.QInt8)
+    return dst
+
+
+def run(model: Any, texts: List[str], batch_size: int) -> tuple[Any, float]:
+    encoder = TextEncoder("bench", batch_size=batch_size, workers=1, model=model)
+    encoder(texts[:batch_size])  # warm-up
+    t0 = time.perf_counter()
+    vecs = encoder(texts)
+    return vecs, time.perf_counter() - t0
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--file", type=Path, default=Path("data/samples/bookmarks_9_3_25.html"))
+    ap.add_argument("--model", default="all-MiniLM-L6-v2")
+    ap.add_argument("--onnx", type=Path, default=None, help="ONNX export directory")
+    ap.add_argument("--quantize", action="store_true")
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--top-k", type=int, default=2)
+    ap.add_argument("--threshold", type=float, default=0.35)
+    args = ap.parse_args(argv)
+
+    texts = [make_text(b) for b in read_bookmarks_html(args.file)]
+    labels = _default_labels_from_rules()
+    print(f"{len(texts)} bookmarks, {len(labels)} labels")
+
+    models: Dict[str, Any] = {}
+    if backend_available("torch"):
+        models["torch"] = load_model(args.model)
+    if args.onnx is not None and backend_available("onnx"):
+        models["onnx"] = OnnxSentenceEncoder(args.onnx / "model.onnx")
+        if args.quantize:
+            models["onnx-int8"] = OnnxSentenceEncoder(quantize(args.onnx))
+    if not models:
+        raise SystemExit("no backend available: install the embed and/or onnx extras")
+
+    ref_vecs = ref_picks = None
+    for name, model in models.items():
+        vecs, dt = run(model, texts, args.batch_size)
+        label_vecs = model.encode(labels, normalize_embeddings=True, convert_to_numpy=True)
+        picks = select_top_labels(
+            vecs, label_vecs, top_k=args.top_k, score_threshold=args.threshold
+        )
+        line = f"{name:>10}: {len(texts) / dt:8.1f} texts/s"
+        if ref_vecs is None:
+            ref_vecs, ref_picks = vecs, picks
+        else:
+            cos = float(np.mean(np.sum(vecs * ref_vecs, axis=1)))
+            same = np.mean([sorted(a) == sorted(b) for a, b in zip(picks, ref_picks or [])])
+            line += f", mean cosine vs {next(iter(models))} {cos:.4f}, same labels {same:.1%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
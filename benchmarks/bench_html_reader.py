@@ -0,0 +1,138 @@
+"""Throughput benchmark: streaming HTML reader vs. the former BeautifulSoup tree walk.
+
+Usage:
+    python benchmarks/bench_html_reader.py [--links 50000] [--fanout 40] [--file export.html]
+
+Without ``--file`` a synthetic Netscape export is generated in a temp directory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from bs4 import BeautifulSoup, Tag
+
+from cbclean.chrome_reader import read_bookmarks_html
+from cbclean.utils import Bookmark
+
+
+def read_bookmarks_html_soup(path: Path) -> List[Bookmark]:
+    """Reference implementation: full BeautifulSoup tree + sibling rescans."""
+    soup = BeautifulSoup(path.read_text(encoding="utf-8", errors="ignore"), "html.parser")
+    results: List[Bookmark] = []
+    folder_stack: List[str] = ["Bookmarks"]
+
+    def walk_dl(dl: Tag) -> None:
+        for el in dl.children:
+            if not isinstance(el, Tag):
+                continue
+            if el.name == "dt":
+                h3 = el.find("h3", recursive=False)
+                if isinstance(h3, Tag):
+                    folder_stack.append(h3.get_text(strip=True))
+                    next_dl = None
+                    for sib in el.next_siblings:
+                        if isinstance(sib, Tag) and sib.name == "dl":
+                            next_dl = sib
+                            break
+                    if next_dl is not None:
+                        walk_dl(next_dl)
+                    folder_stack.pop()
+                a = el.find("a", recursive=False)
+                href = a.get("href") if isinstance(a, Tag) else None
+                if isinstance(href, str) and href and isinstance(a, Tag):
+                    results.append(
+                        Bookmark(
+                            id=str(len(results) + 1),
+                            title=a.get_text(strip=True),
+                            url=href,
+                            folder_path="/".join(folder_stack),
+                        )
+                    )
+            elif el.name == "dl":
+                walk_dl(el)
+
+    top_dl = soup.find("dl")
+    if isinstance(top_dl, Tag):
+        walk_dl(top_dl)
+    if not results:
+        for a in soup.find_all("a"):
+            href = a.get("href") if isinstance(a, Tag) else None
+            if isinstance(href, str) and href:
+                results.append(
+                    Bookmark(
+                        id=str(len(results) + 1),
+                        title=a.get_text(strip=True),
+                        url=href,
+                        folder_path="Bookmarks",
+                    )
+                )
+    return results
+
+
+def make_export(path: Path, links: int, fanout: int) -> None:
+    lines = [
+        "<!DOCTYPE NETSCAPE-Bookmark-file-1>",
+        '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">',
+        "<TITLE>Bookmarks</TITLE>",
+        "<H1>Bookmarks</H1>",
+        "<DL><p>",
+    ]
+    folder = 0
+    for i in range(links):
+        if i % fanout == 0:
+            if i:
+                lines.append("</DL><p>")
+            folder += 1
+            lines.append(f'<DT><H3 ADD_DATE="1700000000">Folder {folder}</H3>')
+            lines.append("<DL><p>")
+        lines.append(
+            f'<DT><A HREF="https://example{i % 997}.com/path/{i}?utm_source=x" '
+            f'ADD_DATE="{1700000000 + i}">Example page number {i}</A>'
+        )
+    lines.append("</DL><p>")
+    lines.append("</DL><p>")
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def measure(fn: Callable[[Path], List[Bookmark]], path: Path) -> tuple[float, int, int]:
+    t0 = time.perf_counter()
+    n = len(fn(path))
+    dt = time.perf_counter() - t0
+    # Separate pass: tracemalloc skews timings considerably
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dt, n, peak
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--links", type=int, default=50000)
+    ap.add_argument("--fanout", type=int, default=40)
+    ap.add_argument("--file", type=Path, default=None)
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = Path(tmp) / "bookmarks.html"
+            make_export(path, args.links, args.fanout)
+        size_mb = path.stat().st_size / 1e6
+        print(f"input: {path} ({size_mb:.1f} MB)")
+        for name, fn in (("streaming", read_bookmarks_html), ("soup", read_bookmarks_html_soup)):
+            dt, n, peak = measure(fn, path)
+            print(
+                f"{name:>10}: {n} bookmarks in {dt:.2f}s "
+                f"({size_mb / dt:.1f} MB/s, {n / dt:,.0f} bm/s), peak {peak / 1e6:.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""LLM prompt size per bookmark: classic prompts vs. the compact encoding (llm_prompt).
+
+Usage:
+    python benchmarks/bench_llm_prompt.py [--file data/samples/bookmarks_9_3_25.html]
+        [--snippets 0.5] [--max-prompt-tokens 6000] [--batch-size 100]
+
+Batches are packed exactly as classify_by_llm does and every prompt is
+counted, system message included. For the compact encoding the system
+prefix is also reported once per run, which is what providers with prompt
+caching bill at full price. ``--snippets`` gives that share of bookmarks a
+synthetic ~2000-character page text (boilerplate plus topical sentences), as
+``network.fetch_content`` would. Tokens are counted with tiktoken when it is
+installed, else with classify_llm.estimate_tokens.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from cbclean.chrome_reader import read_bookmarks_html
+from cbclean.classify_llm import (
+    _SYSTEM_PROMPT,
+    _build_prompt,
+    _item_lines,
+    _resolve_labels,
+    estimate_tokens,
+    pack_batches,
+)
+from cbclean.llm_prompt import bare_url, build_compact_prompt, compact_item_lines, compact_system
+from cbclean.utils import Bookmark
+
+_BOILERPLATE = [
+    "We use cookies to improve your experience.",
+    "Accept all cookies or manage your privacy settings.",
+    "Skip to main content.",
+    "Sign in to your account.",
+    "Subscribe to our newsletter for the latest updates.",
+    "Copyright 2025 All rights reserved.",
+]
+
+
+def synthetic_snippet(b: Bookmark, rng: random.Random, size: int = 2000) -> str:
+    words = [w for w in (b.title or "page").split() if w.isalpha()] or ["page"]
+    parts: List[str] = []
+    while sum(map(len, parts)) < size:
+        if rng.random() < 0.4:
+            parts.append(rng.choice(_BOILERPLATE))
+        else:
+            picked = " ".join(rng.choice(words) for _ in range(rng.randint(4, 10)))
+            parts.append(f"This page covers {picked} in detail with examples.")
+    return " ".join(parts)[:size]
+
+
+def counter() -> Callable[[str], int]:
+    try:
+        import tiktoken  # type: ignore
+
+        enc = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(enc.encode(text))
+    except Exception:
+        return estimate_tokens
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--file", type=Path, default=Path("data/samples/bookmarks_9_3_25.html"))
+    ap.add_argument("--snippets", type=float, default=0.0, help="share of bookmarks with page text")
+    ap.add_argument("--max-prompt-tokens", type=int, default=6000)
+    ap.add_argument("--batch-size", type=int, default=100)
+    ap.add_argument("--snippet-chars", type=int, default=300)
+    args = ap.parse_args(argv)
+
+    items = read_bookmarks_html(args.file)
+    rng = random.Random(0)
+    for b in items:
+        if rng.random() < args.snippets:
+            b.content_snippet = synthetic_snippet(b, rng)
+    labels = _resolve_labels(None)
+    count = counter()
+    print(f"{len(items)} bookmarks, {len(labels)} labels, {args.snippets:.0%} with page text")
+
+    def pack(system: str, empty: str, lines) -> List:
+        return pack_batches(
+            items,
+            system + "\n" + empty,
+            max_items=args.batch_size,
+            max_tokens=args.max_prompt_tokens,
+            item_lines=lines,
+        )
+
+    classic = pack(_SYSTEM_PROMPT, _build_prompt([], labels), _item_lines)
+    total = sum(count(_SYSTEM_PROMPT) + count(_build_prompt(batch, labels)) for batch in classic)
+    print(
+        f"   classic: {len(classic):4d} requests, {total:8d} tokens, "
+        f"{total / len(items):6.1f} tokens/bookmark"
+    )
+
+    system = compact_system(labels)
+    compact = pack(
+        system,
+        "",
+        lambda i, b: compact_item_lines(
+            i, b, bare_url(b.url or ""), snippet_chars=args.snippet_chars
+        ),
+    )
+    bodies = sum(count(build_compact_prompt(b, snippet_chars=args.snippet_chars)) for b in compact)
+    total = bodies + len(compact) * count(system)
+    print(
+        f"   compact: {len(compact):4d} requests, {total:8d} tokens, "
+        f"{total / len(items):6.1f} tokens/bookmark; with the system prefix cached: "
+        f"{(bodies + count(system)) / len(items):6.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
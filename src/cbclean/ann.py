@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+# Approximate nearest-neighbour search over unit-length embeddings (cosine).
+#
+# An inverted-file (IVF) index: mini-batch k-means centroids split the vectors
+# into lists, and a query only scans the `nprobe` lists whose centroids are
+# closest to it. Small indexes skip the centroids and search exactly (flat).
+# Entries are keyed by string (the embedding cache's text hashes), inserts are
+# incremental, and the index persists as raw row files (vectors, list
+# assignments) that a save only appends the new rows to; the centroids and the
+# assignments are rewritten only after a retrain.
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .cluster import minibatch_kmeans
+from .utils import Bookmark
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover - optional at runtime
+    np = None  # type: ignore
+
+# Below this many vectors search is exact
+_MIN_TRAIN = 4096
+# Retrain once the index holds this many times the vectors it was trained on
+_RETRAIN_GROWTH = 4
+# Queries scored against candidates at once
+_QUERY_CHUNK = 256
+
+
+class AnnIndex:
+    """IVF index with a flat fallback; see the module comment."""
+
+    def __init__(self, dim: int, *, nprobe: int = 8) -> None:
+        if np is None:  # pragma: no cover - numpy ships with the embed extra
+            raise RuntimeError("AnnIndex requires numpy")
+        self.dim = dim
+        self.nprobe = nprobe
+        self.keys: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._chunks: List[Any] = []
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self.centroids: Optional[Any] = None
+        self.trained_on = 0
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._lists: Optional[Tuple[Any, Any]] = None
+        # Directory and row count of the last save/load; whether the lists
+        # changed wholesale (a retrain) since
+        self._saved_to: Optional[Path] = None
+        self._saved = 0
+        self._retrained = False
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._pos
+
+    @property
+    def vectors(self) -> Any:
+        if self._chunks:
+            self._vectors = np.concatenate([self._vectors, *self._chunks])
+            self._chunks = []
+        return self._vectors
+
+    def get(self, keys: Sequence[str]) -> Any:
+        """Stored vectors of `keys` (all must be present), in order."""
+        return self.vectors[[self._pos[k] for k in keys]]
+
+    def add(self, keys: Sequence[str], vectors: Any) -> int:
+        """Insert the entries whose key is new; returns how many were added."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rows: List[int] = []
+        for i, key in enumerate(keys):
+            if key not in self._pos:
+                self._pos[key] = len(self.keys)
+                self.keys.append(key)
+                rows.append(i)
+        if not rows:
+            return 0
+        new = vectors[rows]
+        self._chunks.append(new)
+        if self.centroids is None:
+            if len(self) >= _MIN_TRAIN:
+                self.train()
+        elif len(self) > _RETRAIN_GROWTH * self.trained_on:
+            self.train()
+        else:
+            self._assign = np.concatenate([self._assign, self._nearest_centroid(new)])
+            self._lists = None
+        return len(rows)
+
+    def train(self) -> None:
+        """(Re)build the centroids from all vectors and reassign every entry."""
+        x = self.vectors
+        nlist = max(1, int(4 * len(x) ** 0.5))
+        labels = minibatch_kmeans(x, nlist)
+        centroids = np.zeros((int(labels.max()) + 1, self.dim), dtype=np.float32)
+        np.add.at(centroids, labels, x)
+        centroids /= np.clip(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12, None)
+        self.centroids = centroids
+        self.trained_on = len(x)
+        self._assign = labels.astype(np.int32)
+        self._lists = None
+        self._retrained = True
+
+    def _nearest_centroid(self, x: Any) -> Any:
+        assert self.centroids is not None
+        return np.argmax(x @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _inverted_lists(self) -> Tuple[Any, Any]:
+        """(rows sorted by list, start offset of each list) — CSR layout."""
+        if self._lists is None:
+            assert self.centroids is not None
+            order = np.argsort(self._assign, kind="stable")
+            counts = np.bincount(self._assign, minlength=len(self.centroids))
+            self._lists = (order, np.concatenate([[0], np.cumsum(counts)]))
+        return self._lists
+
+    def search(self, queries: Any, k: int) -> Tuple[Any, Any]:
+        """(positions, cosine similarities) of each query's k best entries, best first.
+
+        Positions index `keys`; rows with fewer than k candidates are padded
+        with -1 / -inf.
+        """
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        idx = np.full((len(q), k), -1, dtype=np.int64)
+        sims = np.full((len(q), k), -np.inf, dtype=np.float32)
+        x = self.vectors
+        if not len(x) or k <= 0:
+            return idx, sims
+        if self.centroids is None:
+            for start in range(0, len(q), _QUERY_CHUNK):
+                s = q[start : start + _QUERY_CHUNK] @ x.T
+                top, top_s = _top_k(s, k)
+                idx[start : start + len(s), : top.shape[1]] = top
+                sims[start : start + len(s), : top.shape[1]] = top_s
+            return idx, sims
+        order, offsets = self._inverted_lists()
+        nprobe = min(self.nprobe, len(self.centroids))
+        for start in range(0, len(q), _QUERY_CHUNK):
+            block = q[start : start + _QUERY_CHUNK]
+            probes, _ = _top_k(block @ self.centroids.T, nprobe)
+            for r, (vec, lists) in enumerate(zip(block, probes)):
+                cand = np.concatenate([order[offsets[p] : offsets[p + 1]] for p in lists])
+                if not len(cand):
+                    continue
+                top, top_s = _top_k((x[cand] @ vec)[None, :], k)
+                idx[start + r, : top.shape[1]] = cand[top[0]]
+                sims[start + r, : top.shape[1]] = top_s[0]
+        return idx, sims
+
+    def save(self, directory: Path) -> None:
+        """Persist to `directory`, appending only what changed since the last save."""
+        directory.mkdir(parents=True, exist_ok=True)
+        saved = self._saved if directory == self._saved_to else 0
+        _append_rows(directory / "vectors.f32", self.vectors, saved)
+        if self.centroids is None:
+            (directory / "assign.i32").unlink(missing_ok=True)
+            (directory / "centroids.npy").unlink(missing_ok=True)
+        elif self._retrained or not saved:
+            _replace(directory / "assign.i32", self._assign.tobytes())
+            tmp = directory / "centroids.tmp.npy"
+            np.save(tmp, self.centroids)
+            os.replace(tmp, directory / "centroids.npy")
+        else:
+            _append_rows(directory / "assign.i32", self._assign, saved)
+        meta = {"dim": self.dim, "trained_on": self.trained_on, "keys": self.keys}
+        # Written last: a crash before this leaves the previous meta, which
+        # only describes rows that the new files also start with
+        _replace(directory / "meta.json", json.dumps(meta).encode("utf-8"))
+        self._saved_to, self._saved, self._retrained = directory, len(self), False
+
+    @classmethod
+    def load(cls, directory: Path, dim: int, *, nprobe: int = 8) -> "AnnIndex":
+        """The index saved in `directory`, or an empty one (missing, other dim)."""
+        index = cls(dim, nprobe=nprobe)
+        try:
+            meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+            if meta["dim"] != dim:
+                return index
+            n = len(meta["keys"])
+            vectors = np.fromfile(directory / "vectors.f32", dtype=np.float32, count=n * dim)
+            centroids = None
+            assign = np.zeros(0, dtype=np.int32)
+            if (directory / "centroids.npy").exists():
+                centroids = np.load(directory / "centroids.npy")
+                assign = np.fromfile(directory / "assign.i32", dtype=np.int32, count=n)
+        except (OSError, ValueError, KeyError):
+            return index
+        if len(vectors) != n * dim or (centroids is not None and len(assign) != n):
+            return index
+        index.keys = list(meta["keys"])
+        index._pos = {k: i for i, k in enumerate(index.keys)}
+        index._vectors = vectors.reshape(n, dim)
+        index.centroids = centroids
+        index.trained_on = int(meta.get("trained_on", 0))
+        index._assign = assign
+        index._saved_to, index._saved = directory, n
+        return index
+
+
+def open_index(directory: Path, keys: Sequence[str], vectors: Any) -> AnnIndex:
+    """The index persisted in `directory` with the given entries added (and saved)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    index = AnnIndex.load(directory, vectors.shape[1])
+    if index.add(keys, vectors):
+        index.save(directory)
+    return index
+
+
+def related_bookmarks(
+    bookmarks: List[Bookmark],
+    keys: Sequence[str],
+    index: AnnIndex,
+    *,
+    k: int = 3,
+    threshold: float = 0.6,
+) -> Dict[str, List[Tuple[Bookmark, float]]]:
+    """Bookmark id -> up to k other bookmarks with cosine >= threshold, best first.
+
+    `keys` are the bookmarks' entries in `index`; neighbours outside
+    `bookmarks` (left over from earlier runs) are skipped.
+    """
+    owners: Dict[str, List[int]] = {}
+    for i, key in enumerate(keys):
+        if key in index:
+            owners.setdefault(key, []).append(i)
+    if k <= 0 or not owners:
+        return {}
+    uniq = list(owners)
+    # Extra candidates make up for skipped and identical-text neighbours
+    positions, sims = index.search(index.get(uniq), 2 * k + 1)
+    out: Dict[str, List[Tuple[Bookmark, float]]] = {}
+    for key, row, srow in zip(uniq, positions.tolist(), sims.tolist()):
+        hits = [
+            (j, s)
+            for p, s in zip(row, srow)
+            if p >= 0 and s >= threshold
+            for j in owners.get(index.keys[p], ())
+        ]
+        for i in owners[key]:
+            found = [(bookmarks[j], s) for j, s in hits if j != i][:k]
+            if found:
+                out[bookmarks[i].id] = found
+    return out
+
+
+def _append_rows(path: Path, rows: Any, start: int) -> None:
+    """Write rows[start:] after the first `start` rows of the file at `path`.
+
+    Anything past those rows (left by a save that crashed before its meta)
+    is cut off first.
+    """
+    rows = np.ascontiguousarray(rows)
+    row_bytes = rows.nbytes // len(rows) if len(rows) else 0
+    with open(path, "r+b" if start and path.exists() else "wb") as fh:
+        fh.truncate(start * row_bytes)
+        fh.seek(start * row_bytes)
+        fh.write(rows[start:].tobytes())
+
+
+def _replace(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _top_k(sims: Any, k: int) -> Tuple[Any, Any]:
+    """Column indices and values of each row's k largest entries, largest first."""
+    k = min(k, sims.shape[1])
+    if k < sims.shape[1]:
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(k), sims.shape)
+    vals = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-vals, axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(vals, order, axis=1)
@@ -37,9 +37,7 @@ def export_bookmarks_html(
                 for b in items:
                     if not b.url:
                         continue
-                    f.write(
-                        f'<DT><A HREF="{html_escape(b.normalized_url or b.url)}">{html_escape(b.title)}</A>\n'
-                    )
+                    f.write(_anchor(b))
                 f.write("</DL><p>\n")
         f.write("</DL><p>\n")
 
@@ -48,6 +46,18 @@ def html_escape(s: str) -> str:
     return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
 
 
+def _anchor(b: Bookmark) -> str:
+    attrs = f'HREF="{html_escape(b.normalized_url or b.url or "")}"'
+    # Round-trip source metadata so re-imports keep dates and favicons
+    if b.date_added is not None:
+        attrs += f' ADD_DATE="{b.date_added}"'
+    if b.date_modified is not None:
+        attrs += f' LAST_MODIFIED="{b.date_modified}"'
+    if b.icon:
+        attrs += f' ICON="{html_escape(b.icon)}"'
+    return f"<DT><A {attrs}>{html_escape(b.title)}</A>\n"
+
+
 def _group_keys(b: Bookmark, group_by: str) -> Iterable[str]:
     if group_by == "tag":
         yield (b.tags[0] if b.tags else "Uncategorized")
@@ -60,6 +70,9 @@ def _group_keys(b: Bookmark, group_by: str) -> Iterable[str]:
             return
         yield "Uncategorized"
         return
+    if group_by == "cluster":
+        yield (b.cluster or "Unclustered")
+        return
     # default: folder
     yield (b.folder_path or "Bookmarks")
 
@@ -72,7 +85,5 @@ def _write_tree(f, tree: Dict[str, Any]) -> None:
         for b in node.get("__items__", []):
             if not b.url:
                 continue
-            f.write(
-                f'<DT><A HREF="{html_escape(b.normalized_url or b.url)}">{html_escape(b.title)}</A>\n'
-            )
+            f.write(_anchor(b))
         f.write("</DL><p>\n")
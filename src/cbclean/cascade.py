@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+# Tiered classification (categorize.mode: cascade).
+#
+# Each stage only sees what the cheaper stages before it left uncertain:
+#   1. rules tag with confidence 1.0;
+#   2. embeddings score the bookmarks below `move` (cosine similarity);
+#   3. the LLM gets the bookmarks still below `ask`.
+# Tags below `ask` are only guesses: a bookmark sent to the LLM drops them,
+# and gets them back if the LLM assigns nothing.
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .classify_rules import CompiledRules, classify_by_rules
+from .utils import Bookmark, tag_confidence
+
+
+def classify_cascade(
+    bookmarks: List[Bookmark],
+    rules: CompiledRules,
+    *,
+    embed: Optional[Callable[[List[Bookmark], float], Any]] = None,
+    llm: Optional[Callable[[List[Bookmark]], None]] = None,
+    move: float = 0.75,
+    ask: float = 0.55,
+) -> Tuple[Optional[Any], Dict[str, int]]:
+    """Run the cascade; returns (what `embed` returned, bookmarks handled per stage).
+
+    `embed(bookmarks, only_below)` is classify_by_embeddings with its
+    settings bound (it gets every bookmark, so the embeddings it returns line
+    up with `bookmarks`); `llm(items)` is classify_by_llm likewise.
+    """
+    classify_by_rules(bookmarks, rules)
+    counts = {"rules": sum(1 for b in bookmarks if b.tags), "embeddings": 0, "llm": 0}
+    vectors = None
+    pending = [b for b in bookmarks if tag_confidence(b) < move]
+    if embed is not None and pending:
+        counts["embeddings"] = len(pending)
+        vectors = embed(bookmarks, move)
+    uncertain = [b for b in bookmarks if tag_confidence(b) < ask]
+    if llm is not None and uncertain:
+        counts["llm"] = len(uncertain)
+        guesses = [(b.tags, b.tag_scores) for b in uncertain]
+        for b in uncertain:
+            b.tags, b.tag_scores = [], {}
+        try:
+            llm(uncertain)
+        finally:
+            for b, (tags, scores) in zip(uncertain, guesses):
+                if not b.tags:
+                    b.tags, b.tag_scores = tags, scores
+    return vectors, counts
@@ -1,100 +1,312 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Optional
-import json
-from bs4 import BeautifulSoup, Tag
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from .jsonstream import JsonReader
 from .utils import Bookmark
 
 
 def read_chrome_json(path: Path, profile: Optional[str] = None) -> List[Bookmark]:
-    data = json.loads(path.read_text(encoding="utf-8"))
-    roots = data.get("roots", {})
-    results: List[Bookmark] = []
+    return list(iter_chrome_json(path, profile=profile))
 
-    def walk(node: dict, folder_path: str = "Bookmarks Bar") -> None:
-        if not isinstance(node, dict):
-            return
-        ntype = node.get("type")
+
+def iter_chrome_json(
+    path: Path, profile: Optional[str] = None, *, chunk_size: int = 1 << 16
+) -> Iterator[Bookmark]:
+    """Stream bookmarks from a Chrome profile ``Bookmarks`` JSON file.
+
+    The file is tokenized incrementally and walked with an explicit stack, so
+    neither the whole document nor deep folder nesting is materialized;
+    sections other than ``roots`` (``sync_metadata``, ``checksum``...) are
+    skipped. Subtrees of up to ``_SMALL_NODE_CHARS`` are decoded in one go.
+
+    Chrome writes object keys sorted, i.e. a folder's ``children`` come before
+    its ``name``/``type``. A first pass therefore records type and name of the
+    large (token-walked) nodes, so the second pass knows every folder path
+    before reaching its children and never has to hold bookmarks back.
+    """
+    with path.open("rb") as fp:
+        heads: List[Tuple[Any, Any]] = []
+        open_fields: List[Dict[str, Any]] = []
+        for event, value in _iter_json_nodes(JsonReader(fp, chunk_size=chunk_size)):
+            if event == "open":
+                heads.append(("", ""))
+                open_fields.append({"_index": len(heads) - 1})
+            elif event == "field":
+                open_fields[-1][value[0]] = value[1]
+            elif event == "close":
+                f = open_fields.pop()
+                heads[f["_index"]] = (f.get("type"), f.get("name", ""))
+
+    with path.open("rb") as fp:
+        # (node path or None when children are ignored, collected fields, parent path)
+        stack: List[Tuple[Optional[str], Dict[str, Any], Optional[str]]] = []
+        opened = 0
+        for event, value in _iter_json_nodes(JsonReader(fp, chunk_size=chunk_size)):
+            parent_path = stack[-1][0] if stack else None
+            if event == "small":
+                if stack and parent_path is None:
+                    continue
+                yield from _walk_json_node(value, parent_path, profile)
+            elif event == "open":
+                ntype, name = heads[opened]
+                opened += 1
+                if not stack:
+                    parent_path = name  # roots are walked with their own name as base
+                node_path = None
+                if ntype == "folder" and parent_path is not None:
+                    node_path = _child_path(parent_path, name)
+                stack.append((node_path, {}, parent_path))
+            elif event == "field":
+                stack[-1][1][value[0]] = value[1]
+            elif event == "close":
+                _, fields, own_parent = stack.pop()
+                if own_parent is not None and fields.get("type") == "url":
+                    yield _json_bookmark(fields, own_parent, profile)
+
+
+# Subtrees whose JSON text fits in this many characters are decoded at C speed
+_SMALL_NODE_CHARS = 1 << 18
+_NODE_FIELDS = frozenset({"type", "name", "id", "url", "date_added", "date_modified", "guid"})
+
+
+def _iter_json_nodes(reader: JsonReader) -> Iterator[Tuple[str, Any]]:
+    """Yield bookmark-tree events for every node under ``roots``.
+
+    Events: ("small", dict) for a fully decoded subtree, and ("open", None),
+    ("field", (key, value)), ("close", None) around large nodes, whose
+    ``children`` produce nested events in between.
+    """
+    if reader.peek() != "{":
+        return
+    reader.consume("{")
+    while reader.peek() not in ("}", ""):
+        key = reader.read_string()
+        if key != "roots" or reader.peek() != "{":
+            reader.skip_value()
+            continue
+        reader.consume("{")
+        while reader.peek() not in ("}", ""):
+            reader.read_string()
+            if reader.peek() != "{":
+                reader.skip_value()
+                continue
+            yield from _iter_json_subtree(reader)
+        reader.consume("}")
+
+
+def _iter_json_subtree(reader: JsonReader) -> Iterator[Tuple[str, Any]]:
+    small = reader.read_small_object(_SMALL_NODE_CHARS)
+    if small is not None:
+        yield "small", small
+        return
+    reader.consume("{")
+    yield "open", None
+    in_children: List[bool] = [False]
+    while in_children:
+        if in_children[-1]:
+            c = reader.peek()
+            if c == "]":
+                reader.consume("]")
+                in_children[-1] = False
+            elif c == "{":
+                small = reader.read_small_object(_SMALL_NODE_CHARS)
+                if small is not None:
+                    yield "small", small
+                else:
+                    reader.consume("{")
+                    in_children.append(False)
+                    yield "open", None
+            else:
+                reader.skip_value()
+            continue
+        if reader.peek() == "}":
+            reader.consume("}")
+            in_children.pop()
+            yield "close", None
+            continue
+        key = reader.read_string()
+        if key == "children" and reader.peek() == "[":
+            reader.consume("[")
+            in_children[-1] = True
+        elif key in _NODE_FIELDS:
+            yield "field", (key, reader.read_value())
+        else:
+            reader.skip_value()
+
+
+def _walk_json_node(
+    node: Any, parent_path: Optional[str], profile: Optional[str]
+) -> Iterator[Bookmark]:
+    if parent_path is None:
+        # A whole root decoded in one go: its own name is the base path
+        parent_path = node.get("name", "") if isinstance(node, dict) else "Bookmarks"
+    stack: List[Tuple[Any, str]] = [(node, parent_path)]
+    while stack:
+        cur, folder_path = stack.pop()
+        if not isinstance(cur, dict):
+            continue
+        ntype = cur.get("type")
         if ntype == "url":
-            bid = node.get("id", "")
-            title = node.get("name", "")
-            url = node.get("url", None)
-            results.append(
-                Bookmark(id=bid, title=title, url=url, folder_path=folder_path, profile=profile)
-            )
+            yield _json_bookmark(cur, folder_path, profile)
         elif ntype == "folder":
-            name = node.get("name", "")
-            new_path = f"{folder_path}/{name}" if name else folder_path
-            for child in node.get("children", []) or []:
-                walk(child, new_path)
+            new_path = _child_path(folder_path, cur.get("name", ""))
+            children = cur.get("children", []) or []
+            stack.extend((child, new_path) for child in reversed(list(children)))
+
+
+def _child_path(parent_path: str, name: Any) -> str:
+    return f"{parent_path}/{name}" if name else parent_path
+
+
+def _json_bookmark(fields: Dict[str, Any], folder_path: str, profile: Optional[str]) -> Bookmark:
+    return Bookmark(
+        id=fields.get("id", ""),
+        title=fields.get("name", ""),
+        url=fields.get("url", None),
+        folder_path=folder_path,
+        profile=profile,
+        date_added=_webkit_ts(fields.get("date_added")),
+        date_modified=_webkit_ts(fields.get("date_modified")),
+        guid=fields.get("guid"),
+    )
+
 
-    for root in roots.values():
-        folder_name = root.get("name", "") if isinstance(root, dict) else "Bookmarks"
-        walk(root, folder_path=folder_name)
-    return results
+# Chrome stores times as microseconds since 1601-01-01 UTC
+_WEBKIT_EPOCH_OFFSET = 11_644_473_600
+
+
+def _webkit_ts(value: Any) -> Optional[int]:
+    try:
+        us = int(value)
+    except (TypeError, ValueError):
+        return None
+    if us <= 0:
+        return None
+    return us // 1_000_000 - _WEBKIT_EPOCH_OFFSET
 
 
 def read_bookmarks_html(path: Path) -> List[Bookmark]:
-    soup = BeautifulSoup(path.read_text(encoding="utf-8", errors="ignore"), "html.parser")
-    results: List[Bookmark] = []
-    folder_stack: List[str] = ["Bookmarks"]
-
-    def walk_dl(dl: Tag) -> None:
-        # Traverse children in order to respect folder nesting (H3 followed by DL)
-        for el in dl.children:
-            if not isinstance(el, Tag):
-                continue
-            name = el.name
-            if name == "dt":
-                h3 = el.find("h3", recursive=False)
-                if isinstance(h3, Tag):
-                    folder_stack.append(h3.get_text(strip=True))
-                    # Find the next sibling DL which contains this folder's entries
-                    next_dl = None
-                    for sib in el.next_siblings:
-                        if isinstance(sib, Tag) and sib.name == "dl":
-                            next_dl = sib
-                            break
-                    if next_dl is not None:
-                        walk_dl(next_dl)
-                    folder_stack.pop()
-                a = el.find("a", recursive=False)
-                href_val: Optional[str] = None
-                if isinstance(a, Tag):
-                    href = a.get("href")
-                    if isinstance(href, str):
-                        href_val = href
-                if href_val:
-                    title = a.get_text(strip=True) if isinstance(a, Tag) else ""
-                    url = href_val
-                    folder_path = "/".join(folder_stack)
-                    results.append(
-                        Bookmark(
-                            id=str(len(results) + 1), title=title, url=url, folder_path=folder_path
-                        )
-                    )
-            elif name == "dl":
-                walk_dl(el)
-
-    top_dl = soup.find("dl")
-    if isinstance(top_dl, Tag):
-        walk_dl(top_dl)
-    # Fallback: collect flat links if structured parse yielded nothing
-    if not results:
-        for a in soup.find_all("a"):
-            if not isinstance(a, Tag):
-                continue
-            href = a.get("href")
-            href_val = href if isinstance(href, str) else None
-            if href_val:
-                results.append(
-                    Bookmark(
-                        id=str(len(results) + 1),
-                        title=a.get_text(strip=True),
-                        url=href_val,
-                        folder_path="Bookmarks",
-                    )
-                )
-    return results
+    return list(iter_bookmarks_html(path))
+
+
+def iter_bookmarks_html(path: Path, *, chunk_size: int = 1 << 16) -> Iterator[Bookmark]:
+    """Stream bookmarks from a Netscape bookmark HTML export.
+
+    The file is read in chunks and fed to an event-driven parser that keeps a
+    folder stack, so memory stays bounded by the deepest folder rather than the
+    document size. Links outside any folder land in ``Bookmarks``, which also
+    covers flat files without DL structure.
+    """
+    parser = _NetscapeParser()
+    with path.open("r", encoding="utf-8", errors="ignore") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            yield from parser.drain()
+    parser.close()
+    yield from parser.drain()
+
+
+class _NetscapeParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.folder_stack: List[str] = ["Bookmarks"]
+        # One entry per open DL: True when that DL pushed a folder name.
+        self.dl_pushed: List[bool] = []
+        self.pending_folder: Optional[str] = None
+        self.text: Optional[List[str]] = None
+        # Raw data of the current text node; feed() may split it across calls.
+        self.node: List[str] = []
+        self.anchor: Optional[Dict[str, Optional[str]]] = None
+        self.count = 0
+        self.ready: List[Bookmark] = []
+
+    def drain(self) -> List[Bookmark]:
+        out, self.ready = self.ready, []
+        return out
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self._flush_text()
+        if self.anchor is not None and tag in ("a", "dt", "dl", "h3"):
+            # Unclosed <A>: the next structural tag ends it
+            self._emit_anchor()
+        if tag == "dl":
+            pushed = self.pending_folder is not None
+            if pushed:
+                self.folder_stack.append(self.pending_folder or "")
+                self.pending_folder = None
+            self.dl_pushed.append(pushed)
+        elif tag == "h3":
+            self.pending_folder = None
+            self.text = []
+        elif tag == "a":
+            self.pending_folder = None
+            self.anchor = dict(attrs)
+            self.text = []
+        elif tag == "dt":
+            self.pending_folder = None
+
+    def handle_endtag(self, tag: str) -> None:
+        self._flush_text()
+        if tag == "dl":
+            if self.dl_pushed and self.dl_pushed.pop():
+                self.folder_stack.pop()
+        elif tag == "h3" and self.text is not None and self.anchor is None:
+            self.pending_folder = "".join(self.text)
+            self.text = None
+        elif tag == "a" and self.anchor is not None:
+            self._emit_anchor()
+
+    def handle_data(self, data: str) -> None:
+        if self.text is not None:
+            self.node.append(data)
+
+    def _flush_text(self) -> None:
+        # Strip per text node, like BeautifulSoup's get_text(strip=True)
+        if self.node:
+            piece = "".join(self.node).strip()
+            self.node = []
+            if piece and self.text is not None:
+                self.text.append(piece)
+
+    def close(self) -> None:
+        super().close()
+        self._flush_text()
+        # Unterminated trailing anchor: keep it like a tolerant tree builder would
+        if self.anchor is not None:
+            self._emit_anchor()
+
+    def _emit_anchor(self) -> None:
+        attrs = self.anchor or {}
+        title = "".join(self.text or [])
+        self.anchor = None
+        self.text = None
+        href = attrs.get("href")
+        if not href:
+            return
+        self.count += 1
+        self.ready.append(
+            Bookmark(
+                id=str(self.count),
+                title=title,
+                url=href,
+                folder_path="/".join(self.folder_stack),
+                date_added=_int_attr(attrs.get("add_date")),
+                date_modified=_int_attr(attrs.get("last_modified")),
+                icon=attrs.get("icon") or None,
+            )
+        )
+
+
+def _int_attr(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
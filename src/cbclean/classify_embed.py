@@ -1,9 +1,14 @@
 from __future__ import annotations
 
-from typing import Iterable, List, Set
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, List, Optional, Set, Tuple
 from pathlib import Path
-from .utils import Bookmark
+from .utils import Bookmark, add_tags, tag_confidence
 from .classify_rules import load_rules
+from .embed_backends import backend_available, load_model
+from .embed_cache import EmbeddingCache
 
 
 def classify_by_embeddings(
@@ -13,14 +18,28 @@ def classify_by_embeddings(
     labels: Iterable[str] | None = None,
     top_k: int = 2,
     score_threshold: float = 0.35,
-) -> None:  # pragma: no cover
+    cache: Optional[EmbeddingCache] = None,
+    batch_size: int = 64,
+    workers: int = 1,
+    backend: str = "torch",
+    onnx_path: str = "",
+    only_below: Optional[float] = None,
+) -> Optional[Any]:  # pragma: no cover
     """Assign tags via semantic similarity to label candidates using sentence-transformers.
 
-    If sentence-transformers isn't available, this function leaves tags unchanged.
+    If the encoder backend (sentence-transformers, or onnxruntime for
+    backend="onnx", see embed_backends) isn't available, this function leaves
+    tags unchanged.
+    With a `cache`, only texts and labels it has not seen are encoded, and the
+    model is not loaded at all when everything is cached. Encoding is spread
+    over `workers` processes (see TextEncoder). Returns the bookmark
+    embeddings (unit-length rows, input order) for cluster.cluster_bookmarks.
+
+    Tags are scored with their cosine similarity (Bookmark.tag_scores). With
+    `only_below`, bookmarks whose tag_confidence is already at least that
+    keep their tags; all bookmarks are still embedded.
     """
-    try:
-        from sentence_transformers import SentenceTransformer, util  # type: ignore
-    except Exception:
+    if not backend_available(backend):
         return None
 
     # Label candidates: passed-in labels or unique tags derived from rules file if available
@@ -30,26 +49,216 @@ def classify_by_embeddings(
 
     # Build texts to encode
     texts = [make_text(b) for b in bookmarks]
-    model = SentenceTransformer(model_name)
-    emb_labels = model.encode(label_list, normalize_embeddings=True, convert_to_tensor=True)
-    emb_texts = model.encode(texts, normalize_embeddings=True, convert_to_tensor=True)
-
-    # Cosine similarity and selection
-    sims = util.cos_sim(emb_texts, emb_labels)  # shape: [N, L]
-    for i, b in enumerate(bookmarks):
-        # select top_k labels above threshold
-        row = sims[i]
-        # Convert to plain list of (score, idx)
-        pairs = [(float(row[j]), j) for j in range(len(label_list))]
-        pairs.sort(reverse=True)
-        chosen: List[str] = []
-        for score, j in pairs[: top_k * 3]:  # small buffer then filter by threshold
-            if score >= score_threshold:
-                chosen.append(label_list[j])
-            if len(chosen) >= top_k:
-                break
-        if chosen:
-            b.tags = sorted(set((b.tags or []) + chosen))
+    encode = TextEncoder(
+        model_name, batch_size=batch_size, workers=workers, backend=backend, onnx_path=onnx_path
+    )
+    cache_key = embedding_key(model_name, backend=backend, onnx_path=onnx_path)
+    if cache is not None:
+        emb_labels = cache.encode(cache_key, label_list, encode)
+        emb_texts = cache.encode(cache_key, texts, encode)
+    else:
+        emb_labels = encode(label_list)
+        emb_texts = encode(texts)
+
+    # Cosine similarity (embeddings are unit length) and selection
+    chosen = scored_top_labels(emb_texts, emb_labels, top_k=top_k, score_threshold=score_threshold)
+    for b, picks in zip(bookmarks, chosen):
+        if only_below is not None and tag_confidence(b) >= only_below:
+            continue
+        for j, score in picks:
+            add_tags(b, [label_list[j]], score)
+    return emb_texts
+
+
+def length_buckets(texts: List[str], batch_size: int) -> List[List[int]]:
+    """Text indices grouped into batches of similar length, longest batch first.
+
+    Word count (then characters) stands in for token count: batches pad to
+    their longest text, so grouping by length keeps padding small.
+    """
+    order = sorted(range(len(texts)), key=lambda i: (len(texts[i].split()), len(texts[i])))
+    size = max(1, batch_size)
+    batches = [order[i : i + size] for i in range(0, len(order), size)]
+    return batches[::-1]
+
+
+# Model loaded once per worker process by _init_worker
+_WORKER_MODEL: Any = None
+
+
+def _init_worker(
+    model_name: str, backend: str, onnx_path: str, threads: int
+) -> None:  # pragma: no cover - subprocess
+    global _WORKER_MODEL
+    # Workers split the cores instead of each using all of them
+    _WORKER_MODEL = load_model(model_name, backend=backend, onnx_path=onnx_path, threads=threads)
+
+
+def _encode_batch(texts: List[str]) -> Any:  # pragma: no cover - subprocess
+    return _encode_with(_WORKER_MODEL, texts)
+
+
+def _encode_with(model: Any, texts: List[str]) -> Any:
+    return model.encode(
+        texts, batch_size=len(texts), normalize_embeddings=True, convert_to_numpy=True
+    )
+
+
+def embed_bookmarks(
+    bookmarks: List[Bookmark],
+    *,
+    model_name: str = "all-MiniLM-L6-v2",
+    cache: Optional[EmbeddingCache] = None,
+    batch_size: int = 64,
+    workers: int = 1,
+    backend: str = "torch",
+    onnx_path: str = "",
+) -> Optional[Any]:
+    """Unit-length embeddings of make_text(b) per bookmark, or None without a backend."""
+    if not backend_available(backend):
+        return None
+    texts = [make_text(b) for b in bookmarks]
+    encode = TextEncoder(
+        model_name, batch_size=batch_size, workers=workers, backend=backend, onnx_path=onnx_path
+    )
+    if cache is not None:
+        return cache.encode(
+            embedding_key(model_name, backend=backend, onnx_path=onnx_path), texts, encode
+        )
+    return encode(texts)
+
+
+def embedding_key(model_name: str, *, backend: str = "torch", onnx_path: str = "") -> str:
+    """Name that vectors of this model/backend are cached (and indexed) under."""
+    # ONNX exports (quantized ones especially) give slightly different vectors
+    return model_name if backend == "torch" else f"{model_name}|{backend}:{onnx_path}"
+
+
+class TextEncoder:
+    """Callable turning texts into unit-length float32 vectors, in input order.
+
+    Texts are cut into length buckets of `batch_size` (see length_buckets).
+    With more than one worker (``workers <= 0`` means one per CPU) the
+    buckets are sharded over a process pool, each worker holding its own
+    copy of the model (see embed_backends.load_model); otherwise they are
+    encoded here with a model loaded on first use.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        batch_size: int = 64,
+        workers: int = 1,
+        backend: str = "torch",
+        onnx_path: str = "",
+        model: Any = None,
+    ) -> None:
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_path = onnx_path
+        self.batch_size = batch_size
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self._model = model
+
+    def __call__(self, texts: List[str]) -> Any:
+        import numpy as np  # type: ignore
+
+        batches = length_buckets(texts, self.batch_size)
+        n = min(self.workers, len(batches))
+        if n <= 1:
+            results: Iterable[Any] = map(
+                self._encode_local, ([texts[i] for i in b] for b in batches)
+            )
+            return self._assemble(np, batches, results, len(texts))
+        threads = max(1, (os.cpu_count() or 1) // n)
+        # Spawned, not forked: the parent may already run torch/OpenMP threads
+        # (e.g. from encoding the labels here), which a forked child can
+        # deadlock on
+        with ProcessPoolExecutor(
+            max_workers=n,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_name, self.backend, self.onnx_path, threads),
+        ) as pool:
+            # Longest batches are submitted first so stragglers are short ones
+            results = pool.map(_encode_batch, ([texts[i] for i in b] for b in batches))
+            return self._assemble(np, batches, results, len(texts))
+
+    def _encode_local(self, texts: List[str]) -> Any:
+        if self._model is None:
+            self._model = load_model(
+                self.model_name, backend=self.backend, onnx_path=self.onnx_path
+            )
+        return _encode_with(self._model, texts)
+
+    @staticmethod
+    def _assemble(np: Any, batches: List[List[int]], results: Iterable[Any], n: int) -> Any:
+        out = None
+        for idx, vecs in zip(batches, results):
+            vecs = np.asarray(vecs, dtype=np.float32)
+            if out is None:
+                out = np.empty((n, vecs.shape[1]), dtype=np.float32)
+            out[idx] = vecs
+        return out if out is not None else np.zeros((0, 0), dtype=np.float32)
+
+
+# Rows of the similarity matrix materialized at once (rows x labels float32)
+_SIM_CHUNK_ROWS = 4096
+
+
+def select_top_labels(
+    emb_texts: Any,
+    emb_labels: Any,
+    *,
+    top_k: int,
+    score_threshold: float,
+    chunk_rows: int = _SIM_CHUNK_ROWS,
+) -> List[List[int]]:
+    """Per text, the indices of its `top_k` most similar labels scoring >= threshold.
+
+    Best first. Similarities are computed `chunk_rows` texts at a time, so
+    memory stays bounded however many bookmarks there are.
+    """
+    rows = scored_top_labels(
+        emb_texts, emb_labels, top_k=top_k, score_threshold=score_threshold, chunk_rows=chunk_rows
+    )
+    return [[j for j, _ in row] for row in rows]
+
+
+def scored_top_labels(
+    emb_texts: Any,
+    emb_labels: Any,
+    *,
+    top_k: int,
+    score_threshold: float,
+    chunk_rows: int = _SIM_CHUNK_ROWS,
+) -> List[List[Tuple[int, float]]]:
+    """Like select_top_labels, with each label's cosine similarity."""
+    import numpy as np  # type: ignore
+
+    texts = np.asarray(emb_texts, dtype=np.float32)
+    labels_t = np.asarray(emb_labels, dtype=np.float32).T
+    k = min(top_k, labels_t.shape[1])
+    out: List[List[Tuple[int, float]]] = []
+    if k <= 0:
+        return [[] for _ in range(len(texts))]
+    for start in range(0, len(texts), chunk_rows):
+        sims = texts[start : start + chunk_rows] @ labels_t
+        if k < sims.shape[1]:
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(k), (len(sims), k))
+        scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        keep = scores >= score_threshold
+        out.extend(
+            list(zip(row[mask].tolist(), vals[mask].tolist()))
+            for row, vals, mask in zip(top, scores, keep)
+        )
+    return out
 
 
 def make_text(b: Bookmark) -> str:
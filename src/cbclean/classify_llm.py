@@ -1,12 +1,22 @@
 from __future__ import annotations
 
-from typing import Iterable, List, Optional, Sequence, Set, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 from pathlib import Path
+import hashlib
 import json
 import os
+import re
+import time
 
-from .utils import Bookmark
+from .utils import Bookmark, add_tags
 from .classify_rules import load_rules
+from .journal import Journal
+from .llm_dispatch import RateLimiter, RetryPolicy, dispatch, is_context_overflow
+from .llm_prompt import bare_url, build_compact_prompt, compact_item_lines, compact_system
+from .llm_reply import ReplyParser, TruncatedReplyError, parse_reply
+from .storage import Storage
+
+_SYSTEM_PROMPT = "Classify bookmarks into provided labels."
 
 
 def classify_by_llm(
@@ -23,11 +33,50 @@ def classify_by_llm(
     client: Optional[object] = None,
     allow_new_labels: bool = True,
     max_new_labels_per_batch: int = 10,
+    storage: Optional[Storage] = None,
+    cache_ttl_days: float = 30.0,
+    concurrency: int = 1,
+    requests_per_min: float = 0,
+    tokens_per_min: float = 0,
+    max_retries: int = 4,
+    max_prompt_tokens: int = 0,
+    compact_prompt: bool = False,
+    snippet_chars: int = 300,
+    journal: Optional[Path] = None,
+    resume: bool = False,
+    stream: bool = False,
 ) -> None:
     """Classify bookmarks into labels using an external LLM.
 
     Network calls are optional: if the provider SDK isn't installed or no key,
     function exits quietly. Client can be injected for testing.
+
+    With `storage`, assignments are cached per (normalized URL, title) for the
+    model and label set (see _label_set_key) and reused for `cache_ttl_days`
+    (0 disables the cache); only bookmarks without a cached answer are sent.
+
+    Up to `concurrency` batches are in flight at once, paced by
+    `requests_per_min` / `tokens_per_min` (0 = unlimited); rate limits and
+    server errors are retried up to `max_retries` times with backoff.
+
+    Batches hold up to `batch_size` bookmarks and, when `max_prompt_tokens`
+    is set, no more than that many estimated prompt tokens (see
+    pack_batches); a batch the provider rejects as too long is split in half
+    and resent.
+
+    `compact_prompt` switches to the encoding of llm_prompt: a fixed system
+    prefix with instructions and labels, host aliases, and page snippets cut
+    to `snippet_chars`.
+
+    With `journal`, every finished batch is checkpointed to that file (see
+    journal.py). With `resume`, the answers and learned labels journaled by
+    an interrupted run for the same model and label set are applied, and
+    only the bookmarks they do not cover are sent.
+
+    Replies are parsed incrementally (see llm_reply); with `stream` they are
+    requested as a token stream and parsed while it arrives. A reply cut
+    short keeps the assignments it completed and only the bookmarks after
+    the last of them are asked again.
     """
     # Resolve labels
     label_list = _resolve_labels(labels)
@@ -43,6 +92,19 @@ def classify_by_llm(
     if not items:
         return None
 
+    label_key = _label_set_key(label_list, allow_new_labels)
+    # Cached answers; changing the labels or the model starts a new cache
+    use_cache = storage is not None and cache_ttl_days > 0
+    if use_cache:
+        assert storage is not None
+        storage.prune_llm_labels(model, label_key, time.time() - cache_ttl_days * 86400)
+        hits = storage.get_llm_labels(model, label_key, [_cache_key(b) for b in items])
+        for b in items:
+            add_tags(b, hits.get(_cache_key(b)) or [])
+        items = [b for b in items if _cache_key(b) not in hits]
+        if not items:
+            return None
+
     # Build client lazily
     if client is None:
         if provider == "openai":
@@ -59,31 +121,207 @@ def classify_by_llm(
         else:
             return None
 
-    # Process in batches
-    # Maintain evolving allowed label set if dynamic labels are enabled
-    allowed_set: Set[str] = set(label_list)
+    # Answers checkpointed by an interrupted run; the journal is read once,
+    # when it is opened to be continued
+    log: Optional[Journal] = None
+    if journal is not None:
+        log = Journal(journal, {"model": model, "labels": label_key}, append=resume)
+        done: Dict[Tuple[str, str], List[str]] = {}
+        resumed: Set[str] = set()
+        for rec in log.records:
+            resumed.update(str(x) for x in rec.get("new_labels", []))
+            for url, title_hash, labs in rec.get("items", []):
+                done[(url, title_hash)] = labs
+        for b in items:
+            add_tags(b, done.get(_cache_key(b)) or [])
+        items = [b for b in items if _cache_key(b) not in done]
+        # Labels learned before the interruption stay allowed
+        label_list = sorted(set(label_list) | resumed)
+        if not items:
+            log.close()
+            return None
 
-    for chunk in _chunks(items, max(1, batch_size)):
-        prompt = _build_prompt(
-            chunk,
-            sorted(allowed_set),
-            allow_new_labels=allow_new_labels,
-            max_new=max_new_labels_per_batch,
+    # Batches run concurrently (see llm_dispatch) and are merged in order.
+    # New labels learned by batch j reach the prompt of batch k only when
+    # k >= j + concurrency, i.e. when j is known to be done before k starts,
+    # so prompts do not depend on timing; replies are checked against the
+    # labels learned up to and including their own batch.
+    if compact_prompt:
+        system = compact_system(
+            label_list, allow_new_labels=allow_new_labels, max_new=max_new_labels_per_batch
         )
-        content = _chat(client, model, temperature, prompt)
+
+        def render(chunk: Sequence[Bookmark], known: List[str]) -> str:
+            extra = [lab for lab in known if lab not in base_labels]
+            return build_compact_prompt(chunk, extra, snippet_chars=snippet_chars)
+
+        def item_lines(idx: int, b: Bookmark) -> List[str]:
+            return compact_item_lines(idx, b, bare_url(b.url or ""), snippet_chars=snippet_chars)
+
+    else:
+        system = _SYSTEM_PROMPT
+
+        def render(chunk: Sequence[Bookmark], known: List[str]) -> str:
+            return _build_prompt(
+                chunk, known, allow_new_labels=allow_new_labels, max_new=max_new_labels_per_batch
+            )
+
+        item_lines = _item_lines
+
+    base_labels = set(label_list)
+    chunks = pack_batches(
+        items,
+        system + "\n" + render([], label_list),
+        max_items=batch_size,
+        max_tokens=max_prompt_tokens,
+        item_lines=item_lines,
+    )
+    concurrency = max(1, concurrency)
+    learned: List[List[str]] = [[] for _ in chunks]
+    allowed_set: Set[str] = set(label_list)
+
+    def prepare(k: int) -> Tuple[Tuple[Sequence[Bookmark], List[str]], int]:
+        known = sorted(base_labels.union(*learned[: max(0, k - concurrency + 1)]))
+        prompt = render(chunks[k], known)
+        return (chunks[k], known), estimate_tokens(system) + estimate_tokens(prompt)
+
+    def send(batch: Tuple[Sequence[Bookmark], List[str]]) -> List[Tuple[int, ReplyParser]]:
+        """(offset in the batch, reply) per request; halves a batch the provider rejects."""
+        chunk, known = batch
+        prompt = render(chunk, known)
         try:
-            data = json.loads(content)
-        except Exception:
-            # Try to recover JSON enclosed in code fences
-            content_stripped = _extract_json(content)
-            data = json.loads(content_stripped)
-        assignments, new_labels = _parse_result(data)
-        if allow_new_labels and new_labels:
-            for nl in new_labels[:max_new_labels_per_batch]:
+            reply = _chat_reply(client, model, temperature, prompt, system=system, stream=stream)
+        except Exception as exc:
+            if len(chunk) < 2 or not is_context_overflow(exc):
+                raise
+            mid = len(chunk) // 2
+            return [
+                (start + offset, reply)
+                for start, part in ((0, chunk[:mid]), (mid, chunk[mid:]))
+                for offset, reply in send((part, known))
+            ]
+        # Truncated: keep what it answered and ask again for the items after that
+        answered = [a.get("index") for a in reply.assignments]
+        tail = max((i for i in answered if isinstance(i, int)), default=-1) + 1
+        if not reply.complete and tail == 0:
+            raise TruncatedReplyError(f"reply for {len(chunk)} bookmarks ended without an answer")
+        if reply.complete or not 0 < tail < len(chunk):
+            return [(0, reply)]
+        return [(0, reply)] + [
+            (tail + offset, rest) for offset, rest in send((chunk[tail:], known))
+        ]
+
+    def finish(k: int, replies: List[Tuple[int, ReplyParser]]) -> None:
+        bounds = [offset for offset, _ in replies[1:]] + [len(chunks[k])]
+        answered: List[Tuple[str, str, List[str]]] = []
+        for (start, content), stop in zip(replies, bounds):
+            chunk = chunks[k][start:stop]
+            applied = merge_reply(k, chunk, content)
+            answered += [(*_cache_key(chunk[i]), labs) for i, labs in applied.items()]
+        if log is not None:
+            log.append({"new_labels": learned[k], "items": answered})
+
+    def merge_reply(k: int, chunk: Sequence[Bookmark], reply: ReplyParser) -> Dict[int, List[str]]:
+        if allow_new_labels and reply.new_labels:
+            for nl in reply.new_labels[:max_new_labels_per_batch]:
                 sl = _sanitize_label(str(nl))
                 if sl:
+                    learned[k].append(sl)
                     allowed_set.add(sl)
-        _apply_labels(chunk, assignments, sorted(allowed_set))
+        applied = _apply_labels(chunk, reply.assignments, sorted(allowed_set))
+        if use_cache:
+            assert storage is not None
+            storage.put_llm_labels(
+                model,
+                label_key,
+                ((*_cache_key(chunk[i]), labs) for i, labs in applied.items()),
+                time.time(),
+            )
+        return applied
+
+    try:
+        dispatch(
+            len(chunks),
+            prepare,
+            send,
+            finish,
+            concurrency=concurrency,
+            ordered=allow_new_labels,
+            limiter=RateLimiter(requests_per_min, tokens_per_min),
+            retry=RetryPolicy(retries=max_retries),
+        )
+    finally:
+        if log is not None:
+            log.close()
+
+
+# Word pieces, single non-space symbols; BPE vocabularies cover roughly four
+# ASCII letters, two to three letters of other alphabets or one CJK
+# character per token
+_TOKEN_PIECES = re.compile(r"[A-Za-z0-9]+|[^\W\d_A-Za-z]+|\S")
+# Reply tokens per bookmark: one {"index": n, "labels": [...]} entry
+_REPLY_TOKENS_PER_ITEM = 16
+# Share of the budget kept free for labels learned while the run goes on
+_LABEL_HEADROOM = 0.1
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token count, erring high (no tokenizer dependency)."""
+    total = 0
+    for m in _TOKEN_PIECES.finditer(text):
+        piece = m.group()
+        if piece.isascii():
+            total += (len(piece) + 3) // 4
+        else:
+            # CJK and other wide scripts: about a token per character
+            wide = sum(1 for c in piece if c >= "\u2e80")
+            total += wide + (len(piece) - wide + 1) // 2
+    return total
+
+
+def pack_batches(
+    items: Sequence[Bookmark],
+    base_prompt: str,
+    *,
+    max_items: int,
+    max_tokens: int,
+    item_lines: Optional[Callable[[int, Bookmark], List[str]]] = None,
+) -> List[Sequence[Bookmark]]:
+    """Consecutive batches of at most `max_items` items and `max_tokens` prompt tokens.
+
+    An item costs its prompt lines (as rendered by `item_lines`, by default
+    those of _build_prompt) plus its share of the reply; `base_prompt`
+    (the prompt without items) is paid once per batch. An item too large for
+    any batch goes alone. `max_tokens` <= 0 packs by count only.
+    """
+    max_items = max(1, max_items)
+    item_lines = item_lines or _item_lines
+    if max_tokens <= 0:
+        return list(_chunks(items, max_items))
+    budget = int(max_tokens * (1 - _LABEL_HEADROOM)) - estimate_tokens(base_prompt)
+    batches: List[Sequence[Bookmark]] = []
+    start, used = 0, 0
+    for i, b in enumerate(items):
+        cost = estimate_tokens("\n".join(item_lines(i - start, b))) + _REPLY_TOKENS_PER_ITEM
+        if i > start and (i - start >= max_items or used + cost > budget):
+            batches.append(items[start:i])
+            start, used = i, 0
+            cost = estimate_tokens("\n".join(item_lines(0, b))) + _REPLY_TOKENS_PER_ITEM
+        used += cost
+    if start < len(items):
+        batches.append(items[start:])
+    return batches
+
+
+def _cache_key(b: Bookmark) -> Tuple[str, str]:
+    title_hash = hashlib.sha1((b.title or "").encode("utf-8")).hexdigest()
+    return (b.normalized_url or b.url or "", title_hash)
+
+
+def _label_set_key(labels: Sequence[str], allow_new_labels: bool) -> str:
+    """Fingerprint of what the model may answer; any change invalidates the cache."""
+    blob = json.dumps([sorted(labels), allow_new_labels])
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
 
 
 def _resolve_labels(labels: Optional[Sequence[str]]) -> List[str]:
@@ -141,44 +379,108 @@ def _build_prompt(
         "Input:",
     ]
     for idx, b in enumerate(items):
-        title = b.title or ""
-        url = b.url or ""
-        lines.append(f"- [{idx}] {title} | {url}")
-        if getattr(b, "content_snippet", None):
-            # Include trimmed context to improve classification
-            lines.append(f"  Context: {b.content_snippet}")
+        lines.extend(_item_lines(idx, b))
     lines.append("Output as JSON object as specified above:")
     return "\n".join(lines)
 
 
-def _chat(client: object, model: str, temperature: float, prompt: str) -> str:
+def _item_lines(idx: int, b: Bookmark) -> List[str]:
+    title = b.title or ""
+    url = b.url or ""
+    lines = [f"- [{idx}] {title} | {url}"]
+    if getattr(b, "content_snippet", None):
+        # Include trimmed context to improve classification
+        lines.append(f"  Context: {b.content_snippet}")
+    return lines
+
+
+def _chat(client: object, model: str, temperature: float, prompt: str, *, system: str = "") -> str:
+    system = system or _SYSTEM_PROMPT
     # OpenAI SDK client
     if hasattr(client, "chat") and hasattr(client.chat, "completions"):
         resp = client.chat.completions.create(
             model=model,
             messages=[
-                {"role": "system", "content": "Classify bookmarks into provided labels."},
+                {"role": "system", "content": system},
                 {"role": "user", "content": prompt},
             ],
             temperature=temperature,
         )
         return resp.choices[0].message.content or "[]"
-    # Fallback: assume client(model, prompt) -> content
+    # Fallback: assume client(model, prompt) -> content; a custom system
+    # message is sent in front of the prompt
+    if system != _SYSTEM_PROMPT:
+        prompt = f"{system}\n\n{prompt}"
     return str(client(model, prompt))
 
 
-def _extract_json(text: str) -> str:
-    import re
+def _chat_reply(
+    client: object,
+    model: str,
+    temperature: float,
+    prompt: str,
+    *,
+    system: str = "",
+    stream: bool = False,
+) -> ReplyParser:
+    if not stream:
+        return parse_reply(_chat(client, model, temperature, prompt, system=system))
+    parser = ReplyParser()
+    try:
+        for text in _chat_stream(client, model, temperature, prompt, system=system):
+            parser.feed(text)
+            if parser.complete:
+                break
+    except Exception:
+        # A stream that broke off keeps what it completed; with nothing, retry
+        if not parser.assignments:
+            raise
+    return parser
+
+
+def _chat_stream(
+    client: Any, model: str, temperature: float, prompt: str, *, system: str = ""
+) -> Iterable[str]:
+    """Text deltas of a streamed completion."""
+    system = system or _SYSTEM_PROMPT
+    if hasattr(client, "chat") and hasattr(client.chat, "completions"):
+        events = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=temperature,
+            stream=True,
+        )
+        for event in events:
+            if event.choices:
+                text = getattr(event.choices[0].delta, "content", None)
+                if text:
+                    yield text
+        return
+    # Fallback client: a string, or an iterable of text pieces
+    if system != _SYSTEM_PROMPT:
+        prompt = f"{system}\n\n{prompt}"
+    result = client(model, prompt)
+    if isinstance(result, str):
+        yield result
+    else:
+        for text in result:
+            yield str(text)
 
-    m = re.search(r"```(?:json)?\s*(\{.*?\}|\[.*?\])\s*```", text, flags=re.S)
-    if m:
-        return m.group(1)
-    return text
 
+def _apply_labels(
+    items: Sequence[Bookmark], result: object, allowed: Sequence[str]
+) -> Dict[int, List[str]]:
+    """Add the allowed labels of each assignment; returns index -> labels accepted.
 
-def _apply_labels(items: Sequence[Bookmark], result: object, allowed: Sequence[str]) -> None:
+    Every item the result answered is included, with [] when none of its
+    labels were allowed.
+    """
+    applied: Dict[int, List[str]] = {}
     if not isinstance(result, list):
-        return
+        return applied
     allowed_set = set(allowed)
     for obj in result:
         if not isinstance(obj, dict):
@@ -192,23 +494,11 @@ def _apply_labels(items: Sequence[Bookmark], result: object, allowed: Sequence[s
             sx = _sanitize_label(str(x))
             if sx and sx in allowed_set:
                 labels.append(sx)
-        if 0 <= idx < len(items) and labels:
-            b = items[idx]
-            b.tags = sorted(set((b.tags or []) + labels))
-
-
-def _parse_result(data: object) -> Tuple[object, List[str]]:
-    if isinstance(data, dict):
-        assignments = data.get("assignments", [])
-        new_labels = data.get("new_labels", [])
-        if not isinstance(assignments, list):
-            assignments = []
-        if not isinstance(new_labels, list):
-            new_labels = []
-        return assignments, [str(x) for x in new_labels]
-    if isinstance(data, list):
-        return data, []
-    return [], []
+        if not 0 <= idx < len(items):
+            continue
+        applied[idx] = sorted(set(applied.get(idx, []) + labels))
+        add_tags(items[idx], labels)
+    return applied
 
 
 def _sanitize_label(s: str) -> str:
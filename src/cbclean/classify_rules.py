@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import re
+from collections import deque
 from pathlib import Path
-from typing import Dict, List
-from .utils import Bookmark, domain_of
+from re import _parser as sre_parse  # type: ignore[attr-defined]
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+from .domains import DomainIndex
+from .utils import Bookmark
 
 try:
     from ruamel.yaml import YAML  # type: ignore
@@ -21,25 +25,176 @@ def load_rules(path: Path) -> Dict[str, Dict[str, List[str]]]:
     return {"domains": domains, "keywords": keywords, "lang": lang}
 
 
-def classify_by_rules(bookmarks: List[Bookmark], rules: Dict[str, Dict[str, List[str]]]) -> None:
-    domains = rules.get("domains", {})
-    keywords = rules.get("keywords", {})
-    for b in bookmarks:
-        tags: List[str] = []
-        if b.url:
-            d = domain_of(b.url)
-            if d and d in domains:
-                tags.extend(domains[d])
-            title_l = b.title.lower()
-            url_l = b.url.lower()
-            for pat, tgs in keywords.items():
-                try:
-                    import re
+# Characters that make a keyword a regex rather than a plain substring
+_REGEX_META = frozenset(".^$*+?{}[]\\|()")
+
+
+class _AhoCorasick:
+    """Literal keyword automaton: every occurrence of every keyword in one pass."""
+
+    def __init__(self, words: List[str]) -> None:
+        self.goto: List[Dict[str, int]] = [{}]
+        self.out: List[Set[int]] = [set()]
+        for k, word in enumerate(words):
+            state = 0
+            for ch in word:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.out.append(set())
+                state = nxt
+            self.out[state].add(k)
+        # Breadth-first failure links (depth-1 states fail to the root);
+        # outputs are inherited along them
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] |= self.out[self.fail[nxt]]
+
+    def search(self, text: str, found: Set[int]) -> None:
+        goto, fail, out = self.goto, self.fail, self.out
+        found |= out[0]
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+
+
+def _literal_forms(pattern: re.Pattern) -> Tuple[Optional[List[str]], str]:
+    """Split a regex into (exact literal alternatives, required literal).
+
+    "recipe|рецепт" is exactly the literals ["recipe", "рецепт"]; otherwise the
+    longest run of top-level literal characters is a substring every match must
+    contain ("" when there is none), so the regex only needs to run on texts
+    where that substring occurs.
+    """
+    if pattern.flags & ~re.UNICODE:
+        return None, ""
+    try:
+        parsed = sre_parse.parse(pattern.pattern)
+    except Exception:  # pragma: no cover - compiled already, parse cannot fail
+        return None, ""
+
+    def literal(seq) -> Optional[str]:
+        if all(op is sre_parse.LITERAL for op, _ in seq):
+            return "".join(chr(av) for _, av in seq)
+        return None
 
-                    if re.search(pat, title_l) or re.search(pat, url_l):
-                        tags.extend(tgs)
+    items = list(parsed)
+    if len(items) == 1 and items[0][0] is sre_parse.BRANCH:
+        alts = [literal(alt) for alt in items[0][1][1]]
+        if all(alt is not None for alt in alts):
+            return [alt for alt in alts if alt is not None], ""
+    whole = literal(items)
+    if whole is not None:
+        return [whole], ""
+    best, run = "", ""
+    for op, av in items:
+        run = run + chr(av) if op is sre_parse.LITERAL else ""
+        if len(run) > len(best):
+            best = run
+    return None, best
+
+
+class CompiledRules:
+    """Rules file compiled once for classify_by_rules.
+
+    Domains match by longest suffix (a `github.com` rule also tags
+    `gist.github.com`, ports are ignored), both for the rules file's
+    `domains:` and for any extra `domain_lists` (e.g. mapped category feeds,
+    see domains.open_domain_index). Keywords are matched against the lowercased
+    title and URL. Plain words, alternations of plain words ("recipe|рецепт")
+    and invalid regexes (which the rules treat as substrings) all go into one
+    Aho–Corasick automaton, so one pass over a text finds every literal
+    keyword. The remaining regexes are precompiled and only run on texts that
+    contain their required literal, which the same pass reports.
+    """
+
+    def __init__(
+        self,
+        rules: Dict[str, Dict[str, List[str]]],
+        domain_lists: Sequence[DomainIndex] = (),
+    ) -> None:
+        self.domains = DomainIndex(rules.get("domains", {}) or {})
+        self.domain_lists = list(domain_lists)
+        keywords = rules.get("keywords", {}) or {}
+        self.tag_sets: List[List[str]] = []
+        # Automaton word -> keyword index (-1 - r for the gate of regex r)
+        words: List[str] = []
+        self._word_owner: List[int] = []
+        self._regexes: List[Tuple[int, re.Pattern]] = []
+        self._ungated: List[int] = []
+        for pat, tags in keywords.items():
+            k = len(self.tag_sets)
+            self.tag_sets.append(list(tags))
+            literals: Optional[List[str]] = [pat]
+            gate = ""
+            if any(ch in _REGEX_META for ch in pat):
+                try:
+                    compiled = re.compile(pat)
                 except re.error:
-                    if pat in title_l or pat in url_l:
-                        tags.extend(tgs)
-        # de-duplicate tags
-        b.tags = sorted(set(tags))
+                    compiled = None
+                if compiled is not None:
+                    literals, gate = _literal_forms(compiled)
+                    if literals is None:
+                        r = len(self._regexes)
+                        self._regexes.append((k, compiled))
+                        if gate:
+                            words.append(gate)
+                            self._word_owner.append(-1 - r)
+                        else:
+                            self._ungated.append(r)
+            for word in literals or ():
+                words.append(word)
+                self._word_owner.append(k)
+        self._automaton = _AhoCorasick(words)
+
+    def keyword_matches(self, *texts: str) -> Set[int]:
+        """Indices into tag_sets of the keywords found in any of `texts`."""
+        found: Set[int] = set()
+        for text in texts:
+            hits: Set[int] = set()
+            self._automaton.search(text, hits)
+            gated: List[int] = list(self._ungated)
+            for w in hits:
+                owner = self._word_owner[w]
+                if owner >= 0:
+                    found.add(owner)
+                else:
+                    gated.append(-1 - owner)
+            for r in gated:
+                k, compiled = self._regexes[r]
+                if k not in found and compiled.search(text):
+                    found.add(k)
+        return found
+
+    def tags_for(self, b: Bookmark) -> List[str]:
+        if not b.url:
+            return []
+        tags: List[str] = []
+        for index in (self.domains, *self.domain_lists):
+            tags.extend(index.match_url(b.url) or ())
+        for k in sorted(self.keyword_matches(b.title.lower(), b.url.lower())):
+            tags.extend(self.tag_sets[k])
+        return sorted(set(tags))
+
+
+def classify_by_rules(
+    bookmarks: List[Bookmark], rules: Union[CompiledRules, Dict[str, Dict[str, List[str]]]]
+) -> None:
+    engine = rules if isinstance(rules, CompiledRules) else CompiledRules(rules)
+    for b in bookmarks:
+        b.tags = engine.tags_for(b)
+        b.tag_scores = {t: 1.0 for t in b.tags}
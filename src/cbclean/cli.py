@@ -1,24 +1,33 @@
 from __future__ import annotations
 
+from contextlib import ExitStack
 from pathlib import Path
+from typing import Annotated, Any, List, Optional
 import typer
 from rich import print
 
 from .config import AppConfig
 from .chrome_reader import read_bookmarks_html, read_chrome_json
 from .backup import backup_file
+from .ingest import discover_profiles, iter_profiles
 from .normalize import normalize_bookmarks
-from .dedup import deduplicate
-from .classify_rules import load_rules, classify_by_rules
-from .classify_embed import classify_by_embeddings
+from .dedup import group_duplicates, split_groups
+from .classify_rules import CompiledRules, load_rules, classify_by_rules
+from .domains import open_domain_index
+from .ann import AnnIndex, open_index, related_bookmarks
+from .classify_embed import classify_by_embeddings, embed_bookmarks, embedding_key, make_text
+from .cluster import cluster_bookmarks
+from .embed_cache import EmbeddingCache, index_directory, text_hash
 from .classify_llm import classify_by_llm
+from .cascade import classify_cascade
+from .propagate import classify_by_groups
 from .fetch import check_liveness, enrich_with_content
 from .propose import propose_changes
 from .apply import export_bookmarks_html
 from .report import render_reports
+from .storage import Storage
 from .utils import ensure_dir
 
-
 app = typer.Typer(add_completion=False, help="Chrome bookmarks cleaner and organizer")
 
 
@@ -27,6 +36,12 @@ def process(
     config: str = typer.Option(
         "configs/config.example.yaml", "--config", "-c", help="Path to YAML config"
     ),
+    resume: Annotated[
+        bool,
+        typer.Option(
+            "--resume", help="Skip bookmarks already classified by an interrupted LLM run"
+        ),
+    ] = False,
 ) -> None:
     """Run full pipeline: read -> normalize -> dedup -> classify -> plan -> apply -> report"""
     cfg = _load_config(Path(config))
@@ -44,56 +59,113 @@ def process(
     )
 
     # Deduplicate
-    deduped, duplicates = deduplicate(
-        bookmarks,
-        title_threshold=cfg.dedup.title_similarity_threshold,
-        prefer_shorter_url=cfg.dedup.prefer_shorter_url,
-    )
+    cache_dir = _cache_dir(cfg)
+    ensure_dir(cache_dir)
+    ann: Optional[AnnIndex] = None
+    # Content dedup fetches one page per group left after URL/title matching
+    content_dedup = cfg.network.fetch_content and cfg.dedup.content_similarity_threshold is not None
+    with Storage(cache_dir / "cbclean.sqlite") as storage:
+        if cfg.dedup.semantic_threshold is not None:
+            vectors = embed_bookmarks(
+                bookmarks,
+                model_name=cfg.categorize.embeddings.model,
+                cache=_embedding_cache(storage, cache_dir),
+                batch_size=cfg.categorize.embeddings.batch_size,
+                workers=cfg.categorize.embeddings.workers,
+                backend=cfg.categorize.embeddings.backend,
+                onnx_path=cfg.categorize.embeddings.onnx_path,
+            )
+            ann = _ann_index(cfg, cache_dir, bookmarks, vectors)
+        groups = group_duplicates(
+            bookmarks,
+            title_threshold=cfg.dedup.title_similarity_threshold,
+            prefer_shorter_url=cfg.dedup.prefer_shorter_url,
+            cross_folder=cfg.dedup.cross_folder,
+            cross_folder_threshold=cfg.dedup.cross_folder_threshold,
+            num_perm=cfg.dedup.minhash_permutations,
+            bands=cfg.dedup.lsh_bands,
+            content_threshold=cfg.dedup.content_similarity_threshold if content_dedup else None,
+            storage=storage,
+            semantic_threshold=cfg.dedup.semantic_threshold,
+            ann=ann,
+            ann_keys=_ann_keys(bookmarks) if ann is not None else None,
+            fetch_content=(lambda items: _fetch_content(cfg, items)) if content_dedup else None,
+        )
+    deduped, duplicates = split_groups(bookmarks, groups)
     print(f"Deduplicated to [bold]{len(deduped)}[/] items, duplicates: {len(duplicates)}")
 
     # Classify
-    if cfg.categorize.mode == "rules":
-        rules = load_rules(Path(cfg.categorize.rules_file))
-        classify_by_rules(deduped, rules)
-    elif cfg.categorize.mode == "embeddings":
-        classify_by_embeddings(
-            deduped,
-            model_name=cfg.categorize.embeddings.model,
-            labels=cfg.categorize.embeddings.labels,
-            top_k=cfg.categorize.embeddings.top_k,
-            score_threshold=cfg.categorize.embeddings.score_threshold,
+    vectors = None
+    mode = cfg.categorize.mode
+    if cfg.network.fetch_content and mode in ("llm", "cascade"):
+        # Page text for LLM prompts; pages fetched for content dedup are reused
+        _fetch_content(cfg, [b for b in deduped if not b.content_snippet])
+    if mode == "rules":
+        with ExitStack() as stack:
+            classify_by_rules(deduped, _compiled_rules(cfg, stack, cache_dir))
+    elif mode == "embeddings":
+        with Storage(cache_dir / "cbclean.sqlite") as storage:
+            vectors = _classify_embeddings(cfg, deduped, storage, cache_dir)
+    elif mode == "llm":
+        with Storage(cache_dir / "cbclean.sqlite") as storage:
+            _classify_llm(
+                cfg,
+                deduped,
+                storage,
+                cache_dir,
+                resume=resume,
+                only_uncertain=cfg.categorize.llm.only_uncertain,
+            )
+    elif mode == "cascade":
+        with ExitStack() as stack:
+            storage = stack.enter_context(Storage(cache_dir / "cbclean.sqlite"))
+            vectors, counts = classify_cascade(
+                deduped,
+                _compiled_rules(cfg, stack, cache_dir),
+                embed=lambda items, below: _classify_embeddings(
+                    cfg, items, storage, cache_dir, only_below=below
+                ),
+                llm=lambda items: _classify_llm(
+                    cfg, items, storage, cache_dir, resume=resume, only_uncertain=False
+                ),
+                move=cfg.thresholds.tag_confidence_move,
+                ask=cfg.thresholds.tag_confidence_ask,
+            )
+        print(
+            f"Cascade: {counts['rules']} tagged by rules, {counts['embeddings']} left for "
+            f"embeddings, {counts['llm']} for the LLM"
         )
-    elif cfg.categorize.mode == "llm":
-        if cfg.network.fetch_content:
-            enrich_with_content(
+    if vectors is not None:
+        if ann is None:
+            ann = _ann_index(cfg, cache_dir, deduped, vectors)
+        if cfg.apply.group_by == "cluster":
+            cluster_bookmarks(
                 deduped,
-                enabled=cfg.network.enabled,
-                timeout_sec=cfg.network.timeout_sec,
-                concurrent=cfg.network.concurrent,
-                user_agent=cfg.network.user_agent,
-                max_chars=cfg.network.max_content_chars,
+                vectors,
+                algo=cfg.categorize.embeddings.cluster_algo,
+                min_cluster_size=cfg.categorize.embeddings.min_cluster_size,
+                n_clusters=cfg.categorize.embeddings.n_clusters,
             )
-        classify_by_llm(
+
+    # Related bookmarks: nearest neighbours in the embedding index
+    related = None
+    if ann is not None:
+        related = related_bookmarks(
             deduped,
-            provider=cfg.categorize.llm.provider,
-            model=cfg.categorize.llm.model,
-            api_key_env=cfg.categorize.llm.api_key_env,
-            api_base=cfg.categorize.llm.api_base,
-            temperature=cfg.categorize.llm.temperature,
-            labels=cfg.categorize.llm.labels,
-            batch_size=cfg.categorize.llm.batch_size,
-            only_uncertain=cfg.categorize.llm.only_uncertain,
-            allow_new_labels=cfg.categorize.llm.allow_new_labels,
-            max_new_labels_per_batch=cfg.categorize.llm.max_new_labels_per_batch,
+            _ann_keys(deduped),
+            ann,
+            k=cfg.output.related,
+            threshold=cfg.output.related_threshold,
         )
 
     # Liveness (stubbed for MVP)
     check_liveness(deduped, enabled=cfg.network.enabled)
 
     # Plan
-    plan_items = propose_changes(bookmarks, deduped, duplicates)
+    plan_items = propose_changes(bookmarks, deduped, duplicates, groups=groups)
     plan_dicts = [
-        dict(action=p.action, reason=p.reason, bookmark_id=p.bookmark_id) for p in plan_items
+        dict(action=p.action, reason=p.reason, bookmark_id=p.bookmark_id, target_id=p.target_id)
+        for p in plan_items
     ]
 
     # Apply
@@ -115,6 +187,8 @@ def process(
         out_dir=out_dir,
         formats=cfg.output.report_formats,
         templates_dir=Path("templates"),
+        groups=groups,
+        related=related,
     )
     print(f"Reports written to {out_dir}")
 
@@ -131,12 +205,163 @@ def _load_config(path: Path) -> AppConfig:
     return AppConfig.model_validate(data or {})
 
 
+def _cache_dir(cfg: AppConfig) -> Path:
+    if cfg.cache.dir.strip():
+        return Path(cfg.cache.dir).expanduser()
+    return Path(cfg.output.export_dir) / "cache"
+
+
+def _fetch_content(cfg: AppConfig, bookmarks) -> None:
+    enrich_with_content(
+        bookmarks,
+        enabled=cfg.network.enabled,
+        timeout_sec=cfg.network.timeout_sec,
+        concurrent=cfg.network.concurrent,
+        user_agent=cfg.network.user_agent,
+        max_chars=cfg.network.max_content_chars,
+    )
+
+
+def _compiled_rules(cfg: AppConfig, stack: ExitStack, cache_dir: Path) -> CompiledRules:
+    """Rules file plus the configured domain lists (closed with `stack`)."""
+    lists = [
+        stack.enter_context(open_domain_index(Path(p).expanduser(), cache_dir))
+        for p in cfg.categorize.domain_lists
+    ]
+    return CompiledRules(load_rules(Path(cfg.categorize.rules_file)), lists)
+
+
+def _classify_embeddings(
+    cfg: AppConfig,
+    bookmarks,
+    storage: Storage,
+    cache_dir: Path,
+    *,
+    only_below: Optional[float] = None,
+) -> Any:
+    emb = cfg.categorize.embeddings
+    return classify_by_embeddings(
+        bookmarks,
+        model_name=emb.model,
+        labels=emb.labels,
+        top_k=emb.top_k,
+        score_threshold=emb.score_threshold,
+        cache=_embedding_cache(storage, cache_dir),
+        batch_size=emb.batch_size,
+        workers=emb.workers,
+        backend=emb.backend,
+        onnx_path=emb.onnx_path,
+        only_below=only_below,
+    )
+
+
+def _classify_llm(
+    cfg: AppConfig,
+    bookmarks,
+    storage: Storage,
+    cache_dir: Path,
+    *,
+    resume: bool,
+    only_uncertain: bool,
+) -> None:
+    prop = cfg.categorize.propagate
+    if not prop.enabled:
+        _run_llm(cfg, bookmarks, storage, cache_dir, resume=resume, only_uncertain=only_uncertain)
+        return
+    if only_uncertain:
+        bookmarks = [b for b in bookmarks if not b.tags]
+    calls: List[int] = []
+
+    def classify(items) -> None:
+        # The second call continues the journal the first one started
+        _run_llm(cfg, items, storage, cache_dir, resume=resume or bool(calls), only_uncertain=False)
+        calls.append(len(items))
+
+    counts = classify_by_groups(
+        bookmarks,
+        classify,
+        depth=prop.depth,
+        min_group=prop.min_group,
+        sample=prop.sample,
+        min_agreement=prop.min_agreement,
+    )
+    print(
+        f"Propagated labels to {counts['propagated']} bookmarks in {counts['groups']} "
+        f"site sections ({counts['sampled']} sampled, {counts['rechecked']} re-checked): "
+        f"{counts['propagated']} fewer bookmarks sent to the LLM"
+    )
+
+
+def _run_llm(
+    cfg: AppConfig,
+    bookmarks,
+    storage: Storage,
+    cache_dir: Path,
+    *,
+    resume: bool,
+    only_uncertain: bool,
+) -> None:
+    llm = cfg.categorize.llm
+    classify_by_llm(
+        bookmarks,
+        provider=llm.provider,
+        model=llm.model,
+        api_key_env=llm.api_key_env,
+        api_base=llm.api_base,
+        temperature=llm.temperature,
+        labels=llm.labels,
+        batch_size=llm.batch_size,
+        only_uncertain=only_uncertain,
+        allow_new_labels=llm.allow_new_labels,
+        max_new_labels_per_batch=llm.max_new_labels_per_batch,
+        storage=storage,
+        cache_ttl_days=llm.cache_ttl_days,
+        concurrency=llm.concurrency,
+        requests_per_min=llm.requests_per_min,
+        tokens_per_min=llm.tokens_per_min,
+        max_retries=llm.max_retries,
+        max_prompt_tokens=llm.max_prompt_tokens,
+        compact_prompt=llm.compact_prompt,
+        snippet_chars=llm.snippet_chars,
+        journal=cache_dir / "llm-journal.jsonl",
+        resume=resume,
+        stream=llm.stream,
+    )
+
+
+def _embedding_cache(storage: Storage, cache_dir: Path) -> Optional[EmbeddingCache]:
+    try:
+        return EmbeddingCache(storage, cache_dir / "embeddings", index_root=cache_dir / "ann")
+    except RuntimeError:  # numpy not installed
+        return None
+
+
+def _ann_keys(bookmarks) -> List[str]:
+    return [text_hash(make_text(b)) for b in bookmarks]
+
+
+def _ann_index(cfg: AppConfig, cache_dir: Path, bookmarks, vectors: Any) -> Optional[AnnIndex]:
+    """The persisted ANN index for the configured model, updated with `vectors`."""
+    if vectors is None or not len(vectors):
+        return None
+    emb = cfg.categorize.embeddings
+    key = embedding_key(emb.model, backend=emb.backend, onnx_path=emb.onnx_path)
+    return open_index(index_directory(cache_dir / "ann", key), _ann_keys(bookmarks), vectors)
+
+
 def _load_input(cfg: AppConfig):
     html = cfg.input.import_html.strip()
     if html:
         src = Path(html).expanduser()
         if src.exists():
             return read_bookmarks_html(src)
+    if cfg.input.all_profiles:
+        paths = discover_profiles(cfg.input.profile_glob)
+        if paths:
+            out_dir = Path(cfg.output.export_dir)
+            return list(
+                iter_profiles(paths, backup_dir=out_dir / "backups", workers=cfg.input.workers)
+            )
     # Fallback to JSON
     json_path = Path(cfg.input.bookmarks_path).expanduser()
     if json_path.exists():
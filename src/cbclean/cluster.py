@@ -1,10 +1,307 @@
 from __future__ import annotations
 
-# Stub for clustering utilities (e.g., HDBSCAN or KMeans)
+# Clustering of bookmark embeddings (unit-length rows, as produced by
+# classify_by_embeddings), numpy only.
+#
+#   kmeans   mini-batch spherical k-means: memory O((n + k) * dim)
+#   hdbscan  density-based, HDBSCAN-style: core distances and a minimum
+#            spanning tree over the mutual-reachability k-NN graph, condensed
+#            by min_cluster_size, clusters picked by excess of mass. Points
+#            in no dense region stay unclustered (noise).
+#
+# Neither builds an n x n matrix: the k-NN graph is computed a block of rows
+# at a time.
+
+from typing import Any, Dict, List, Optional, Tuple
 
-from typing import List
 from .utils import Bookmark
 
+# Similarity entries (rows x n) materialized at once: 128 MB of float32
+_BLOCK_FLOATS = 1 << 25
+# Points still together at distance 0 (duplicates) would have infinite lambda
+_LAMBDA_CAP = 1e6
+
+
+def cluster_bookmarks(
+    bookmarks: List[Bookmark],
+    vectors: Any = None,
+    *,
+    algo: str = "hdbscan",
+    min_cluster_size: int = 4,
+    n_clusters: int = 0,
+    seed: int = 0,
+) -> None:
+    """Set `cluster_id` and `cluster` (a representative title) on each bookmark.
 
-def cluster_bookmarks(bookmarks: List[Bookmark]) -> None:  # pragma: no cover
+    `vectors` holds one embedding per bookmark; without them (no embeddings
+    backend) this is a no-op. Unclustered bookmarks get cluster_id -1 and no
+    name. `n_clusters` <= 0 picks sqrt(n / 2) for k-means.
+    """
+    if vectors is None or not bookmarks:
+        return None
+    import numpy as np  # type: ignore
+
+    x = np.asarray(vectors, dtype=np.float32)
+    x = x / np.clip(np.linalg.norm(x, axis=1, keepdims=True), 1e-12, None)
+    if algo == "kmeans":
+        k = n_clusters if n_clusters > 0 else max(1, int(round((len(x) / 2) ** 0.5)))
+        labels = minibatch_kmeans(x, k, seed=seed)
+    elif algo == "hdbscan":
+        labels = density_clusters(x, min_cluster_size=min_cluster_size)
+    else:
+        raise ValueError(f"unknown cluster_algo {algo!r}; expected 'hdbscan' or 'kmeans'")
+    names = representative_titles(bookmarks, x, labels)
+    for b, label in zip(bookmarks, labels.tolist()):
+        b.cluster_id = label
+        b.cluster = names.get(label)
     return None
+
+
+def minibatch_kmeans(
+    x: Any, k: int, *, batch_size: int = 1024, iters: int = 100, seed: int = 0
+) -> Any:
+    """Spherical mini-batch k-means (Sculley 2010); returns a label per row."""
+    import numpy as np  # type: ignore
+
+    rng = np.random.default_rng(seed)
+    n = len(x)
+    k = min(k, n)
+    centers = _kmeans_pp(x[rng.choice(n, size=min(n, 20 * k), replace=False)], k, rng)
+    counts = np.zeros(k)
+    for _ in range(iters):
+        batch = x[rng.choice(n, size=min(batch_size, n), replace=False)]
+        nearest = np.argmax(batch @ centers.T, axis=1)
+        for c in np.unique(nearest):
+            members = batch[nearest == c]
+            counts[c] += len(members)
+            # Per-center learning rate 1/count, applied to the batch mean
+            eta = len(members) / counts[c]
+            centers[c] = (1 - eta) * centers[c] + eta * members.mean(axis=0)
+        centers /= np.clip(np.linalg.norm(centers, axis=1, keepdims=True), 1e-12, None)
+    labels = np.empty(n, dtype=np.int64)
+    step = max(1, _BLOCK_FLOATS // k)
+    for start in range(0, n, step):
+        labels[start : start + step] = np.argmax(x[start : start + step] @ centers.T, axis=1)
+    # Renumber densely by first appearance so empty centers leave no gaps
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    return np.argsort(np.argsort(first))[inverse]
+
+
+def _kmeans_pp(sample: Any, k: int, rng: Any) -> Any:
+    import numpy as np  # type: ignore
+
+    centers = [sample[rng.integers(len(sample))]]
+    dist = 1 - sample @ centers[0]
+    for _ in range(1, k):
+        p = np.clip(dist, 0, None) ** 2
+        total = p.sum()
+        i = rng.choice(len(sample), p=p / total) if total > 0 else rng.integers(len(sample))
+        centers.append(sample[i])
+        dist = np.minimum(dist, 1 - sample @ sample[i])
+    return np.array(centers, dtype=np.float32)
+
+
+def knn_graph(x: Any, k: int, *, chunk_rows: int = 0) -> Tuple[Any, Any]:
+    """(indices, cosine distances) of each row's k nearest other rows, nearest first.
+
+    Exact; similarities are computed `chunk_rows` rows at a time (by default
+    as many as fit in _BLOCK_FLOATS).
+    """
+    import numpy as np  # type: ignore
+
+    n = len(x)
+    chunk_rows = chunk_rows or max(1, _BLOCK_FLOATS // max(n, 1))
+    k = min(k, n - 1)
+    idx = np.empty((n, k), dtype=np.int64)
+    dist = np.empty((n, k), dtype=np.float32)
+    if k <= 0:
+        return idx, dist
+    for start in range(0, n, chunk_rows):
+        sims = x[start : start + chunk_rows] @ x.T
+        rows = np.arange(len(sims))
+        sims[rows, start + rows] = -np.inf  # not one's own neighbour
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind="stable")
+        idx[start : start + len(sims)] = np.take_along_axis(top, order, axis=1)
+        dist[start : start + len(sims)] = 1 - np.take_along_axis(top_sims, order, axis=1)
+    return idx, np.clip(dist, 0, None)
+
+
+def density_clusters(
+    x: Any, *, min_cluster_size: int = 4, min_samples: Optional[int] = None
+) -> Any:
+    """HDBSCAN-style labels from the k-NN graph; -1 marks noise."""
+    import numpy as np  # type: ignore
+
+    n = len(x)
+    min_cluster_size = max(2, min_cluster_size)
+    m = min_samples or min_cluster_size
+    if n < min_cluster_size:
+        return np.full(n, -1, dtype=np.int64)
+    nbr, dist = knn_graph(x, max(m, 1))
+    core = dist[:, min(m, dist.shape[1]) - 1]
+    # Mutual reachability on k-NN edges, then Kruskal
+    src = np.repeat(np.arange(n), nbr.shape[1])
+    dst = nbr.ravel()
+    w = np.maximum(np.maximum(core[src], core[dst]), dist.ravel())
+    edges = _minimum_spanning_forest(n, src, dst, w)
+    return _condense_and_select(n, edges, min_cluster_size)
+
+
+def _minimum_spanning_forest(n: int, src: Any, dst: Any, w: Any) -> List[Tuple[int, int, float]]:
+    parent = list(range(n))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    out: List[Tuple[int, int, float]] = []
+    for e in w.argsort(kind="stable").tolist():
+        a, b = find(int(src[e])), find(int(dst[e]))
+        if a != b:
+            parent[a] = b
+            out.append((int(src[e]), int(dst[e]), float(w[e])))
+            if len(out) == n - 1:
+                break
+    # Join disconnected components at infinite distance (lambda 0)
+    roots = sorted({find(i) for i in range(n)})
+    out.extend((roots[0], r, float("inf")) for r in roots[1:])
+    return out
+
+
+def _condense_and_select(n: int, edges: List[Tuple[int, int, float]], min_size: int) -> Any:
+    import numpy as np  # type: ignore
+
+    # Single-linkage dendrogram: node n + t merges the two sets joined by edge t
+    parent = list(range(n))
+    left: List[int] = []
+    right: List[int] = []
+    size = [1] * n
+    height: List[float] = []
+    top = list(range(n))  # set representative -> current dendrogram node
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b, w in sorted(edges, key=lambda e: e[2]):
+        ra, rb = find(a), find(b)
+        node = n + len(left)
+        left.append(top[ra])
+        right.append(top[rb])
+        size.append(size[top[ra]] + size[top[rb]])
+        height.append(w)
+        parent[ra] = rb
+        top[rb] = node
+
+    # Condensed tree, top down: (parent cluster, child, lambda, size) where a
+    # child below min_size is a single point falling out of its cluster
+    def lam(node: int) -> float:
+        h = height[node - n]
+        return min(1.0 / h, _LAMBDA_CAP) if h > 0 else _LAMBDA_CAP
+
+    root = 2 * n - 2
+    cluster_of = {root: 0}
+    birth = [0.0]
+    cparent = [-1]
+    falls: List[Tuple[int, int, float]] = []  # (cluster, point, lambda)
+    splits: List[Tuple[int, int, float, int]] = []  # (cluster, child cluster, lambda, size)
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        c = cluster_of[node]
+        lm = lam(node)
+        kids = (left[node - n], right[node - n])
+        big = [k for k in kids if size[k] >= min_size]
+        for kid in kids:
+            if kid in big:
+                if len(big) == 2:
+                    cluster_of[kid] = len(birth)
+                    birth.append(lm)
+                    cparent.append(c)
+                    splits.append((c, cluster_of[kid], lm, size[kid]))
+                else:
+                    cluster_of[kid] = c
+                stack.append(kid)
+            else:
+                for p in _leaves(kid, n, left, right):
+                    falls.append((c, p, lm))
+
+    # Stability (excess of mass) and bottom-up selection; the root only counts
+    # when it is the sole cluster
+    n_clusters = len(birth)
+    stability = [0.0] * n_clusters
+    for c, _, lm in falls:
+        stability[c] += lm - birth[c]
+    for c, child, lm, sz in splits:
+        stability[c] += sz * (lm - birth[c])
+    children: Dict[int, List[int]] = {}
+    for c, child, _, _ in splits:
+        children.setdefault(c, []).append(child)
+    selected = [False] * n_clusters
+    best = stability[:]
+    for c in range(n_clusters - 1, 0, -1):  # children always have larger ids
+        below = sum(best[k] for k in children.get(c, ()))
+        if children.get(c) and below > stability[c]:
+            best[c] = below
+        else:
+            selected[c] = True
+            best[c] = stability[c]
+    if n_clusters == 1:
+        selected[0] = True
+    # Keep only the topmost selected cluster on each path
+    chosen: Dict[int, int] = {}
+    for c in range(n_clusters):
+        a, pick = c, -1
+        while a != -1:
+            if selected[a]:
+                pick = a
+            a = cparent[a]
+        chosen[c] = pick
+    labels = np.full(n, -1, dtype=np.int64)
+    for c, p, _ in falls:
+        labels[p] = chosen[c]
+    # Dense ids in order of first appearance
+    remap: Dict[int, int] = {}
+    for i, lbl in enumerate(labels.tolist()):
+        if lbl >= 0:
+            labels[i] = remap.setdefault(lbl, len(remap))
+    return labels
+
+
+def _leaves(node: int, n: int, left: List[int], right: List[int]) -> List[int]:
+    out: List[int] = []
+    stack = [node]
+    while stack:
+        v = stack.pop()
+        if v < n:
+            out.append(v)
+        else:
+            stack.append(left[v - n])
+            stack.append(right[v - n])
+    return out
+
+
+def representative_titles(bookmarks: List[Bookmark], x: Any, labels: Any) -> Dict[int, str]:
+    """Cluster id -> title of the member closest to the cluster centroid.
+
+    Titles shared by several clusters get a numeric suffix so every cluster
+    maps to its own folder name.
+    """
+    import numpy as np  # type: ignore
+
+    names: Dict[int, str] = {}
+    seen: Dict[str, int] = {}
+    for label in sorted(set(labels.tolist()) - {-1}):
+        members = np.flatnonzero(labels == label)
+        centroid = x[members].mean(axis=0)
+        best = members[int(np.argmax(x[members] @ centroid))]
+        title = (bookmarks[best].title or "").strip() or f"Cluster {label + 1}"
+        seen[title] = seen.get(title, 0) + 1
+        names[label] = title if seen[title] == 1 else f"{title} ({seen[title]})"
+    return names
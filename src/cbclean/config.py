@@ -8,12 +8,20 @@ class InputCfg(BaseModel):
     bookmarks_path: str = "~/.config/google-chrome/Default/Bookmarks"
     profile_glob: str = "~/.config/google-chrome/*/Bookmarks"
     import_html: str = ""
+    all_profiles: bool = False  # read every profile matching profile_glob
+    workers: int = 0  # parallel profile parsers; 0 = one per CPU
 
 
 class OutputCfg(BaseModel):
     export_dir: str = "./out"
     plan_name: str = "plan-{timestamp}"
     report_formats: List[str] = ["html", "md"]
+    related: int = 3  # related bookmarks listed per bookmark (needs embeddings)
+    related_threshold: float = 0.6  # minimum cosine similarity
+
+
+class CacheCfg(BaseModel):
+    dir: str = ""  # "" = <export_dir>/cache
 
 
 class NetworkCfg(BaseModel):
@@ -34,8 +42,13 @@ class NormalizeCfg(BaseModel):
 
 class DedupCfg(BaseModel):
     title_similarity_threshold: float = 0.90
-    content_similarity_threshold: float = 0.92
+    content_similarity_threshold: float | None = 0.92  # SimHash of fetched page text; null = off
     prefer_shorter_url: bool = True
+    cross_folder: bool = False  # MinHash/LSH near-duplicates across folders
+    cross_folder_threshold: float = 0.85  # token_sort_ratio over title + URL path
+    minhash_permutations: int = 64
+    lsh_bands: int = 16
+    semantic_threshold: float | None = None  # embedding cosine; needs the embed/onnx extra
 
 
 class LivenessCfg(BaseModel):
@@ -53,15 +66,23 @@ class EmbeddingsCfg(BaseModel):
     model: str = "all-MiniLM-L6-v2"
     cluster_algo: str = "hdbscan"  # hdbscan | kmeans
     min_cluster_size: int = 4
+    n_clusters: int = 0  # kmeans only; 0 = sqrt(n / 2)
     top_k: int = 2
     score_threshold: float = 0.35
     labels: List[str] | None = None
+    batch_size: int = 64  # texts per encode call, grouped by length
+    workers: int = 0  # encoding processes; 0 = one per CPU
+    backend: str = "torch"  # torch | onnx (CPU onnxruntime, see embed_backends)
+    onnx_path: str = ""  # ONNX export dir or .onnx file (with tokenizer.json)
 
 
 class LlmCfg(BaseModel):
     provider: str = "openai"
     model: str = "gpt-4o-mini"
-    batch_size: int = 30
+    batch_size: int = 100  # max bookmarks per request
+    max_prompt_tokens: int = 6000  # estimated prompt budget per request; 0 = count only
+    compact_prompt: bool = True  # cacheable system prefix, host aliases, trimmed snippets
+    snippet_chars: int = 300  # page text per bookmark in compact prompts
     only_uncertain: bool = True
     api_key_env: str = "OPENAI_API_KEY"
     api_base: str | None = None
@@ -69,28 +90,45 @@ class LlmCfg(BaseModel):
     labels: List[str] | None = None
     allow_new_labels: bool = True
     max_new_labels_per_batch: int = 10
+    cache_ttl_days: float = 30.0  # reuse answers per URL/title/model/labels; 0 = off
+    concurrency: int = 4  # batches in flight
+    requests_per_min: int = 0  # provider rate limits; 0 = unlimited
+    tokens_per_min: int = 0
+    max_retries: int = 4  # on 429 / 5xx / connection errors, with jittered backoff
+    stream: bool = False  # parse replies while they stream in
+
+
+class PropagateCfg(BaseModel):
+    enabled: bool = False  # LLM: classify a sample per site section, propagate agreed labels
+    depth: int = 2  # URL path directories in a section key (host/dir1/dir2)
+    min_group: int = 6  # smaller sections are classified bookmark by bookmark
+    sample: int = 3
+    min_agreement: float = 0.8  # share of the sample a label needs to be propagated
 
 
 class CategorizeCfg(BaseModel):
-    mode: str = "rules"  # rules | embeddings | llm
+    mode: str = "rules"  # rules | embeddings | llm | cascade
     rules_file: str = "./configs/rules.example.yaml"
+    domain_lists: List[str] = []  # extra domain -> tags feeds, compiled into the cache dir
     embeddings: EmbeddingsCfg = EmbeddingsCfg()
     llm: LlmCfg = LlmCfg()
+    propagate: PropagateCfg = PropagateCfg()
 
 
 class ThresholdsCfg(BaseModel):
-    tag_confidence_move: float = 0.75
-    tag_confidence_ask: float = 0.55
+    tag_confidence_move: float = 0.75  # cascade: embeddings score bookmarks below this
+    tag_confidence_ask: float = 0.55  # cascade: the LLM gets bookmarks still below this
 
 
 class ApplyCfg(BaseModel):
     mode: str = "export_html"  # export_html | dry_run
-    group_by: str = "folder"  # folder | tag
+    group_by: str = "folder"  # folder | tag | tag-all | tag-hier | cluster
 
 
 class AppConfig(BaseModel):
     input: InputCfg = InputCfg()
     output: OutputCfg = OutputCfg()
+    cache: CacheCfg = CacheCfg()
     network: NetworkCfg = NetworkCfg()
     normalize: NormalizeCfg = NormalizeCfg()
     dedup: DedupCfg = DedupCfg()
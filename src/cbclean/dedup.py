@@ -1,19 +1,54 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+import hashlib
+import random
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
 from rapidfuzz import fuzz
+from .ann import AnnIndex
+from .storage import Storage
 from .utils import Bookmark
 
+_SCORERS = (
+    fuzz.token_set_ratio,
+    fuzz.partial_token_set_ratio,
+    fuzz.partial_ratio,
+    fuzz.token_sort_ratio,
+)
+
+
+# Whitespace as rapidfuzz's token scorers split on it (unlike str.split, NEL
+# and no-break space stay inside tokens)
+_TOKEN_SEP = re.compile(r"[^\S\x85\xa0]+")
+
+_BATCH_ORDER = (
+    fuzz.token_sort_ratio,
+    fuzz.token_set_ratio,
+    fuzz.partial_ratio,
+    fuzz.partial_token_set_ratio,
+)
+
 
 def _title_sim(a: str, b: str) -> float:
     # Combine several robust fuzzy measures
-    scores = [
-        fuzz.token_set_ratio(a, b),
-        fuzz.partial_token_set_ratio(a, b),
-        fuzz.partial_ratio(a, b),
-        fuzz.token_sort_ratio(a, b),
-    ]
-    return max(scores) / 100.0
+    return max(scorer(a, b) for scorer in _SCORERS) / 100.0
+
+
+@dataclass
+class DuplicateGroup:
+    """Bookmarks connected by same-URL or similar-title edges (transitively)."""
+
+    survivor: Bookmark
+    duplicates: List[Bookmark] = field(default_factory=list)
+    # Edge kinds that joined the group: "url", "title", "near", "content" and/or "semantic"
+    reasons: Set[str] = field(default_factory=set)
+
+    @property
+    def members(self) -> List[Bookmark]:
+        return [self.survivor, *self.duplicates]
 
 
 def deduplicate(
@@ -22,45 +57,563 @@ def deduplicate(
     title_threshold: float,
     prefer_shorter_url: bool,
 ) -> Tuple[List[Bookmark], List[Bookmark]]:
-    by_norm: Dict[str, Bookmark] = {}
-    duplicates: List[Bookmark] = []
-    for b in bookmarks:
-        key = b.normalized_url or b.url or ""
-        if not key:
+    groups = group_duplicates(
+        bookmarks, title_threshold=title_threshold, prefer_shorter_url=prefer_shorter_url
+    )
+    return split_groups(bookmarks, groups)
+
+
+def group_duplicates(
+    bookmarks: List[Bookmark],
+    *,
+    title_threshold: float,
+    prefer_shorter_url: bool,
+    cross_folder: bool = False,
+    cross_folder_threshold: float = 0.85,
+    num_perm: int = 64,
+    bands: int = 16,
+    content_threshold: Optional[float] = None,
+    storage: Optional[Storage] = None,
+    semantic_threshold: Optional[float] = None,
+    ann: Optional[AnnIndex] = None,
+    ann_keys: Optional[List[str]] = None,
+    fetch_content: Optional[Callable[[List[Bookmark]], None]] = None,
+) -> List[DuplicateGroup]:
+    """Union-find over hard (normalized URL) and soft (title, same folder) edges.
+
+    With `cross_folder`, near-duplicates in different folders are linked too
+    (see _near_duplicate_pairs). With `content_threshold`, bookmarks whose
+    fetched `content_snippet` SimHashes agree are linked (see
+    _content_pairs); `storage` persists the fingerprints between runs, and
+    `fetch_content`, if given, is first called with the would-be survivor of
+    every group found so far that has no page text yet, so duplicates already
+    known by URL or title are not downloaded. With
+    `semantic_threshold` and an embedding index `ann` (`ann_keys` names each
+    bookmark's entry), bookmarks whose embeddings are that cosine-similar are
+    linked (see _semantic_pairs).
+
+    Returns one group per connected component with more than one bookmark,
+    ordered by the input position of the survivor. The survivor is the member
+    with the shortest URL when `prefer_shorter_url` is set, else the first one;
+    ties go to the earlier bookmark, so results do not depend on sort order.
+    """
+    nodes = [b for b in bookmarks if b.normalized_url or b.url]
+    keys = [b.normalized_url or b.url or "" for b in nodes]
+    uf = _UnionFind(len(nodes))
+
+    first: Dict[str, int] = {}
+    for i, key in enumerate(keys):
+        uf.union(first.setdefault(key, i), i, "url")
+
+    # Soft edges only between bookmarks of the same folder
+    by_folder: Dict[str, List[int]] = {}
+    for i, b in enumerate(nodes):
+        if b.url:
+            by_folder.setdefault(b.folder_path, []).append(i)
+    for idxs in by_folder.values():
+        if len(idxs) > 1:
+            _SoftMatcher([nodes[i] for i in idxs], title_threshold).link(uf, idxs)
+
+    if cross_folder:
+        for i, j in _near_duplicate_pairs(
+            nodes,
+            title_threshold=title_threshold,
+            threshold=cross_folder_threshold,
+            num_perm=num_perm,
+            bands=bands,
+            same=lambda a, b: uf.find(a) == uf.find(b),
+        ):
+            uf.union(i, j, "near")
+
+    if content_threshold is not None:
+        if fetch_content is not None:
+            reps: Dict[int, int] = {}
+            for i in range(len(nodes)):
+                root = uf.find(i)
+                if root not in reps or (
+                    prefer_shorter_url and (len(keys[i]), i) < (len(keys[reps[root]]), reps[root])
+                ):
+                    reps[root] = i
+            fetch_content([nodes[i] for i in sorted(reps.values()) if not nodes[i].content_snippet])
+        for i, j in _content_pairs(nodes, keys, threshold=content_threshold, storage=storage):
+            uf.union(i, j, "content")
+
+    if semantic_threshold is not None and ann is not None and ann_keys is not None:
+        node_keys = [k for b, k in zip(bookmarks, ann_keys) if b.normalized_url or b.url]
+        for i, j in _semantic_pairs(keys, node_keys, ann, threshold=semantic_threshold):
+            uf.union(i, j, "semantic")
+
+    members: Dict[int, List[int]] = {}
+    for i in range(len(nodes)):
+        members.setdefault(uf.find(i), []).append(i)
+    groups: List[DuplicateGroup] = []
+    for root, idxs in members.items():
+        if len(idxs) < 2:
             continue
-        existed = by_norm.get(key)
-        if existed is None:
-            by_norm[key] = b
+        if prefer_shorter_url:
+            best = min(idxs, key=lambda i: (len(keys[i]), i))
         else:
-            keep, drop = _resolve_dupe(existed, b, prefer_shorter_url)
-            by_norm[key] = keep
-            duplicates.append(drop)
-
-    # Soft duplicates by similar title in same folder
-    remaining = list(by_norm.values())
-    remaining.sort(key=lambda x: (x.folder_path, x.title))
-    i = 0
-    while i < len(remaining) - 1:
-        a = remaining[i]
-        j = i + 1
-        while j < len(remaining) and remaining[j].folder_path == a.folder_path:
-            b = remaining[j]
-            if a.url and b.url and _title_sim(a.title, b.title) >= title_threshold:
-                keep, drop = _resolve_dupe(a, b, prefer_shorter_url)
-                remaining[i] = keep
-                duplicates.append(drop)
-                remaining.pop(j)
+            best = idxs[0]
+        groups.append(
+            DuplicateGroup(
+                survivor=nodes[best],
+                duplicates=[nodes[i] for i in idxs if i != best],
+                reasons=set(uf.kinds[root]),
+            )
+        )
+    position = {id(b): i for i, b in enumerate(nodes)}
+    groups.sort(key=lambda g: position[id(g.survivor)])
+    return groups
+
+
+def split_groups(
+    bookmarks: List[Bookmark], groups: List[DuplicateGroup]
+) -> Tuple[List[Bookmark], List[Bookmark]]:
+    """(kept, duplicates): kept keeps input order; bookmarks without a URL are dropped."""
+    duplicates = [b for g in groups for b in g.duplicates]
+    dropped = {id(b) for b in duplicates}
+    kept = [b for b in bookmarks if (b.normalized_url or b.url) and id(b) not in dropped]
+    return kept, duplicates
+
+
+# MinHash universe: (a * h + b) mod p over 32-bit shingle hashes stays in uint64
+_MINHASH_PRIME = (1 << 31) - 1
+_WORD = re.compile(r"\w+")
+# Candidate pairs compared per bookmark at most; only huge LSH buckets of
+# look-alike bookmarks (e.g. one title on many pages) come near it
+_MAX_PAIRS_PER_ITEM = 32
+
+
+def _near_text(b: Bookmark) -> str:
+    path = urlsplit(b.normalized_url or b.url or "").path
+    return " ".join(_WORD.findall(f"{b.title or ''} {path}".lower()))
+
+
+def _shingles(text: str, k: int = 4) -> Set[int]:
+    data = text.encode("utf-8")
+    if len(data) <= k:
+        return {zlib.crc32(data)} if data else set()
+    return {zlib.crc32(data[i : i + k]) for i in range(len(data) - k + 1)}
+
+
+def _minhash_signatures(shingles: List[Set[int]], num_perm: int) -> Any:
+    """One MinHash signature per non-empty shingle set (same seeds every run).
+
+    Returns a (len(shingles), num_perm) uint64 array, or a list of tuples
+    without numpy; _band_keys() reads either.
+    """
+    rng = random.Random(1)
+    a = [rng.randrange(1, _MINHASH_PRIME) for _ in range(num_perm)]
+    b = [rng.randrange(0, _MINHASH_PRIME) for _ in range(num_perm)]
+    try:
+        import numpy as np  # type: ignore
+    except Exception:  # pragma: no cover - numpy is optional
+        return [
+            tuple(min((x * h + y) % _MINHASH_PRIME for h in hs) for x, y in zip(a, b))
+            for hs in shingles
+        ]
+    av = np.array(a, dtype=np.uint64)[:, None]
+    bv = np.array(b, dtype=np.uint64)[:, None]
+    out = []
+    start = 0
+    while start < len(shingles):
+        # Chunks of ~64k shingles keep the (num_perm x chunk) matrix small
+        stop, total = start, 0
+        while stop < len(shingles) and (total < 1 << 16 or stop == start):
+            total += len(shingles[stop])
+            stop += 1
+        flat = np.fromiter(
+            (h for hs in shingles[start:stop] for h in hs), dtype=np.uint64, count=total
+        )
+        offsets = np.cumsum([0] + [len(hs) for hs in shingles[start : stop - 1]])
+        mins = np.minimum.reduceat((av * flat + bv) % _MINHASH_PRIME, offsets, axis=1)
+        out.append(mins.T)
+        start = stop
+    return np.concatenate(out) if out else np.zeros((0, num_perm), dtype=np.uint64)
+
+
+def _band_keys(sigs: Any, start: int, rows: int) -> List[Hashable]:
+    if isinstance(sigs, list):
+        return [sig[start : start + rows] for sig in sigs]
+    band = sigs[:, start : start + rows].copy()
+    return band.view(f"V{band.itemsize * rows}").ravel().tolist()
+
+
+def _near_duplicate_pairs(
+    nodes: List[Bookmark],
+    *,
+    title_threshold: float,
+    threshold: float,
+    num_perm: int,
+    bands: int,
+    same: Callable[[int, int], bool],
+) -> Iterable[Tuple[int, int]]:
+    """Verified near-duplicate pairs (i, j) from different folders.
+
+    MinHash signatures over character shingles of "title + URL path" are cut
+    into `bands` bands; bookmarks sharing any band become candidates. Every
+    pair in a bucket is compared once, smallest buckets first, up to
+    _MAX_PAIRS_PER_ITEM pairs per bookmark in total: once that is spent, the
+    pairs of the remaining (largest) buckets are not compared, so their
+    near-duplicates are missed. Candidates are kept when titles pass
+    _title_sim and the combined text passes token_sort_ratio at `threshold`.
+    `same(i, j)` skips pairs already grouped.
+    """
+    texts = [_near_text(b) for b in nodes]
+    idxs = [i for i, t in enumerate(texts) if t]
+    sigs = _minhash_signatures([_shingles(texts[i]) for i in idxs], num_perm)
+    rows = max(1, num_perm // max(1, bands))
+    candidates: List[List[int]] = []
+    for band in range(0, rows * (num_perm // rows), rows):
+        buckets: Dict[Hashable, List[int]] = {}
+        for i, key in zip(idxs, _band_keys(sigs, band, rows)):
+            buckets.setdefault(key, []).append(i)
+        candidates += [members for members in buckets.values() if len(members) > 1]
+    candidates.sort(key=len)
+    budget = _MAX_PAIRS_PER_ITEM * len(idxs)
+    seen: Set[Tuple[int, int]] = set()
+    for members in candidates:
+        for k, i in enumerate(members):
+            for j in members[k + 1 :]:
+                if budget <= 0:
+                    return
+                if (i, j) in seen:
+                    continue
+                seen.add((i, j))
+                budget -= 1
+                a, b = nodes[i], nodes[j]
+                if a.folder_path == b.folder_path or same(i, j):
+                    continue
+                if (
+                    fuzz.token_sort_ratio(texts[i], texts[j]) / 100.0 >= threshold
+                    and _title_sim(a.title, b.title) >= title_threshold
+                ):
+                    yield i, j
+
+
+_SIMHASH_BITS = 64
+# Shorter pages are mostly error pages and login walls, which look alike
+_MIN_CONTENT_WORDS = 40
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash over word trigrams; None for texts too short to compare."""
+    words = _WORD.findall(text.lower())
+    if len(words) < _MIN_CONTENT_WORDS:
+        return None
+    counts: Dict[int, int] = {}
+    for i in range(len(words) - 2):
+        digest = hashlib.blake2b(" ".join(words[i : i + 3]).encode("utf-8"), digest_size=8)
+        h = int.from_bytes(digest.digest(), "big")
+        counts[h] = counts.get(h, 0) + 1
+    try:
+        import numpy as np  # type: ignore
+    except Exception:  # pragma: no cover - numpy is optional
+        totals = [0] * _SIMHASH_BITS
+        for h, w in counts.items():
+            for bit in range(_SIMHASH_BITS):
+                totals[bit] += w if h >> bit & 1 else -w
+    else:
+        hs = np.fromiter(counts.keys(), dtype=np.uint64, count=len(counts))
+        ws = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        bits = (hs[:, None] >> np.arange(_SIMHASH_BITS, dtype=np.uint64)) & np.uint64(1)
+        totals = (ws @ (2 * bits.astype(np.int64) - 1)).tolist()
+    return sum(1 << bit for bit, t in enumerate(totals) if t > 0)
+
+
+class _HammingIndex:
+    """Fingerprints within `max_distance` bits of each other, without a full scan.
+
+    The bits are cut into max_distance + 1 blocks; by pigeonhole two close
+    fingerprints agree exactly on at least one block, so each block value is
+    a bucket key and only bucket members are compared.
+    """
+
+    def __init__(self, max_distance: int, bits: int = _SIMHASH_BITS) -> None:
+        self.max_distance = max_distance
+        blocks = max_distance + 1
+        edges = [k * bits // blocks for k in range(blocks + 1)]
+        self.blocks = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(edges, edges[1:])]
+        self.tables: List[Dict[int, List[int]]] = [{} for _ in self.blocks]
+        self.fps: List[int] = []
+
+    def add(self, fp: int) -> int:
+        item = len(self.fps)
+        self.fps.append(fp)
+        for table, (shift, mask) in zip(self.tables, self.blocks):
+            table.setdefault(fp >> shift & mask, []).append(item)
+        return item
+
+    def near(self, fp: int) -> List[int]:
+        found: Set[int] = set()
+        for table, (shift, mask) in zip(self.tables, self.blocks):
+            found.update(table.get(fp >> shift & mask, ()))
+        return sorted(i for i in found if (self.fps[i] ^ fp).bit_count() <= self.max_distance)
+
+
+def content_fingerprints(
+    nodes: List[Bookmark], keys: List[str], storage: Optional[Storage] = None
+) -> Dict[int, int]:
+    """index -> SimHash of content_snippet, reusing fingerprints stored for the URL."""
+    todo = [
+        (i, hashlib.sha1(b.content_snippet.encode("utf-8")).hexdigest())
+        for i, b in enumerate(nodes)
+        if b.content_snippet
+    ]
+    cached = storage.get_fingerprints(sorted({keys[i] for i, _ in todo})) if storage else {}
+    out: Dict[int, int] = {}
+    fresh: Dict[str, Tuple[str, int]] = {}
+    for i, content_hash in todo:
+        # A fingerprint computed in this run wins over a stored one
+        hit = fresh.get(keys[i])
+        if not hit or hit[0] != content_hash:
+            hit = cached.get(keys[i])
+        if hit and hit[0] == content_hash:
+            out[i] = hit[1]
+            continue
+        fp = simhash(nodes[i].content_snippet or "")
+        if fp is not None:
+            out[i] = fp
+            fresh[keys[i]] = (content_hash, fp)
+    if storage and fresh:
+        storage.put_fingerprints((url, h, fp) for url, (h, fp) in fresh.items())
+    return out
+
+
+def _content_pairs(
+    nodes: List[Bookmark], keys: List[str], *, threshold: float, storage: Optional[Storage]
+) -> Iterable[Tuple[int, int]]:
+    """Pairs of different URLs whose page text SimHashes are >= threshold similar.
+
+    Similarity is 1 - hamming / 64, so mirrors and AMP/canonical variants of
+    one page match while merely related pages do not.
+    """
+    max_distance = max(0, min(_SIMHASH_BITS - 1, int((1 - threshold) * _SIMHASH_BITS + 1e-9)))
+    index = _HammingIndex(max_distance)
+    owners: List[int] = []
+    for i, fp in sorted(content_fingerprints(nodes, keys, storage).items()):
+        for item in index.near(fp):
+            j = owners[item]
+            if keys[j] != keys[i]:
+                yield j, i
+        index.add(fp)
+        owners.append(i)
+
+
+# Neighbours looked up per bookmark for semantic edges
+_SEMANTIC_K = 8
+
+
+def _semantic_pairs(
+    keys: List[str], ann_keys: List[str], ann: AnnIndex, *, threshold: float
+) -> Iterable[Tuple[int, int]]:
+    """Pairs of different URLs whose embeddings have cosine >= threshold.
+
+    Each distinct text queries the index for its _SEMANTIC_K nearest
+    entries, so the cost is one approximate search per bookmark rather than
+    all pairs; entries of texts outside this run are ignored.
+    """
+    owners: Dict[str, List[int]] = {}
+    for i, key in enumerate(ann_keys):
+        if key in ann:
+            owners.setdefault(key, []).append(i)
+    for idxs in owners.values():
+        for j in idxs[1:]:
+            if keys[j] != keys[idxs[0]]:
+                yield idxs[0], j
+    if not owners:
+        return
+    uniq = list(owners)
+    positions, sims = ann.search(ann.get(uniq), _SEMANTIC_K + 1)
+    for key, row, srow in zip(uniq, positions.tolist(), sims.tolist()):
+        i = owners[key][0]
+        for p, s in zip(row, srow):
+            if p < 0 or s < threshold:
+                break
+            other = owners.get(ann.keys[p])
+            if other and keys[other[0]] != keys[i]:
+                yield i, other[0]
+
+
+class _UnionFind:
+    """Disjoint sets with path halving and union by size; near-linear in edges."""
+
+    def __init__(self, n: int) -> None:
+        self.parent = list(range(n))
+        self.size = [1] * n
+        self.kinds: Dict[int, Set[str]] = {}
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a: int, b: int, kind: str) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+        kinds = self.kinds.setdefault(ra, set())
+        kinds.update(self.kinds.pop(rb, ()))
+        kinds.add(kind)
+
+
+class _SoftMatcher:
+    """Similar-title edges within one folder without all-pairs scoring.
+
+    Only pairs that could join two different components are scored:
+
+    * Titles sharing a token always score 100 (partial_token_set_ratio
+      short-circuits on any common token), so each token posting list is
+      linked as a chain.
+    * Remaining matches need character-level similarity. Every scorer is an
+      Indel ratio, and a score >= threshold bounds the edit distance by
+      tau = 2m(1-t)/t for the shorter string of length m. Cutting its tokens
+      into tau + 1 disjoint pieces, at least one piece survives intact and is
+      found verbatim inside a token of the partner (pigeonhole filtering).
+      Candidates are then scored in one batch per title.
+    """
+
+    def __init__(self, items: List[Bookmark], threshold: float) -> None:
+        self.items = items
+        self.threshold = threshold
+        self.titles = [b.title or "" for b in items]
+        self.split = [[tok for tok in _TOKEN_SEP.split(t) if tok] for t in self.titles]
+        self.tokens = [set(toks) for toks in self.split]
+        self._pieces: Dict[int, Dict[str, List[int]]] = {}
+
+    def link(self, uf: _UnionFind, nodes: List[int]) -> None:
+        """Union nodes[i] and nodes[j] for every similar pair (i, j)."""
+        if self.threshold > 1.0:
+            return
+        n = len(self.items)
+        local = _UnionFind(n)
+        by_token: Dict[str, List[int]] = {}
+        for idx, toks in enumerate(self.tokens):
+            for tok in toks:
+                by_token.setdefault(tok, []).append(idx)
+        for idxs in by_token.values():
+            for a, b in zip(idxs, idxs[1:]):
+                local.union(a, b, "title")
+
+        # Either side of a pair may be the shorter one the bound applies to, so
+        # partners are looked up through both their pieces and ours.
+        probes = [self._probe(idx) for idx in range(n)]
+        probed: Dict[str, List[int]] = {}
+        brute: List[int] = []
+        for idx, probe in enumerate(probes):
+            if probe is None:
+                brute.append(idx)
+                continue
+            for piece in probe:
+                probed.setdefault(piece, []).append(idx)
+        sizes = sorted({len(piece) for piece in probed})
+
+        # Candidate lookup is symmetric, so a pair is checked by whichever
+        # side comes first; members of a majority component are never anchors
+        # (their partners outside it are, and it only grows).
+        done = [False] * n
+        for s in range(n):
+            root = local.find(s)
+            if 2 * local.size[root] > n:
+                continue
+            done[s] = True
+            probe = probes[s]
+            pool: Iterable[int] = range(n)
+            if probe is not None:
+                lists: List[List[int]] = [brute]
+                lists.extend(self._piece_index(len(piece)).get(piece, []) for piece in probe)
+                for size in sizes:
+                    lists.extend(probed.get(sub, []) for sub in self._substrings(s, size))
+                if sum(map(len, lists)) < n:
+                    pool = set().union(*lists)
+            cands = sorted(j for j in pool if not done[j] and local.find(j) != root)
+            if not cands:
                 continue
-            j += 1
-        i += 1
+            scores = _batch_title_sim(
+                self.titles[s], [self.titles[j] for j in cands], self.threshold
+            )
+            for j, sc in zip(cands, scores):
+                if sc >= self.threshold:
+                    local.union(s, j, "title")
+        for idx in range(n):
+            uf.union(nodes[idx], nodes[local.find(idx)], "title")
+
+    def _piece_index(self, size: int) -> Dict[str, List[int]]:
+        """Titles containing each within-token substring of the given length."""
+        index = self._pieces.get(size)
+        if index is None:
+            index = {}
+            for idx in range(len(self.items)):
+                for sub in self._substrings(idx, size):
+                    index.setdefault(sub, []).append(idx)
+            self._pieces[size] = index
+        return index
+
+    def _substrings(self, idx: int, size: int) -> Set[str]:
+        if not size:
+            return set() if self.titles[idx] else {""}
+        return {tok[k : k + size] for tok in self.tokens[idx] for k in range(len(tok) - size + 1)}
+
+    def _probe(self, s: int) -> Optional[Set[str]]:
+        """Pieces of title s; any partner it must be checked against contains one.
 
-    return remaining, duplicates
+        Returns None when no bound holds (very short titles or low thresholds);
+        such titles are scored against every other title.
+        """
+        if self.threshold <= 0:
+            return None
+        title = self.titles[s]
+        if not title:
+            # "" only scores above zero against another empty title
+            return {""}
+        uniq = sorted(self.tokens[s])
+        probe: Set[str] = set()
+        # raw/sorted forms keep repeated tokens; token-set forms drop them
+        for toks, length in ((self.split[s], len(title)), (uniq, len(" ".join(uniq)))):
+            need = int(2 * length * (1 - self.threshold) / self.threshold + 1e-9) + 1
+            size = max(map(len, toks), default=0)
+            while size and sum(len(t) // size for t in toks) < need:
+                size -= 1
+            if not size:
+                return None
+            index = self._piece_index(size)
+            pieces = [
+                tok[k : k + size] for tok in toks for k in range(0, len(tok) - size + 1, size)
+            ]
+            # Pieces come from disjoint positions, so any `need` of them will do
+            pieces.sort(key=lambda x: (len(index.get(x, ())), x))
+            probe.update(pieces[:need])
+        return probe
 
 
-def _resolve_dupe(a: Bookmark, b: Bookmark, prefer_shorter_url: bool) -> Tuple[Bookmark, Bookmark]:
-    au = a.normalized_url or a.url or ""
-    bu = b.normalized_url or b.url or ""
-    if prefer_shorter_url and au and bu:
-        return (a, b) if len(au) <= len(bu) else (b, a)
-    # fallback: keep first
-    return a, b
+def _batch_title_sim(query: str, choices: List[str], threshold: float) -> List[float]:
+    """_title_sim(query, c) for many choices; values below threshold may read as 0."""
+    try:
+        import numpy as np  # type: ignore
+        from rapidfuzz import process
+    except Exception:  # pragma: no cover - numpy is optional
+        return [_title_sim(query, c) for c in choices]
+    # Slightly lower cutoff: the final comparison must match `max(...) / 100 >= t`
+    cutoff = max(0.0, threshold * 100 - 1e-6)
+    best = np.zeros(len(choices), dtype=np.float64)
+    pending = np.arange(len(choices))
+    # Cheapest scorers first; choices already at the threshold skip the rest
+    for scorer in _BATCH_ORDER:
+        m = process.cdist(
+            [query],
+            [choices[k] for k in pending],
+            scorer=scorer,
+            score_cutoff=cutoff,
+            dtype=np.float64,
+        )
+        best[pending] = np.maximum(best[pending], m[0])
+        pending = pending[best[pending] / 100.0 < threshold]
+        if not len(pending):
+            break
+    return [float(x) / 100.0 for x in best]
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+# Domain -> tags lookup with longest-suffix matching.
+#
+# Keys are stored with their labels reversed ("gist.github.com" ->
+# "com.github.gist"), so a host's candidate rules are the label-boundary
+# prefixes of its reversed form, tried longest first: a `github.com` rule
+# covers `docs.github.com` unless a more specific rule exists.
+#
+# Large domain lists (category or blocklist feeds with millions of entries)
+# can be compiled once into a file that is searched in place through mmap, so
+# loading costs no parsing at all: the reversed keys' bytes, an open-addressing
+# table of CRC32-hashed slots pointing at them (linear probing), and the
+# distinct tag sets as JSON, decoded on first use.
+
+import hashlib
+import itertools
+import json
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+# magic; key, tag set and hash slot counts; then the offsets of the key bytes,
+# the key tables (end offsets + tag set ids), the slot table and the tag sets
+# (end offsets + JSON). Tables are native little-endian uint32.
+_HEADER = struct.Struct("<8sIII4xQQQQ")
+_MAGIC = b"CBDOMIX2"
+
+
+class DomainIndexError(ValueError):
+    pass
+
+
+def host_of(url: str) -> Optional[str]:
+    """Lowercased host of a URL without userinfo, port or trailing dot."""
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return None
+    host = (host or "").rstrip(".")
+    return host or None
+
+
+def _clean_domain(domain: str) -> str:
+    d = domain.strip().lower().rstrip(".")
+    if d.startswith("*."):
+        d = d[2:]
+    return d.lstrip(".").split(":", 1)[0]
+
+
+def _reverse(domain: str) -> str:
+    return ".".join(reversed(domain.split(".")))
+
+
+def _suffix_keys(host: str) -> Iterator[str]:
+    """Reversed-label keys for `host` and each parent domain, longest first."""
+    rkey = _reverse(host)
+    while rkey:
+        yield rkey
+        cut = rkey.rfind(".")
+        rkey = rkey[:cut] if cut > 0 else ""
+
+
+class DomainIndex:
+    """In-memory longest-suffix lookup, e.g. for the `domains:` rules section."""
+
+    def __init__(self, mapping: Optional[Mapping[str, Sequence[str]]] = None) -> None:
+        self._tags: Dict[str, List[str]] = {}
+        for domain, tags in (mapping or {}).items():
+            d = _clean_domain(str(domain))
+            if d:
+                _merge(self._tags.setdefault(_reverse(d), []), tags)
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def _get(self, rkey: str) -> Optional[List[str]]:
+        return self._tags.get(rkey)
+
+    def lookup(self, host: str) -> Optional[List[str]]:
+        """Tags of the most specific rule covering `host`, or None."""
+        for rkey in _suffix_keys(_clean_domain(host)):
+            tags = self._get(rkey)
+            if tags is not None:
+                return tags
+        return None
+
+    def match_url(self, url: str) -> Optional[List[str]]:
+        host = host_of(url)
+        return self.lookup(host) if host else None
+
+
+class MappedDomainIndex(DomainIndex):
+    """A compiled index file (see compile_domain_index), searched through mmap.
+
+    Nothing is parsed on load: each suffix lookup hashes the reversed key into
+    an open-addressing slot table in the file and compares key bytes in place.
+    Tag sets are decoded on first use.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with open(path, "rb") as fp:
+            self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < _HEADER.size or sys.byteorder != "little":
+            self._mm.close()
+            raise DomainIndexError(f"{path}: not a domain index")
+        magic, n_keys, n_sets, n_slots, key_off, idx_off, slot_off, tag_off = _HEADER.unpack_from(
+            self._mm
+        )
+        if magic != _MAGIC:
+            self._mm.close()
+            raise DomainIndexError(f"{path}: not a domain index")
+        self._n = n_keys
+        self._key_off = key_off
+        self._tag_off = tag_off + 4 * (n_sets + 1)
+        view = memoryview(self._mm)
+        self._key_ends = view[idx_off : idx_off + 4 * (n_keys + 1)].cast("I")
+        self._key_sets = view[idx_off + 4 * (n_keys + 1) : slot_off].cast("I")
+        self._slots = view[slot_off : slot_off + 4 * n_slots].cast("I")
+        self._tag_ends = view[tag_off : self._tag_off].cast("I")
+        self._mask = n_slots - 1
+        self._sets: Dict[int, List[str]] = {}
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _get(self, rkey: str) -> Optional[List[str]]:
+        target = rkey.encode("utf-8")
+        mm, ends, slots, mask, base = (
+            self._mm,
+            self._key_ends,
+            self._slots,
+            self._mask,
+            self._key_off,
+        )
+        i = zlib.crc32(target) & mask
+        while True:
+            k = slots[i] - 1
+            if k < 0:
+                return None
+            if mm[base + ends[k] : base + ends[k + 1]] == target:
+                return self._tag_set(self._key_sets[k])
+            i = (i + 1) & mask
+
+    def _tag_set(self, s: int) -> List[str]:
+        tags = self._sets.get(s)
+        if tags is None:
+            raw = self._mm[
+                self._tag_off + self._tag_ends[s] : self._tag_off + self._tag_ends[s + 1]
+            ]
+            tags = self._sets[s] = json.loads(raw)
+        return tags
+
+    def close(self) -> None:
+        for view in (self._key_ends, self._key_sets, self._slots, self._tag_ends):
+            view.release()
+        self._mm.close()
+
+    def __enter__(self) -> "MappedDomainIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def _merge(into: List[str], tags: Iterable[str]) -> None:
+    for t in tags:
+        if str(t) not in into:
+            into.append(str(t))
+
+
+def read_domain_feed(path: Path) -> Iterator[Tuple[str, List[str]]]:
+    """(domain, tags) pairs from a text feed.
+
+    One entry per line, `domain<TAB>tag1,tag2` or `domain,tag1,tag2`; blank
+    lines and `#` comments are skipped. A YAML file is read as a rules file's
+    `domains:` section instead.
+    """
+    if path.suffix.lower() in (".yaml", ".yml"):
+        from .classify_rules import load_rules
+
+        for domain, tags in load_rules(path)["domains"].items():
+            yield str(domain), [str(t) for t in tags or ()]
+        return
+    with open(path, encoding="utf-8") as fp:
+        for line in fp:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if "\t" in line:
+                domain, _, rest = line.partition("\t")
+            else:
+                domain, _, rest = line.partition(",")
+            yield domain, [t.strip() for t in rest.split(",") if t.strip()]
+
+
+def compile_domain_index(entries: Iterable[Tuple[str, Sequence[str]]], path: Path) -> int:
+    """Write (domain, tags) entries as a MappedDomainIndex file; returns the key count.
+
+    Repeated domains have their tags merged; identical tag lists are stored once.
+    """
+    merged: Dict[bytes, List[str]] = {}
+    for domain, tags in entries:
+        d = _clean_domain(domain)
+        if d:
+            _merge(merged.setdefault(_reverse(d).encode("utf-8"), []), tags)
+    keys = sorted(merged)
+    set_ids: Dict[Tuple[str, ...], int] = {}
+    key_ends = array("I", [0])
+    key_sets = array("I")
+    end = 0
+    for k in keys:
+        end += len(k)
+        if end >= 1 << 32:
+            raise DomainIndexError("domain list too large for a 32-bit index")
+        key_ends.append(end)
+        key_sets.append(set_ids.setdefault(tuple(merged[k]), len(set_ids)))
+    tag_blobs = [json.dumps(list(tags), ensure_ascii=False).encode("utf-8") for tags in set_ids]
+    tag_ends = array("I", itertools.accumulate((len(b) for b in tag_blobs), initial=0))
+
+    # Open addressing at load factor <= 1/2; slot value = key number + 1
+    n_slots = 8
+    while n_slots < 2 * len(keys):
+        n_slots *= 2
+    slots = array("I", bytes(4 * n_slots))
+    mask = n_slots - 1
+    for n, k in enumerate(keys, 1):
+        i = zlib.crc32(k) & mask
+        while slots[i]:
+            i = (i + 1) & mask
+        slots[i] = n
+
+    key_off = _HEADER.size
+    idx_off = _align(key_off + end)
+    slot_off = idx_off + 4 * (len(key_ends) + len(key_sets))
+    tag_off = slot_off + 4 * n_slots
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fp:
+        fp.write(
+            _HEADER.pack(
+                _MAGIC, len(keys), len(tag_blobs), n_slots, key_off, idx_off, slot_off, tag_off
+            )
+        )
+        fp.write(b"".join(keys))
+        fp.write(b"\0" * (idx_off - key_off - end))
+        for table in (key_ends, key_sets, slots, tag_ends):
+            fp.write(table.tobytes())
+        fp.write(b"".join(tag_blobs))
+    tmp.replace(path)
+    return len(keys)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def open_domain_index(source: Path, cache_dir: Path) -> MappedDomainIndex:
+    """Map a domain list, compiling it into `cache_dir` when the source changed.
+
+    `source` is either a compiled index or a feed for read_domain_feed; the
+    compiled copy is rebuilt only when it is older than the source.
+    """
+    with open(source, "rb") as fp:
+        if fp.read(len(_MAGIC)) == _MAGIC:
+            return MappedDomainIndex(source)
+    digest = hashlib.sha1(str(source.resolve()).encode("utf-8")).hexdigest()[:16]
+    compiled = cache_dir / f"domains-{digest}.idx"
+    if not compiled.exists() or compiled.stat().st_mtime < source.stat().st_mtime:
+        compile_domain_index(read_domain_feed(source), compiled)
+    return MappedDomainIndex(compiled)
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+# Encoder backends for embeddings mode, all exposing SentenceTransformer's
+# `encode(texts, batch_size=..., normalize_embeddings=..., convert_to_numpy=...)`.
+#
+#   torch  sentence-transformers on PyTorch (the `embed` extra)
+#   onnx   an exported (optionally int8-quantized) ONNX model run with
+#          onnxruntime on CPU (the `onnx` extra); no torch import at all
+#
+# Export once, e.g. `optimum-cli export onnx --model
+# sentence-transformers/all-MiniLM-L6-v2 models/minilm-onnx`; see
+# benchmarks/bench_embed_backends.py for int8 quantization and a comparison.
+
+from pathlib import Path
+from typing import Any, List, Optional
+
+BACKENDS = ("torch", "onnx")
+# Preferred model file names inside an export directory
+_ONNX_FILES = ("model_quantized.onnx", "model.onnx", "onnx/model_quantized.onnx", "onnx/model.onnx")
+
+
+def backend_available(backend: str) -> bool:
+    try:
+        if backend == "torch":
+            import sentence_transformers  # type: ignore  # noqa: F401
+        elif backend == "onnx":
+            import onnxruntime  # type: ignore  # noqa: F401
+            import tokenizers  # type: ignore  # noqa: F401
+        else:
+            return False
+    except Exception:
+        return False
+    return True
+
+
+def load_model(model_name: str, *, backend: str = "torch", onnx_path: str = "", threads: int = 0):
+    """Model object for `backend`; `threads` > 0 caps its intra-op CPU threads."""
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer  # type: ignore
+
+        if threads > 0:
+            import torch  # type: ignore
+
+            torch.set_num_threads(threads)
+        return SentenceTransformer(model_name)
+    if backend == "onnx":
+        if not onnx_path:
+            raise ValueError("embeddings.backend 'onnx' needs embeddings.onnx_path")
+        return OnnxSentenceEncoder(Path(onnx_path).expanduser(), threads=threads)
+    raise ValueError(f"unknown embeddings backend {backend!r}; expected one of {BACKENDS}")
+
+
+def mean_pool(hidden: Any, mask: Any, *, normalize: bool = True) -> Any:
+    """Masked mean over the token axis of (batch, tokens, dim) hidden states."""
+    import numpy as np  # type: ignore
+
+    m = mask[..., None].astype(np.float32)
+    pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+    if normalize:
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    return pooled.astype(np.float32)
+
+
+class OnnxSentenceEncoder:
+    """Sentence embeddings from an ONNX export: tokenizer.json + model file.
+
+    `path` is an export directory (a quantized model file is preferred when
+    present) or a `.onnx` file next to its tokenizer.json. Pooling matches
+    all-MiniLM-L6-v2's sentence-transformers head: masked mean, then L2 norm.
+    """
+
+    def __init__(self, path: Path, *, max_length: int = 256, threads: int = 0) -> None:
+        import onnxruntime as ort  # type: ignore
+        from tokenizers import Tokenizer  # type: ignore
+
+        model_file = path if path.suffix == ".onnx" else _find_model_file(path)
+        if model_file is None:
+            raise FileNotFoundError(f"no ONNX model under {path}")
+        base = model_file.parent
+        tok_file = next(
+            (d / "tokenizer.json" for d in (base, base.parent) if (d / "tokenizer.json").exists()),
+            None,
+        )
+        if tok_file is None:
+            raise FileNotFoundError(f"no tokenizer.json next to {model_file}")
+        self.model_file = model_file
+        self.tokenizer = Tokenizer.from_file(str(tok_file))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+        opts = ort.SessionOptions()
+        if threads > 0:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(model_file), opts, providers=["CPUExecutionProvider"]
+        )
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def encode(
+        self,
+        texts: List[str],
+        *,
+        batch_size: int = 32,
+        normalize_embeddings: bool = True,
+        convert_to_numpy: bool = True,
+        **_: Any,
+    ) -> Any:
+        import numpy as np  # type: ignore
+
+        out: List[Any] = []
+        for start in range(0, len(texts), max(1, batch_size)):
+            enc = self.tokenizer.encode_batch(list(texts[start : start + batch_size]))
+            ids = np.array([e.ids for e in enc], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in enc], dtype=np.int64)
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self._inputs:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in enc], dtype=np.int64)
+            hidden = self.session.run(None, feeds)[0]
+            out.append(mean_pool(hidden, mask, normalize=normalize_embeddings))
+        if not out:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(out)
+
+
+def _find_model_file(directory: Path) -> Optional[Path]:
+    for name in _ONNX_FILES:
+        if (directory / name).exists():
+            return directory / name
+    return None
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+# Content-addressed cache of text embeddings.
+#
+# Vectors live in one append-only float32 file per model, read back through
+# np.memmap; the Storage sqlite maps (model, sha1 of text) to a row of that
+# file. Only texts without a row are sent to the encoder, so a rerun over
+# unchanged bookmarks does not even need to load the model. A model's ANN
+# index (ann.py), kept under `index_root`, is dropped along with its vectors.
+
+import hashlib
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .storage import Storage
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover - optional at runtime
+    np = None  # type: ignore
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def index_directory(root: Path, model: str) -> Path:
+    """Where the ANN index of `model`'s embeddings lives under `root`."""
+    return root / text_hash(model)[:16]
+
+
+class EmbeddingCache:
+    """Embeddings keyed by (model name, text hash), persisted under `directory`.
+
+    Switching models keeps the previous ones' vectors until more than
+    `max_models` models have been used; the least recently used are then
+    dropped, rows and vector file alike, and with them their ANN index
+    directory under `index_root` (see index_directory).
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        directory: Path,
+        *,
+        max_models: int = 2,
+        index_root: Optional[Path] = None,
+    ) -> None:
+        if np is None:  # pragma: no cover - numpy ships with the embed extra
+            raise RuntimeError("EmbeddingCache requires numpy")
+        self.storage = storage
+        self.directory = directory
+        self.max_models = max_models
+        self.index_root = index_root
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def _vector_path(self, model: str) -> Path:
+        return self.directory / f"{text_hash(model)[:16]}.f32"
+
+    def _matrix(self, model: str, dim: int) -> Any:
+        path = self._vector_path(model)
+        rows = path.stat().st_size // (4 * dim) if path.exists() else 0
+        if not rows:
+            return np.zeros((0, dim), dtype=np.float32)
+        return np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dim))
+
+    def encode(self, model: str, texts: List[str], encoder: Callable[[List[str]], Any]) -> Any:
+        """(len(texts), dim) float32 matrix; `encoder` only sees the texts not cached yet."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        hashes = [text_hash(t) for t in texts]
+        dim = {m: d for m, d, _ in self.storage.embedding_models()}.get(model)
+        rows: Dict[str, int] = {}
+        if dim is None:
+            # Clear leftovers of a run interrupted before the model was recorded
+            self._drop(model)
+        else:
+            stored = self.storage.get_embedding_rows(model, sorted(set(hashes)))
+            # Rows past the end of the file were lost with a partial write
+            count = len(self._matrix(model, dim))
+            rows = {h: r for h, r in stored.items() if r < count}
+
+        missing: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in rows:
+                missing.setdefault(h, t)
+        if missing:
+            fresh = np.asarray(encoder(list(missing.values())), dtype=np.float32)
+            if fresh.ndim != 2 or len(fresh) != len(missing):
+                raise ValueError("encoder must return one vector per text")
+            if dim is not None and fresh.shape[1] != dim:
+                # Same name, different output size: start this model over
+                self._drop(model)
+                return self.encode(model, texts, encoder)
+            dim = fresh.shape[1]
+            start = self._append(model, dim, fresh)
+            new_rows = {h: start + i for i, h in enumerate(missing)}
+            self.storage.put_embedding_rows(model, new_rows.items())
+            rows.update(new_rows)
+
+        assert dim is not None
+        self.storage.touch_embedding_model(model, dim, time.time())
+        self._evict()
+        return np.asarray(self._matrix(model, dim)[[rows[h] for h in hashes]])
+
+    def _append(self, model: str, dim: int, vectors: Any) -> int:
+        """Append rows to the model's vector file; returns the first new row."""
+        path = self._vector_path(model)
+        path.touch()
+        with open(path, "r+b") as fp:
+            start = fp.seek(0, 2) // (4 * dim)
+            # Drop a partial trailing row left by an interrupted write
+            fp.truncate(4 * dim * start)
+            fp.seek(4 * dim * start)
+            fp.write(np.ascontiguousarray(vectors).tobytes())
+        return start
+
+    def _drop(self, model: str) -> None:
+        self.storage.drop_embedding_model(model)
+        self._vector_path(model).unlink(missing_ok=True)
+        if self.index_root is not None:
+            shutil.rmtree(index_directory(self.index_root, model), ignore_errors=True)
+
+    def _evict(self) -> None:
+        for model, _, _ in self.storage.embedding_models()[self.max_models :]:
+            self._drop(model)
@@ -1,8 +1,32 @@
 from __future__ import annotations
 
-from typing import List, Optional
+# Page text for bookmarks (network.fetch_content).
+#
+# A fixed pool of `concurrent` workers pulls URLs from a small bounded queue
+# that is filled lazily from the input, so memory stays flat however many
+# URLs there are. Bodies are streamed through an incremental HTML text
+# extractor and the download stops once `max_chars` of text (or `max_bytes`
+# of body) is in; each page's text is handed on as soon as it is done. Bodies
+# are decoded with the charset of the Content-Type header or, without one, of
+# a <meta> tag in the first 1024 bytes of the body, the window HTML's own
+# prescan uses (UTF-8 if neither names one).
+
+import asyncio
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Any, Callable, Iterable, List, Optional, Tuple
 from .utils import Bookmark
 
+_SKIP_TAGS = frozenset({"script", "style", "noscript"})
+_CHUNK_BYTES = 16 * 1024
+# Body read per page at most, for pages that are mostly markup and scripts
+_MAX_BYTES = 1 << 20
+# Start of the body searched for a <meta> charset
+_PRESCAN_BYTES = 1024
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">
+_META_CHARSET = re.compile(rb"""<meta[^>]*?charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+
 
 def check_liveness(bookmarks: List[Bookmark], *, enabled: bool) -> None:
     # MVP: mark as 'unknown' if disabled; skip network operations.
@@ -13,68 +37,150 @@ def check_liveness(bookmarks: List[Bookmark], *, enabled: bool) -> None:
 
 
 def extract_text_from_html(html: str, max_chars: int = 2000) -> str:
-    # Light-weight text extraction using BeautifulSoup
-    try:
-        from bs4 import BeautifulSoup
-    except Exception:
-        return ""
-    soup = BeautifulSoup(html, "html.parser")
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
-    text = soup.get_text(separator=" ")
-    # Normalize whitespace
-    import re
-
-    text = re.sub(r"\s+", " ", text).strip()
-    if len(text) > max_chars:
-        text = text[:max_chars]
-    return text
-
-
-async def _fetch_one(
-    session, url: str, *, timeout: int, ua: str
-) -> Optional[str]:  # pragma: no cover - network
+    """Visible text of `html` (no script/style), whitespace collapsed, up to `max_chars`."""
+    parser = _TextExtractor(max_chars)
+    parser.feed(html)
+    parser.close()
+    return parser.text()
+
+
+class _TextExtractor(HTMLParser):
+    """Incremental visible-text extractor; `full` once `max_chars` are collected."""
+
+    def __init__(self, max_chars: int) -> None:
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.size = 0
+        self._skip = 0
+
+    @property
+    def full(self) -> bool:
+        return self.size > self.max_chars
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _SKIP_TAGS and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data: str) -> None:
+        if self._skip or self.full:
+            return
+        piece = " ".join(data.split())
+        if piece:
+            self.parts.append(piece)
+            self.size += len(piece) + 1
+
+    def text(self) -> str:
+        return " ".join(self.parts)[: self.max_chars]
+
+
+async def _fetch_text(
+    session: Any, url: str, *, timeout: int, ua: str, max_chars: int, max_bytes: int
+) -> Optional[str]:
+    """Text of the page at `url`, reading no more of the body than it takes."""
+    import aiohttp
+
     try:
-        async with session.get(url, timeout=timeout, headers={"User-Agent": ua}) as resp:
-            if resp.status >= 200 and resp.status < 400:
-                return await resp.text(errors="ignore")
+        async with session.get(
+            url, timeout=aiohttp.ClientTimeout(total=timeout), headers={"User-Agent": ua}
+        ) as resp:
+            if not 200 <= resp.status < 400:
+                return None
+            ctype = resp.headers.get("Content-Type", "").lower()
+            if ctype and "html" not in ctype and not ctype.startswith("text/"):
+                return None
+            decoder: Optional[codecs.IncrementalDecoder] = None
+            parser = _TextExtractor(max_chars)
+            # Chunks are whatever has arrived, so the prescan window is
+            # buffered before the charset is chosen
+            head = b""
+            read = 0
+            async for chunk in resp.content.iter_chunked(_CHUNK_BYTES):
+                read += len(chunk)
+                if decoder is None:
+                    head += chunk
+                    if not resp.charset and len(head) < _PRESCAN_BYTES and read < max_bytes:
+                        continue
+                    decoder = _decoder(resp.charset or _sniff_charset(head))
+                    chunk = head
+                parser.feed(decoder.decode(chunk))
+                if parser.full or read >= max_bytes:
+                    break
+            else:
+                if decoder is None:
+                    decoder = _decoder(resp.charset or _sniff_charset(head))
+                    parser.feed(decoder.decode(head))
+                parser.feed(decoder.decode(b"", final=True))
+            parser.close()
+            return parser.text()
     except Exception:
         return None
-    return None
 
 
-def enrich_with_content(  # pragma: no cover - network path is not covered in tests
-    bookmarks: List[Bookmark],
+def _sniff_charset(head: bytes) -> Optional[str]:
+    """Charset named by a <meta> tag in the start of an HTML body, if any."""
+    m = _META_CHARSET.search(head[:_PRESCAN_BYTES])
+    return m.group(1).decode("ascii") if m else None
+
+
+def _decoder(charset: Optional[str]) -> codecs.IncrementalDecoder:
+    try:
+        return codecs.getincrementaldecoder(charset or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def fetch_texts(
+    items: Iterable[Tuple[Any, str]],
+    on_text: Callable[[Any, str], None],
     *,
-    enabled: bool,
-    timeout_sec: int,
-    concurrent: int,
-    user_agent: str,
-    max_chars: int,
+    concurrent: int = 16,
+    timeout_sec: int = 8,
+    user_agent: str = "cbclean/0.1",
+    max_chars: int = 2000,
+    max_bytes: int = _MAX_BYTES,
 ) -> None:
-    if not enabled:
-        return
+    """Fetch the page text of each (key, url) and call `on_text(key, text)` as pages finish.
+
+    `items` is consumed lazily; failed and empty pages are skipped. A no-op
+    without aiohttp.
+    """
     try:
-        import asyncio
         import aiohttp
     except Exception:
         return
-    urls = [(i, b.url) for i, b in enumerate(bookmarks) if b.url]
-    if not urls:
-        return
+    workers = max(1, concurrent)
 
-    async def runner():  # pragma: no cover - network
-        conn = aiohttp.TCPConnector(limit=concurrent, ssl=False)
+    async def runner() -> None:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=2 * workers)
+
+        async def produce() -> None:
+            for item in items:
+                await queue.put(item)
+            for _ in range(workers):
+                await queue.put(None)
+
+        async def work(session: Any) -> None:
+            while (item := await queue.get()) is not None:
+                key, url = item
+                text = await _fetch_text(
+                    session,
+                    url,
+                    timeout=timeout_sec,
+                    ua=user_agent,
+                    max_chars=max_chars,
+                    max_bytes=max_bytes,
+                )
+                if text:
+                    on_text(key, text)
+
+        conn = aiohttp.TCPConnector(limit=workers, ssl=False)
         async with aiohttp.ClientSession(connector=conn) as session:
-            tasks = [
-                _fetch_one(session, url, timeout=timeout_sec, ua=user_agent) for _, url in urls
-            ]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            for (idx, _), html in zip(urls, results):
-                if isinstance(html, str) and html:
-                    snippet = extract_text_from_html(html, max_chars=max_chars)
-                    if snippet:
-                        bookmarks[idx].content_snippet = snippet
+            await asyncio.gather(produce(), *(work(session) for _ in range(workers)))
 
     try:  # pragma: no cover - network
         asyncio.run(runner())
@@ -85,3 +191,29 @@ def enrich_with_content(  # pragma: no cover - network path is not covered in te
             loop.run_until_complete(runner())
         finally:
             loop.close()
+
+
+def enrich_with_content(
+    bookmarks: List[Bookmark],
+    *,
+    enabled: bool,
+    timeout_sec: int,
+    concurrent: int,
+    user_agent: str,
+    max_chars: int,
+) -> None:
+    """Set `content_snippet` from each bookmark's page (see fetch_texts)."""
+    if not enabled:
+        return
+
+    def on_text(idx: int, text: str) -> None:
+        bookmarks[idx].content_snippet = text
+
+    fetch_texts(
+        ((i, b.url) for i, b in enumerate(bookmarks) if b.url),
+        on_text,
+        concurrent=concurrent,
+        timeout_sec=timeout_sec,
+        user_agent=user_agent,
+        max_chars=max_chars,
+    )
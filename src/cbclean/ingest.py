@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .backup import backup_file
+from .chrome_reader import read_chrome_json
+from .utils import Bookmark
+
+
+def discover_profiles(pattern: str) -> List[Path]:
+    """Expand a profile glob such as ``~/.config/google-chrome/*/Bookmarks``.
+
+    Paths are sorted so ingestion order (and everything downstream) is stable.
+    """
+    return sorted(Path(p) for p in glob.glob(os.path.expanduser(pattern)) if Path(p).is_file())
+
+
+def profile_name(path: Path) -> str:
+    # Chrome keeps one directory per profile: Default, "Profile 1", ...
+    return path.parent.name or "Default"
+
+
+def _load_profile(job: Tuple[str, Optional[str]]) -> List[Bookmark]:
+    # Top-level so it can be pickled into worker processes
+    src, backup_dir = job
+    path = Path(src)
+    name = profile_name(path)
+    if backup_dir:
+        backup_file(path, Path(backup_dir) / name)
+    items = read_chrome_json(path, profile=name)
+    # Chrome numbers nodes per profile: qualify ids so merged profiles don't collide
+    for b in items:
+        b.id = f"{name}:{b.id}"
+        if b.parent_id:
+            b.parent_id = f"{name}:{b.parent_id}"
+    return items
+
+
+def iter_profiles(
+    paths: List[Path], *, backup_dir: Optional[Path] = None, workers: int = 0
+) -> Iterator[Bookmark]:
+    """Back up and parse several profiles in parallel, merged in path order.
+
+    Each profile is handled by one worker process (backup + parse); results
+    are yielded profile by profile in the order of `paths`, regardless of
+    which worker finishes first. ``workers <= 0`` means one per CPU.
+    """
+    jobs = [(str(p), str(backup_dir) if backup_dir else None) for p in paths]
+    if not jobs:
+        return
+    n = workers if workers > 0 else (os.cpu_count() or 1)
+    n = min(n, len(jobs))
+    if n <= 1:
+        for job in jobs:
+            yield from _load_profile(job)
+        return
+    with ProcessPoolExecutor(max_workers=n) as pool:
+        for items in pool.map(_load_profile, jobs):
+            yield from items
+
+
+def load_profiles(
+    pattern: str, *, backup_dir: Optional[Path] = None, workers: int = 0
+) -> List[Bookmark]:
+    return list(iter_profiles(discover_profiles(pattern), backup_dir=backup_dir, workers=workers))
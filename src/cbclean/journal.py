@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+# Append-only checkpoint journal (JSON lines) for long runs.
+#
+# The first line is a header describing the run (for LLM classification: the
+# model and label set); every further line is one record, e.g. the answers of
+# one finished batch. Each append is flushed to the OS, which is all a killed
+# process needs; fsync (needed to survive a power loss) is batched every
+# `sync_every` records or `sync_interval` seconds and done on close, so
+# checkpointing costs about one write() per batch.
+#
+# On resume, records are replayed up to the first torn or unparsable line; the
+# file is cut back to there and appended to. A header that does not match the
+# current run discards the old journal.
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+
+class Journal:
+    """Writer for the journal at `path`; see the module comment.
+
+    With `append`, a journal of the same `header` is continued (its records
+    are in `records`); otherwise, or if the header differs, it starts empty.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        header: Dict[str, Any],
+        *,
+        append: bool = False,
+        sync_every: int = 64,
+        sync_interval: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.path = path
+        self.sync_every = max(1, sync_every)
+        self.sync_interval = sync_interval
+        self.clock = clock
+        self.records: List[Dict[str, Any]] = []
+        end = 0
+        self._fh: BinaryIO
+        if append:
+            self.records, end = _scan(path, header)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if end:
+            self._fh = open(path, "r+b")
+            self._fh.truncate(end)
+            self._fh.seek(end)
+        else:
+            self.records = []
+            self._fh = open(path, "wb")
+            self._fh.write(_line(header))
+            self._fh.flush()
+        self._pending = 0
+        self._synced_at = clock()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def append(self, record: Dict[str, Any]) -> None:
+        self._fh.write(_line(record))
+        self._fh.flush()
+        self._pending += 1
+        if self._pending >= self.sync_every or self.clock() - self._synced_at >= self.sync_interval:
+            self.sync()
+
+    def sync(self) -> None:
+        if self._pending:
+            os.fsync(self._fh.fileno())
+            self._pending = 0
+        self._synced_at = self.clock()
+
+    def close(self) -> None:
+        if not self._fh.closed:
+            self.sync()
+            self._fh.close()
+
+
+def read_journal(path: Path, header: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Records of the journal at `path` if it was written for `header`, else []."""
+    return _scan(path, header)[0]
+
+
+def _scan(path: Path, header: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], int]:
+    """(intact records, byte offset after the last of them); offset 0 = unusable."""
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return [], 0
+    records: List[Dict[str, Any]] = []
+    end = 0
+    expected: Optional[Dict[str, Any]] = header
+    while True:
+        nl = data.find(b"\n", end)
+        if nl < 0:
+            break
+        try:
+            obj = json.loads(data[end:nl])
+        except ValueError:
+            break
+        if expected is not None:
+            if obj != expected:
+                return [], 0
+            expected = None
+        elif isinstance(obj, dict):
+            records.append(obj)
+        else:
+            break
+        end = nl + 1
+    return records, end
+
+
+def _line(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+# Minimal pull tokenizer for large JSON documents (e.g. Chrome `Bookmarks`).
+#
+# The reader decodes the byte stream incrementally and exposes a cursor API
+# (peek / read_string / read_scalar / skip_value) so callers can walk the
+# document iteratively and skip sections they don't need without building
+# Python objects for them. Separators (',' and ':') are treated as whitespace:
+# callers know from context whether a string is a key or a value.
+
+import codecs
+import json
+import re
+from json.decoder import scanstring  # type: ignore[attr-defined]
+from typing import Any, BinaryIO, Optional
+
+_WS = re.compile(r"[ \t\n\r,:]*")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?")
+# String body up to (not including) the closing quote; stops early before a
+# trailing backslash whose escaped character is not buffered yet.
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+# Runs of characters that cannot open/close a container or start a string
+_SKIP_RUN = re.compile(r'[^"{}\[\]]+')
+_LITERALS = {"true": True, "false": False, "null": None}
+
+
+class JsonStreamError(ValueError):
+    pass
+
+
+_DECODER = json.JSONDecoder()
+
+
+class JsonReader:
+    def __init__(self, fp: BinaryIO, *, chunk_size: int = 1 << 16) -> None:
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int = 0) -> bool:
+        """Append the next chunk to the buffer; return False at end of input."""
+        if self._eof:
+            return False
+        data = self._fp.read(max(size, self._chunk_size))
+        if self._pos:
+            self._buf = self._buf[self._pos :]
+            self._pos = 0
+        if not data:
+            self._eof = True
+            self._buf += self._decoder.decode(b"", final=True)
+            return False
+        self._buf += self._decoder.decode(data)
+        return True
+
+    def peek(self) -> str:
+        """Return the next significant character without consuming it ('' at EOF)."""
+        while True:
+            m = _WS.match(self._buf, self._pos)
+            self._pos = m.end() if m else self._pos
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def consume(self, expected: str) -> None:
+        if self.peek() != expected:
+            raise JsonStreamError(f"expected {expected!r} at offset {self._pos}")
+        self._pos += 1
+
+    def read_string(self) -> str:
+        if self.peek() != '"':
+            raise JsonStreamError(f"expected string at offset {self._pos}")
+        # Locate the closing quote first so long strings are scanned once
+        scanned = 1
+        while True:
+            m = _STRING_BODY.match(self._buf, self._pos + scanned)
+            end = m.end() if m else self._pos + scanned
+            if end < len(self._buf) and self._buf[end] == '"':
+                break
+            scanned = end - self._pos
+            if not self._fill():
+                raise JsonStreamError("unterminated string")
+        try:
+            value, self._pos = scanstring(self._buf, self._pos + 1)
+        except json.JSONDecodeError as e:
+            raise JsonStreamError(str(e)) from e
+        return value
+
+    def read_scalar(self) -> Any:
+        """Read a string, number or literal at the cursor."""
+        c = self.peek()
+        if c == '"':
+            return self.read_string()
+        if c == "-" or c.isdigit():
+            while True:
+                m = _NUMBER.match(self._buf, self._pos)
+                if m and (m.end() < len(self._buf) or self._eof):
+                    break
+                if not self._fill():
+                    m = _NUMBER.match(self._buf, self._pos)
+                    break
+            if not m:
+                raise JsonStreamError(f"invalid number at offset {self._pos}")
+            text = m.group(0)
+            self._pos = m.end()
+            return float(text) if any(ch in text for ch in ".eE") else int(text)
+        for word, value in _LITERALS.items():
+            while len(self._buf) - self._pos < len(word) and self._fill():
+                pass
+            if self._buf.startswith(word, self._pos):
+                self._pos += len(word)
+                return value
+        raise JsonStreamError(f"unexpected {c!r} at offset {self._pos}")
+
+    def read_value(self) -> Optional[Any]:
+        """Read a scalar; containers are skipped and reported as None."""
+        if self.peek() in ("{", "["):
+            self.skip_value()
+            return None
+        return self.read_scalar()
+
+    def read_small_object(self, limit: int) -> Optional[Any]:
+        """Decode the container at the cursor if its text spans at most `limit` chars.
+
+        Returns None (cursor unchanged) for larger containers, so callers can
+        fall back to walking them token by token. The outcome depends only on
+        the document, not on how it was chunked.
+        """
+        while len(self._buf) - self._pos < limit and self._fill(limit):
+            pass
+        try:
+            value, end = _DECODER.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError as e:
+            if len(self._buf) - self._pos >= limit:
+                return None
+            raise JsonStreamError(str(e)) from e
+        except RecursionError:
+            # Too deeply nested for the C decoder: walk it token by token
+            return None
+        if end - self._pos > limit:
+            return None
+        self._pos = end
+        return value
+
+    def skip_value(self) -> None:
+        """Advance past the next value without materializing it."""
+        c = self.peek()
+        if not c:
+            raise JsonStreamError("unexpected end of input")
+        if c not in "{[":
+            if c == '"':
+                self._skip_string()
+            else:
+                self.read_scalar()
+            return
+        depth = 0
+        while True:
+            if self._pos >= len(self._buf) and not self._fill():
+                raise JsonStreamError("unexpected end of input")
+            c = self._buf[self._pos]
+            if c == '"':
+                self._skip_string()
+            elif c in "{[":
+                depth += 1
+                self._pos += 1
+            elif c in "}]":
+                depth -= 1
+                self._pos += 1
+                if depth == 0:
+                    return
+            else:
+                m = _SKIP_RUN.match(self._buf, self._pos)
+                self._pos = m.end() if m else self._pos + 1
+
+    def _skip_string(self) -> None:
+        i = self._pos + 1
+        while True:
+            m = _STRING_BODY.match(self._buf, i)
+            end = m.end() if m else i
+            if end < len(self._buf) and self._buf[end] == '"':
+                self._pos = end + 1
+                return
+            # Nothing before `end` is needed again: let _fill() drop it
+            self._pos = end
+            if not self._fill():
+                raise JsonStreamError("unterminated string")
+            i = self._pos
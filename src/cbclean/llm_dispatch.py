@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+# Concurrent dispatch of LLM batches.
+#
+# Requests go out from worker threads (the provider SDKs are synchronous)
+# driven by one asyncio loop that keeps up to `concurrency` batches in
+# flight, paces them through a token bucket for requests/min and tokens/min,
+# and retries rate limits (429), server errors (5xx) and dropped connections
+# with jittered exponential backoff.
+#
+# Results are handed back strictly in batch order. In ordered mode batch k is
+# only prepared once batches 0 .. k - concurrency have been handed back, so
+# whatever it depends on (the labels learned so far) is the same on every
+# run whatever the timing; with concurrency 1 that is the sequential loop.
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_RETRY_STATUS = {408, 429}
+_OVERFLOW_MARKERS = ("context_length_exceeded", "maximum context length", "too many tokens")
+_RETRY_NAMES = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to `per_minute`; 0 = unlimited.
+
+    A request larger than the whole bucket waits for a full bucket and then
+    leaves it in debt, so oversized batches are slowed down, not stuck.
+    """
+
+    def __init__(self, per_minute: float, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.clock = clock
+        self.stamp = clock()
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken; 0 = now."""
+        if self.rate <= 0:
+            return 0.0
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+        return max(0.0, min(amount, self.capacity) - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        if self.rate > 0:
+            self.level -= amount
+
+
+class RateLimiter:
+    """Requests/min and tokens/min buckets shared by all batches of a run."""
+
+    def __init__(self, requests_per_min: float = 0, tokens_per_min: float = 0) -> None:
+        self.requests = TokenBucket(requests_per_min)
+        self.tokens = TokenBucket(tokens_per_min)
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self, tokens: int) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # One waiter at a time keeps the grant order FIFO
+        async with self._lock:
+            while True:
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if not wait:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return
+                await asyncio.sleep(wait)
+
+
+@dataclass
+class RetryPolicy:
+    retries: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    def delay(self, attempt: int, exc: BaseException) -> float:
+        """Full-jitter backoff, or the server's Retry-After when it sends one."""
+        after = _retry_after(exc)
+        if after is not None:
+            return min(after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    """HTTP status carried by an SDK or urllib error, if any."""
+    for obj in (exc, getattr(exc, "response", None)):
+        for attr in ("status_code", "status", "code"):
+            value = getattr(obj, attr, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    status = error_status(exc)
+    if status is not None:
+        return status in _RETRY_STATUS or status >= 500
+    return isinstance(exc, (ConnectionError, TimeoutError)) or type(exc).__name__ in _RETRY_NAMES
+
+
+def is_context_overflow(exc: BaseException) -> bool:
+    """Whether the provider rejected a request for being too long."""
+    status = error_status(exc)
+    if status == 413:
+        return True
+    text = str(exc).lower()
+    return (status is None or status == 400) and any(m in text for m in _OVERFLOW_MARKERS)
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or getattr(
+        exc, "headers", None
+    )
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+def dispatch(
+    count: int,
+    prepare: Callable[[int], Tuple[Any, int]],
+    send: Callable[[Any], Any],
+    finish: Callable[[int, Any], None],
+    *,
+    concurrency: int = 4,
+    ordered: bool = True,
+    limiter: Optional[RateLimiter] = None,
+    retry: Optional[RetryPolicy] = None,
+) -> None:
+    """Run batches 0 .. count - 1 through `send` with up to `concurrency` in flight.
+
+    `prepare(k)` returns batch k's request and its estimated token count;
+    `send(request)` performs it (in a worker thread) and returns the reply;
+    `finish(k, reply)` is called in batch order on the calling thread. With
+    `ordered`, prepare(k) runs only after finish(k - concurrency); otherwise
+    batches start as soon as a slot is free. The first error that is not
+    retryable (or outlasts the retries) is raised once in-flight batches end.
+    """
+    if count <= 0:
+        return
+    concurrency = max(1, concurrency)
+    retry = retry or RetryPolicy()
+    limiter = limiter or RateLimiter()
+
+    async def run() -> None:
+        done: Dict[int, Any] = {}
+        state = {"finished": 0, "running": 0, "failed": False}
+        changed = asyncio.Condition()
+
+        async def request(k: int) -> Any:
+            payload, tokens = prepare(k)
+            attempt = 0
+            while True:
+                await limiter.acquire(tokens)
+                try:
+                    return await asyncio.to_thread(send, payload)
+                except Exception as exc:  # noqa: BLE001 - classified below
+                    if attempt >= retry.retries or not is_retryable(exc):
+                        raise
+                    delay = retry.delay(attempt, exc)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+        async def one(k: int) -> None:
+            try:
+                reply = await request(k)
+                async with changed:
+                    done[k] = reply
+                    while state["finished"] in done:
+                        finish(state["finished"], done.pop(state["finished"]))
+                        state["finished"] += 1
+            except BaseException:
+                state["failed"] = True
+                raise
+            finally:
+                async with changed:
+                    state["running"] -= 1
+                    changed.notify_all()
+
+        def may_start(k: int) -> bool:
+            if state["failed"]:
+                return True
+            if ordered:
+                return state["finished"] > k - concurrency
+            return state["running"] < concurrency
+
+        tasks = []
+        try:
+            for k in range(count):
+                async with changed:
+                    await changed.wait_for(lambda: may_start(k))
+                    if state["failed"]:
+                        break
+                    state["running"] += 1
+                tasks.append(asyncio.create_task(one(k)))
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            for t in tasks:
+                t.cancel()
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise errors[0]
+
+    asyncio.run(run())
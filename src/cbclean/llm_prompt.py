@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+# Compact prompt encoding for LLM classification (categorize.llm.compact_prompt).
+#
+# * The instructions and the configured labels form a system message that is
+#   identical for every batch of a run (and across runs), so providers with
+#   prefix caching bill and process it once; only labels learned during the
+#   run travel with each batch.
+# * URLs lose their scheme and "www.", and hosts seen more than once in a
+#   batch are replaced by a short alias defined in a legend line.
+# * Page snippets are cut to their most informative sentences under a
+#   per-item character budget (see trim_snippet).
+
+import re
+from typing import Dict, List, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from .utils import Bookmark
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\s*[\n|•·]\s*")
+_WORDS = re.compile(r"\w{3,}")
+_STOPWORDS = frozenset(
+    """the and for are but not you all any can had her was one our out has have this that
+    with from they will would there their what about which when make like time just know
+    take into your some could them than then its also use how our more these other cookies
+    cookie privacy policy accept sign login log subscribe menu skip content navigation
+    copyright rights reserved""".split()
+)
+
+
+def compact_system(
+    labels: Sequence[str], *, allow_new_labels: bool = True, max_new: int = 10
+) -> str:
+    lines = [
+        "You classify bookmarks into 1-2 topical labels each.",
+        f"Allowed labels (exact strings): [{', '.join(labels)}]",
+        "Hierarchical labels like 'Dev/Linux' are used as is. No language or country labels.",
+    ]
+    if allow_new_labels:
+        lines.append(
+            f"You may invent up to {max_new} new concise topical labels (1-3 words per "
+            "'/' segment) when none fit; avoid generic buckets like 'Tools'."
+        )
+    lines += [
+        "Input: one line per bookmark, `[index] title | url`; `~N` in a url stands for "
+        "the host given for it under Hosts; an indented `>` line is an excerpt of the page.",
+        'Reply with JSON only: {"assignments": [{"index": 0, "labels": ["..."]}], '
+        '"new_labels": ["..."]}',
+    ]
+    return "\n".join(lines)
+
+
+def build_compact_prompt(
+    items: Sequence[Bookmark], extra_labels: Sequence[str] = (), *, snippet_chars: int = 300
+) -> str:
+    """User message for `items`; `extra_labels` are allowed on top of the system list."""
+    lines: List[str] = []
+    if extra_labels:
+        lines.append(f"Also allowed: [{', '.join(extra_labels)}]")
+    urls, legend = factor_hosts([b.url or "" for b in items])
+    if legend:
+        lines.append("Hosts: " + " ".join(f"~{n}={host}" for host, n in legend.items()))
+    for idx, (b, url) in enumerate(zip(items, urls)):
+        lines.extend(compact_item_lines(idx, b, url, snippet_chars=snippet_chars))
+    return "\n".join(lines)
+
+
+def compact_item_lines(idx: int, b: Bookmark, url: str, *, snippet_chars: int = 300) -> List[str]:
+    lines = [f"[{idx}] {b.title or ''} | {url}"]
+    if b.content_snippet and snippet_chars > 0:
+        excerpt = trim_snippet(b.content_snippet, snippet_chars, title=b.title or "")
+        if excerpt:
+            lines.append(f"  > {excerpt}")
+    return lines
+
+
+def bare_url(url: str) -> str:
+    """URL without scheme, "www." and trailing slash."""
+    rest = url.split("://", 1)[1] if "://" in url else url
+    if rest.startswith("www."):
+        rest = rest[4:]
+    return rest[:-1] if rest.endswith("/") else rest
+
+
+def factor_hosts(urls: Sequence[str]) -> Tuple[List[str], Dict[str, int]]:
+    """(shortened urls, host -> alias number) for hosts occurring more than once."""
+    bare = [bare_url(u) for u in urls]
+    hosts = []
+    for u, b in zip(urls, bare):
+        try:
+            host = urlsplit(u).netloc
+        except ValueError:
+            host = ""
+        host = host[4:] if host.startswith("www.") else host
+        hosts.append(host if host and b.startswith(host) else "")
+    counts: Dict[str, int] = {}
+    for host in hosts:
+        if host:
+            counts[host] = counts.get(host, 0) + 1
+    legend: Dict[str, int] = {}
+    out: List[str] = []
+    for b, host in zip(bare, hosts):
+        # An alias only pays off when it is shorter than the host itself
+        if host and counts[host] > 1 and len(host) > 4:
+            n = legend.setdefault(host, len(legend) + 1)
+            b = f"~{n}{b[len(host):]}"
+        out.append(b)
+    return out, legend
+
+
+def trim_snippet(text: str, max_chars: int, *, title: str = "") -> str:
+    """The most informative sentences of `text` within `max_chars`, in their original order.
+
+    Sentences are scored by distinct content words not already in the title,
+    discounted by length, so boilerplate and repetition lose to sentences
+    that say what the page is about.
+    """
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    known = {w.lower() for w in _WORDS.findall(title)}
+    sentences = [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+    scored = []
+    for pos, sentence in enumerate(sentences):
+        words = {w.lower() for w in _WORDS.findall(sentence)} - known - _STOPWORDS
+        if words:
+            scored.append((len(words) / (len(sentence) ** 0.5), pos))
+    picked: List[int] = []
+    used = 0
+    seen: set = set()
+    for _, pos in sorted(scored, key=lambda s: (-s[0], s[1])):
+        sentence = sentences[pos]
+        if sentence.lower() in seen or used + len(sentence) + 1 > max_chars:
+            continue
+        seen.add(sentence.lower())
+        picked.append(pos)
+        used += len(sentence) + 1
+    if not picked:
+        # Every sentence is too long: cut the best one at a word boundary
+        best = sentences[max(scored, key=lambda s: (s[0], -s[1]))[1]] if scored else text
+        return best[:max_chars].rsplit(" ", 1)[0]
+    return " ".join(sentences[pos] for pos in sorted(picked))
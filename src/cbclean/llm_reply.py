@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+# Incremental parser for LLM classification replies.
+#
+# Replies are {"assignments": [{"index": 0, "labels": [...]}, ...],
+# "new_labels": [...]} or a bare list of assignments, possibly wrapped in
+# prose or code fences. Leading prose is skipped up to the first "{"; a "["
+# only opens the reply at its very start or inside a code fence, so brackets
+# in prose ("Here are [the] labels") are not taken for the value.
+#
+# The parser is fed text as it arrives (a whole reply or the deltas of a
+# streamed one) and decodes each assignment object the moment its closing
+# brace arrives, so a reply cut off by the token limit or a dropped
+# connection still yields every assignment it completed. `complete` tells
+# whether the top-level value was closed.
+
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+
+class ReplyParser:
+    """Push parser for one reply; see the module comment."""
+
+    def __init__(self) -> None:
+        self.assignments: List[Any] = []
+        self.new_labels: List[str] = []
+        self.complete = False
+        self._buf = ""
+        self._pos = 0
+        # Open containers: (bracket, start offset, key in the top-level object)
+        self._stack: List[Tuple[str, int, Optional[str]]] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        # Before the value: whether a code fence / other prose was seen
+        self._fenced = False
+        self._prose = False
+
+    def feed(self, text: str) -> List[Any]:
+        """Consume `text`; returns the assignments it completed."""
+        start = len(self.assignments)
+        self._buf += text
+        buf, stack = self._buf, self._stack
+        i = self._pos
+        n = len(buf)
+        while i < n and not self.complete:
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(stack) == 1 and stack[0][0] == "{":
+                        self._last_key = _loads(buf[self._string_start : i + 1])
+            elif not stack:
+                # Prose or a code fence before the reply proper
+                if c == "{" or (c == "[" and (self._fenced or not self._prose)):
+                    stack.append((c, i, None))
+                elif c == "`" and buf.endswith("```", 0, i + 1):
+                    self._fenced = True
+                elif not c.isspace():
+                    self._prose = True
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                key = self._last_key if len(stack) == 1 and stack[0][0] == "{" else None
+                stack.append((c, i, key))
+            elif c in "}]":
+                bracket, begin, key = stack.pop()
+                self._closed(bracket, begin, key, buf[begin : i + 1])
+            i += 1
+        self._pos = i
+        return self.assignments[start:]
+
+    def _closed(self, bracket: str, begin: int, key: Optional[str], text: str) -> None:
+        if not self._stack:
+            self.complete = True
+            return
+        parent, _, parent_key = self._stack[-1]
+        if bracket == "[" and key == "new_labels" and len(self._stack) == 1:
+            value = _loads(text)
+            if isinstance(value, list):
+                self.new_labels = [str(x) for x in value]
+        elif bracket == "{" and parent == "[" and self._in_assignments(parent_key):
+            value = _loads(text)
+            if isinstance(value, dict):
+                self.assignments.append(value)
+
+    def _in_assignments(self, key: Optional[str]) -> bool:
+        """Whether the innermost open array holds the assignments."""
+        if len(self._stack) == 1:
+            return True  # a bare list
+        return len(self._stack) == 2 and self._stack[0][0] == "{" and key == "assignments"
+
+
+class TruncatedReplyError(ConnectionError):
+    """A reply cut off before its first assignment; retried like a dropped connection."""
+
+
+def parse_reply(chunks: Iterable[str]) -> ReplyParser:
+    """Parse a whole reply (a string) or the text deltas of a streamed one."""
+    parser = ReplyParser()
+    if isinstance(chunks, str):
+        chunks = [chunks]
+    for text in chunks:
+        parser.feed(text)
+        if parser.complete:
+            break
+    return parser
+
+
+def _loads(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
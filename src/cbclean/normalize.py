@@ -1,18 +1,117 @@
 from __future__ import annotations
 
-from typing import List
-from .utils import Bookmark, normalize_url
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import urlsplit, urlunsplit
+
+from .config import NormalizeCfg
+from .utils import _MULTI_SLASH, Bookmark, strip_www as _strip_www
+
+# Trie key marking the end of a glob prefix
+_END = ""
+# Character trie: char -> subtrie (plus _END -> {} where a prefix ends)
+_Trie = Dict[str, "_Trie"]
+
+
+class _ParamMatcher:
+    """Query-key matcher for `strip_query_params` (see utils.fnmatch_like).
+
+    Exact names go into a set; `prefix*` globs into a character trie, so a key
+    is checked in one walk of at most len(longest prefix) steps instead of one
+    comparison per pattern.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.exact: Set[str] = set()
+        self.trie: _Trie = {}
+        for pat in patterns:
+            if not pat.endswith("*"):
+                self.exact.add(pat)
+                continue
+            node = self.trie
+            for ch in pat[:-1]:
+                node = node.setdefault(ch, {})
+            node[_END] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.exact or self.trie)
+
+    def __call__(self, key: str) -> bool:
+        if key in self.exact:
+            return True
+        node = self.trie
+        for ch in key:
+            if _END in node:
+                return True
+            child = node.get(ch)
+            if child is None:
+                return False
+            node = child
+        return _END in node
+
+
+class UrlNormalizer:
+    """Reusable `utils.normalize_url` with precompiled patterns and an LRU cache.
+
+    Build it once per run (see from_config); bookmark sets repeat URLs a lot,
+    so results are memoized on the raw URL, up to `cache_size` entries.
+    """
+
+    def __init__(
+        self,
+        *,
+        strip_params: List[str],
+        strip_fragments: bool,
+        strip_www: bool,
+        cache_size: int = 1 << 16,
+    ) -> None:
+        self.strip_fragments = strip_fragments
+        self.strip_www = strip_www
+        self._strip = _ParamMatcher(strip_params)
+        self.normalize = lru_cache(maxsize=cache_size)(self._normalize)
+
+    @classmethod
+    def from_config(cls, cfg: NormalizeCfg, **kwargs) -> "UrlNormalizer":
+        return cls(
+            strip_params=cfg.strip_query_params,
+            strip_fragments=cfg.strip_fragments,
+            strip_www=cfg.strip_www,
+            **kwargs,
+        )
+
+    def normalize_many(self, urls: Iterable[Optional[str]]) -> List[Optional[str]]:
+        """Normalize a batch; None entries stay None."""
+        normalize = self.normalize
+        return [normalize(u) if u else None for u in urls]
+
+    def _normalize(self, url: str) -> str:
+        try:
+            parts = urlsplit(url)
+        except Exception:
+            return url
+        netloc = _strip_www(parts.netloc) if self.strip_www else parts.netloc
+        path = parts.path
+        if "//" in path:
+            path = _MULTI_SLASH.sub("/", path)
+        query = self._filter_query(parts.query)
+        fragment = "" if self.strip_fragments else parts.fragment
+        return urlunsplit((parts.scheme.lower(), netloc, path or "/", query, fragment))
+
+    def _filter_query(self, query: str) -> str:
+        if not query:
+            return ""
+        strip = self._strip
+        if not strip:
+            return "&".join(p for p in query.split("&") if p)
+        return "&".join(p for p in query.split("&") if p and not strip(p.split("=", 1)[0]))
 
 
 def normalize_bookmarks(
     bookmarks: List[Bookmark], *, strip_params: List[str], strip_fragments: bool, strip_www: bool
 ) -> None:
-    for b in bookmarks:
-        if not b.url:
-            continue
-        b.normalized_url = normalize_url(
-            b.url,
-            strip_params=strip_params,
-            strip_fragments=strip_fragments,
-            strip_www_flag=strip_www,
-        )
+    normalizer = UrlNormalizer(
+        strip_params=strip_params, strip_fragments=strip_fragments, strip_www=strip_www
+    )
+    for b, url in zip(bookmarks, normalizer.normalize_many(b.url for b in bookmarks)):
+        if url is not None:
+            b.normalized_url = url
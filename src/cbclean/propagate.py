@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+# Label propagation within site sections (categorize.propagate).
+#
+# Bookmarks are grouped by host (without "www.") and the first `depth`
+# directories of their URL path, e.g. docs.python.org/3/library for
+# .../3/library/os.html. Small groups are classified one by one. Larger ones
+# send an evenly spread sample to the classifier; the labels given to at
+# least `min_agreement` of the sample are propagated to the rest of the group,
+# scored with that share. Members whose title has none of the words every
+# sampled title has (a page that does not look like its section) are
+# classified on their own, as are whole groups whose sample disagrees.
+
+import re
+from typing import Callable, Dict, List, Sequence, Set, Tuple
+from urllib.parse import urlsplit
+
+from .domains import host_of
+from .utils import Bookmark, add_tags
+
+_WORDS = re.compile(r"\w{3,}")
+
+
+def group_key(b: Bookmark, depth: int = 2) -> str:
+    """Host and the first `depth` directories of the bookmark's URL path."""
+    url = b.normalized_url or b.url or ""
+    host = host_of(url) or ""
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        path = urlsplit(url).path
+    except ValueError:
+        path = ""
+    dirs = [p for p in path.split("/")[:-1] if p]
+    return "/".join([host, *dirs[:depth]])
+
+
+def classify_by_groups(
+    bookmarks: List[Bookmark],
+    classify: Callable[[List[Bookmark]], None],
+    *,
+    depth: int = 2,
+    min_group: int = 6,
+    sample: int = 3,
+    min_agreement: float = 0.8,
+) -> Dict[str, int]:
+    """Classify `bookmarks` with `classify`, propagating labels within groups.
+
+    `classify(items)` tags the items in place (a classifier with its
+    settings bound); it is called at most twice. Returns counts: groups
+    whose labels were propagated, bookmarks sampled, labelled by
+    propagation (the model classifications saved) and re-checked.
+    """
+    sample = max(1, sample)
+    groups: Dict[str, List[Bookmark]] = {}
+    for b in bookmarks:
+        groups.setdefault(group_key(b, depth), []).append(b)
+    first: List[Bookmark] = []
+    sampled: List[Tuple[List[Bookmark], List[Bookmark]]] = []
+    for members in groups.values():
+        if len(members) < max(min_group, sample + 1):
+            first.extend(members)
+            continue
+        members = sorted(members, key=lambda b: b.normalized_url or b.url or "")
+        picks = _spread(len(members), sample)
+        chosen = [members[i] for i in picks]
+        first.extend(chosen)
+        sampled.append((chosen, [m for i, m in enumerate(members) if i not in picks]))
+    counts = {"groups": 0, "sampled": 0, "propagated": 0, "rechecked": 0}
+    if not first:
+        return counts
+    before = {id(b): set(b.tags or ()) for b in first}
+    classify(first)
+
+    second: List[Bookmark] = []
+    for chosen, rest in sampled:
+        counts["sampled"] += len(chosen)
+        added = [set(b.tags or ()) - before[id(b)] for b in chosen]
+        consensus = _consensus(added, min_agreement)
+        if not consensus:
+            second.extend(rest)
+            continue
+        counts["groups"] += 1
+        common = set.intersection(*(_title_words(b) for b in chosen))
+        for b in rest:
+            if common and not common & _title_words(b):
+                counts["rechecked"] += 1
+                second.append(b)
+                continue
+            for tag, share in consensus.items():
+                add_tags(b, [tag], share)
+            counts["propagated"] += 1
+    if second:
+        classify(second)
+    return counts
+
+
+def _spread(n: int, k: int) -> Set[int]:
+    """k indices spread evenly over range(n)."""
+    return {min(n - 1, int((i + 0.5) * n / k)) for i in range(min(k, n))}
+
+
+def _consensus(added: Sequence[Set[str]], min_agreement: float) -> Dict[str, float]:
+    """Labels given to at least `min_agreement` of the sample, with their share."""
+    shares: Dict[str, float] = {}
+    for labels in added:
+        for t in labels:
+            shares[t] = shares.get(t, 0.0) + 1.0 / len(added)
+    return {t: round(s, 6) for t, s in shares.items() if s >= min_agreement - 1e-9}
+
+
+def _title_words(b: Bookmark) -> Set[str]:
+    return {w.lower() for w in _WORDS.findall(b.title or "")}
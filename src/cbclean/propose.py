@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
+from .dedup import DuplicateGroup
 from .utils import Bookmark
 
 
@@ -10,15 +11,33 @@ class PlanItem:
     action: str
     reason: str
     bookmark_id: str
+    # Survivor a duplicate was merged into
+    target_id: Optional[str] = None
 
 
 def propose_changes(
-    original: List[Bookmark], deduped: List[Bookmark], duplicates: List[Bookmark]
+    original: List[Bookmark],
+    deduped: List[Bookmark],
+    duplicates: List[Bookmark],
+    *,
+    groups: Optional[List[DuplicateGroup]] = None,
 ) -> List[PlanItem]:
     plan: List[PlanItem] = []
     # Duplicates: move to trash
-    for b in duplicates:
-        plan.append(PlanItem(action="move_to/_Trash", reason="duplicate", bookmark_id=b.id))
+    if groups is not None:
+        for g in groups:
+            for b in g.duplicates:
+                plan.append(
+                    PlanItem(
+                        action="move_to/_Trash",
+                        reason="duplicate",
+                        bookmark_id=b.id,
+                        target_id=g.survivor.id,
+                    )
+                )
+    else:
+        for b in duplicates:
+            plan.append(PlanItem(action="move_to/_Trash", reason="duplicate", bookmark_id=b.id))
     # Normalization changes: indicate update
     for b in deduped:
         if b.url and b.normalized_url and b.url != b.normalized_url:
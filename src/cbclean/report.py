@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 from jinja2 import Environment, FileSystemLoader, select_autoescape
+from .dedup import DuplicateGroup
 from .utils import Bookmark, ensure_dir
 
 
@@ -14,6 +15,8 @@ def render_reports(
     out_dir: Path,
     formats: List[str],
     templates_dir: Path,
+    groups: Optional[List[DuplicateGroup]] = None,
+    related: Optional[Dict[str, List[Tuple[Bookmark, float]]]] = None,
 ) -> None:
     env = Environment(
         loader=FileSystemLoader(str(templates_dir)),
@@ -26,6 +29,8 @@ def render_reports(
         "duplicates": len(duplicates),
         "by_folder": _by_folder(bookmarks),
         "plan": plan,
+        "groups": _groups(groups or []),
+        "related": _related(bookmarks, related or {}),
     }
     ensure_dir(out_dir)
     if "html" in formats:
@@ -42,3 +47,34 @@ def _by_folder(bookmarks: List[Bookmark]) -> Dict[str, int]:
         key = b.folder_path or "Bookmarks"
         m[key] = m.get(key, 0) + 1
     return dict(sorted(m.items(), key=lambda kv: kv[0]))
+
+
+def _groups(groups: List[DuplicateGroup]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "survivor_id": g.survivor.id,
+            "title": g.survivor.title,
+            "url": g.survivor.normalized_url or g.survivor.url or "",
+            "size": len(g.duplicates) + 1,
+            "reasons": ", ".join(sorted(g.reasons)),
+            "duplicate_ids": [b.id for b in g.duplicates],
+        }
+        for g in groups
+    ]
+
+
+def _related(
+    bookmarks: List[Bookmark], related: Dict[str, List[Tuple[Bookmark, float]]]
+) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": b.id,
+            "title": b.title,
+            "related": [
+                {"id": r.id, "title": r.title, "url": r.normalized_url or r.url or "", "score": s}
+                for r, s in related[b.id]
+            ],
+        }
+        for b in bookmarks
+        if related.get(b.id)
+    ]
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import json
 import sqlite3
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 
 class Storage:
@@ -23,13 +24,161 @@ class Storage:
 
     def _init(self) -> None:
         assert self.conn is not None
-        self.conn.execute(
-            """
+        self.conn.execute("""
             CREATE TABLE IF NOT EXISTS fetch_cache (
                 url TEXT PRIMARY KEY,
                 status INTEGER,
                 checked_at TEXT
             )
-            """
+            """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS content_fingerprints (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT,
+                simhash INTEGER
+            )
+            """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embedding_models (
+                model TEXT PRIMARY KEY,
+                dim INTEGER,
+                last_used REAL
+            )
+            """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT,
+                text_hash TEXT,
+                row INTEGER,
+                PRIMARY KEY (model, text_hash)
+            )
+            """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_labels (
+                url TEXT,
+                title_hash TEXT,
+                model TEXT,
+                label_set TEXT,
+                labels TEXT,
+                created_at REAL,
+                PRIMARY KEY (url, title_hash, model, label_set)
+            )
+            """)
+        self.conn.commit()
+
+    def get_fingerprints(self, urls: List[str]) -> Dict[str, Tuple[str, int]]:
+        """url -> (content_hash, 64-bit SimHash) for the URLs already stored."""
+        assert self.conn is not None
+        out: Dict[str, Tuple[str, int]] = {}
+        for start in range(0, len(urls), 500):
+            chunk = urls[start : start + 500]
+            rows = self.conn.execute(
+                "SELECT url, content_hash, simhash FROM content_fingerprints "
+                f"WHERE url IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for url, content_hash, simhash in rows:
+                # SQLite integers are signed
+                out[url] = (content_hash, simhash & 0xFFFFFFFFFFFFFFFF)
+        return out
+
+    def put_fingerprints(self, rows: Iterable[Tuple[str, str, int]]) -> None:
+        assert self.conn is not None
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO content_fingerprints (url, content_hash, simhash) "
+            "VALUES (?, ?, ?)",
+            ((url, h, fp - (1 << 64) if fp >= 1 << 63 else fp) for url, h, fp in rows),
+        )
+        self.conn.commit()
+
+    def embedding_models(self) -> List[Tuple[str, int, float]]:
+        """(model, dim, last_used) for every cached model, most recently used first."""
+        assert self.conn is not None
+        rows = self.conn.execute(
+            "SELECT model, dim, last_used FROM embedding_models ORDER BY last_used DESC"
+        )
+        return [(m, d, t) for m, d, t in rows]
+
+    def touch_embedding_model(self, model: str, dim: int, used_at: float) -> None:
+        assert self.conn is not None
+        self.conn.execute(
+            "INSERT OR REPLACE INTO embedding_models (model, dim, last_used) VALUES (?, ?, ?)",
+            (model, dim, used_at),
+        )
+        self.conn.commit()
+
+    def drop_embedding_model(self, model: str) -> None:
+        assert self.conn is not None
+        self.conn.execute("DELETE FROM embeddings WHERE model = ?", (model,))
+        self.conn.execute("DELETE FROM embedding_models WHERE model = ?", (model,))
+        self.conn.commit()
+
+    def get_embedding_rows(self, model: str, text_hashes: List[str]) -> Dict[str, int]:
+        """text_hash -> row in the model's vector file, for the hashes already stored."""
+        assert self.conn is not None
+        out: Dict[str, int] = {}
+        for start in range(0, len(text_hashes), 500):
+            chunk = text_hashes[start : start + 500]
+            rows = self.conn.execute(
+                "SELECT text_hash, row FROM embeddings "
+                f"WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                [model, *chunk],
+            )
+            out.update(rows)
+        return out
+
+    def put_embedding_rows(self, model: str, rows: Iterable[Tuple[str, int]]) -> None:
+        assert self.conn is not None
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, text_hash, row) VALUES (?, ?, ?)",
+            ((model, h, r) for h, r in rows),
+        )
+        self.conn.commit()
+
+    def get_llm_labels(
+        self, model: str, label_set: str, keys: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], List[str]]:
+        """(url, title_hash) -> labels the model assigned under this label set."""
+        assert self.conn is not None
+        wanted = set(keys)
+        urls = sorted({url for url, _ in wanted})
+        out: Dict[Tuple[str, str], List[str]] = {}
+        for start in range(0, len(urls), 500):
+            chunk = urls[start : start + 500]
+            rows = self.conn.execute(
+                "SELECT url, title_hash, labels FROM llm_labels "
+                f"WHERE model = ? AND label_set = ? AND url IN ({','.join('?' * len(chunk))})",
+                [model, label_set, *chunk],
+            )
+            for url, title_hash, labels in rows:
+                if (url, title_hash) in wanted:
+                    out[(url, title_hash)] = json.loads(labels)
+        return out
+
+    def put_llm_labels(
+        self,
+        model: str,
+        label_set: str,
+        rows: Iterable[Tuple[str, str, List[str]]],
+        created_at: float,
+    ) -> None:
+        assert self.conn is not None
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO llm_labels "
+            "(url, title_hash, model, label_set, labels, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (url, title_hash, model, label_set, json.dumps(labels), created_at)
+                for url, title_hash, labels in rows
+            ),
+        )
+        self.conn.commit()
+
+    def prune_llm_labels(self, model: str, label_set: str, before: float) -> int:
+        """Drop the model's entries for other label sets or created before `before`."""
+        assert self.conn is not None
+        cur = self.conn.execute(
+            "DELETE FROM llm_labels WHERE model = ? AND (label_set != ? OR created_at < ?)",
+            (model, label_set, before),
         )
         self.conn.commit()
+        return cur.rowcount
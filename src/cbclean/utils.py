@@ -2,11 +2,13 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 from urllib.parse import urlsplit, urlunsplit
 import re
 import time
 
+_MULTI_SLASH = re.compile(r"//+")
+
 
 def now_ts() -> str:
     return time.strftime("%Y%m%d-%H%M%S")
@@ -53,6 +55,34 @@ class Bookmark:
     tags: List[str] = field(default_factory=list)
     liveness: Optional[str] = None
     content_snippet: Optional[str] = None
+    # Source metadata (HTML ADD_DATE/LAST_MODIFIED/ICON, Chrome JSON
+    # date_added/date_modified/guid); dates are Unix seconds.
+    date_added: Optional[int] = None
+    date_modified: Optional[int] = None
+    icon: Optional[str] = None
+    guid: Optional[str] = None
+    # Embedding cluster (cluster.cluster_bookmarks): id, -1 = unclustered, and
+    # the representative title used as its folder name
+    cluster_id: Optional[int] = None
+    cluster: Optional[str] = None
+    # Per-tag confidence in [0, 1]: rule and LLM tags 1.0, embedding tags
+    # their cosine score. Tags without an entry count as certain.
+    tag_scores: Dict[str, float] = field(default_factory=dict)
+
+
+def add_tags(b: Bookmark, tags: Iterable[str], score: float = 1.0) -> None:
+    """Merge `tags` into b.tags, keeping the higher score of a tag seen twice."""
+    tags = list(tags)
+    if not tags:
+        return
+    b.tags = sorted(set((b.tags or []) + tags))
+    for t in tags:
+        b.tag_scores[t] = max(score, b.tag_scores.get(t, 0.0))
+
+
+def tag_confidence(b: Bookmark) -> float:
+    """Score of the bookmark's most confident tag; 0.0 when untagged."""
+    return max((b.tag_scores.get(t, 1.0) for t in b.tags or ()), default=0.0)
 
 
 def normalize_url(
@@ -70,7 +100,7 @@ def normalize_url(
     netloc = parts.netloc
     if strip_www_flag:
         netloc = strip_www(netloc)
-    path = re.sub(r"//+", "/", parts.path) or "/"
+    path = _MULTI_SLASH.sub("/", parts.path) or "/"
     query = filter_query(parts.query, strip_params)
     fragment = "" if strip_fragments else parts.fragment
     return urlunsplit((scheme, netloc, path, query, fragment))
@@ -0,0 +1,111 @@
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from cbclean import ann  # noqa: E402
+from cbclean.ann import AnnIndex, open_index, related_bookmarks  # noqa: E402
+from cbclean.utils import Bookmark  # noqa: E402
+
+
+def _unit(x):
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _data(n=3000, dim=32, centers=60, seed=0):
+    rng = np.random.default_rng(seed)
+    c = rng.normal(size=(centers, dim))
+    return _unit(c[rng.integers(centers, size=n)] + 0.3 * rng.normal(size=(n, dim)))
+
+
+def test_flat_search_is_exact():
+    x = _data(n=200)
+    index = AnnIndex(x.shape[1])
+    assert index.add([str(i) for i in range(len(x))], x) == len(x)
+    assert index.centroids is None
+    idx, sims = index.search(x[:10], 5)
+    exact = np.argsort(-(x[:10] @ x.T), axis=1)[:, :5]
+    assert idx.tolist() == exact.tolist()
+    assert idx[:, 0].tolist() == list(range(10))
+    assert np.allclose(sims[:, 0], 1, atol=1e-5)
+
+
+def test_ivf_recall_against_exact(monkeypatch):
+    monkeypatch.setattr(ann, "_MIN_TRAIN", 1000)
+    x = _data()
+    index = AnnIndex(x.shape[1], nprobe=8)
+    index.add([str(i) for i in range(len(x))], x)
+    assert index.centroids is not None
+    q = x[:300]
+    idx, _ = index.search(q, 10)
+    exact = np.argsort(-(q @ x.T), axis=1)[:, :10]
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(idx.tolist(), exact.tolist())])
+    assert recall >= 0.9
+
+
+def test_search_pads_missing_neighbours():
+    index = AnnIndex(2)
+    index.add(["a", "b"], _unit(np.array([[1.0, 0.0], [0.0, 1.0]])))
+    idx, sims = index.search(np.array([[1.0, 0.0]]), 4)
+    assert idx.tolist() == [[0, 1, -1, -1]]
+    assert np.isneginf(sims[0, 2:]).all()
+
+
+def test_incremental_add_skips_known_keys(monkeypatch):
+    monkeypatch.setattr(ann, "_MIN_TRAIN", 1000)
+    x = _data()
+    index = AnnIndex(x.shape[1])
+    index.add([str(i) for i in range(2000)], x[:2000])
+    trained = index.centroids
+    # Repeated keys (also within one batch) are kept once
+    assert index.add(["0", "2000", "2000"], x[[0, 2000, 2001]]) == 1
+    assert index.centroids is trained
+    assert len(index) == 2001
+    idx, _ = index.search(x[2000:2001], 1)
+    assert index.keys[idx[0, 0]] == "2000"
+
+
+def test_save_load_round_trip(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(ann, "_MIN_TRAIN", 1000)
+    x = _data()
+    keys = [f"k{i}" for i in range(len(x))]
+    first = open_index(tmp_path, keys[:2500], x[:2500])
+    again = open_index(tmp_path, keys, x)
+    assert len(again) == len(x) and again.centroids is not None
+    assert np.array_equal(again.centroids, first.centroids)
+    loaded = AnnIndex.load(tmp_path, x.shape[1])
+    assert loaded.keys == keys
+    assert np.array_equal(loaded.search(x[:20], 5)[0], again.search(x[:20], 5)[0])
+    # Another model's dimension starts empty
+    assert len(AnnIndex.load(tmp_path, 7)) == 0
+
+
+def test_save_appends_new_rows_only(tmp_path: Path):
+    x = _data(n=40)
+    index = AnnIndex(x.shape[1])
+    index.add([str(i) for i in range(30)], x[:30])
+    index.save(tmp_path)
+    # Rows of a save that crashed before its meta are cut off, not kept
+    with open(tmp_path / "vectors.f32", "ab") as fh:
+        fh.write(b"\xff" * 64)
+    loaded = AnnIndex.load(tmp_path, x.shape[1])
+    assert len(loaded) == 30
+    head = (tmp_path / "vectors.f32").read_bytes()[: 30 * x.shape[1] * 4]
+    loaded.add([str(i) for i in range(40)], x)
+    loaded.save(tmp_path)
+    data = (tmp_path / "vectors.f32").read_bytes()
+    assert len(data) == x.nbytes and data.startswith(head)
+    again = AnnIndex.load(tmp_path, x.shape[1])
+    assert np.array_equal(again.vectors, x)
+
+
+def test_related_bookmarks_skips_self_and_unknown_entries():
+    vecs = _unit(np.array([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [0.95, 0.05]]))
+    index = AnnIndex(2)
+    index.add(["a", "b", "c", "old"], vecs)
+    bms = [Bookmark(id=str(i), title=t, url=f"https://{t}.org/") for i, t in enumerate("abc")]
+    related = related_bookmarks(bms, ["a", "b", "c"], index, k=2, threshold=0.5)
+    assert [b.id for b, _ in related["0"]] == ["1"]
+    assert [b.id for b, _ in related["1"]] == ["0"]
+    assert "2" not in related
@@ -124,3 +124,14 @@ def test_export_group_by_tag_hier(tmp_path):
     assert "<H3>Linux</H3>" in text
     assert "<H3>Kubernetes</H3>" in text
     assert "<H3>Docs</H3>" in text and "<H3>Reference</H3>" in text
+
+
+def test_export_group_by_cluster(tmp_path):
+    bookmarks = [
+        Bookmark(id="1", title="A", url="https://a.example", cluster_id=0, cluster="Python docs"),
+        Bookmark(id="2", title="B", url="https://b.example", cluster_id=-1),
+    ]
+    out = tmp_path / "c.html"
+    export_bookmarks_html(bookmarks, out, group_by="cluster")
+    html = out.read_text(encoding="utf-8")
+    assert "<H3>Python docs</H3>" in html and "<H3>Unclustered</H3>" in html
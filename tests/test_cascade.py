@@ -0,0 +1,52 @@
+from cbclean.cascade import classify_cascade
+from cbclean.classify_rules import CompiledRules
+from cbclean.utils import Bookmark, tag_confidence
+
+
+def _items():
+    return [
+        Bookmark(id="1", title="Repo", url="https://github.com/x"),
+        Bookmark(id="2", title="Python tutorial", url="https://blog.example/py"),
+        Bookmark(id="3", title="Vague page", url="https://misc.example/a"),
+        Bookmark(id="4", title="Unknown", url="https://misc.example/b"),
+    ]
+
+
+def test_cascade_sends_only_uncertain_bookmarks_onwards():
+    rules = CompiledRules({"domains": {"github.com": ["Dev"]}})
+    scores = {"2": ("Python", 0.8), "3": ("Docs", 0.4)}
+    seen = {}
+
+    def embed(items, below):
+        seen["embed"] = below
+        for b in items:
+            if tag_confidence(b) < below and b.id in scores:
+                label, score = scores[b.id]
+                b.tags, b.tag_scores = [label], {label: score}
+        return "vectors"
+
+    def llm(items):
+        seen["llm"] = [b.id for b in items]
+        # Weak guesses are withheld from the LLM
+        assert all(not b.tags for b in items)
+        items[1].tags = ["Misc"]
+
+    items = _items()
+    vectors, counts = classify_cascade(items, rules, embed=embed, llm=llm, move=0.75, ask=0.55)
+    assert vectors == "vectors" and seen == {"embed": 0.75, "llm": ["3", "4"]}
+    assert counts == {"rules": 1, "embeddings": 3, "llm": 2}
+    assert items[0].tags == ["Dev"] and items[0].tag_scores == {"Dev": 1.0}
+    assert items[1].tags == ["Python"]
+    # The LLM had nothing for 3: its embedding guess is kept
+    assert items[2].tags == ["Docs"] and items[2].tag_scores == {"Docs": 0.4}
+    assert items[3].tags == ["Misc"]
+
+
+def test_cascade_skips_stages_with_nothing_left():
+    rules = CompiledRules({"domains": {"example": ["Web"], "github.com": ["Dev"]}})
+
+    def fail(*args):
+        raise AssertionError("not called")
+
+    vectors, counts = classify_cascade(_items(), rules, embed=fail, llm=fail)
+    assert vectors is None and counts == {"rules": 4, "embeddings": 0, "llm": 0}
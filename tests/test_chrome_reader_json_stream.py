@@ -0,0 +1,112 @@
+import json
+import random
+from pathlib import Path
+
+from cbclean.chrome_reader import iter_chrome_json, read_chrome_json
+
+
+def _reference(data, profile=None):
+    # Former json.loads + recursive walk, kept as the parity oracle
+    out = []
+
+    def walk(node, folder_path):
+        if not isinstance(node, dict):
+            return
+        if node.get("type") == "url":
+            out.append((node.get("id", ""), node.get("name", ""), node.get("url"), folder_path))
+        elif node.get("type") == "folder":
+            name = node.get("name", "")
+            new_path = f"{folder_path}/{name}" if name else folder_path
+            for child in node.get("children", []) or []:
+                walk(child, new_path)
+
+    for root in data.get("roots", {}).values():
+        walk(root, root.get("name", "") if isinstance(root, dict) else "Bookmarks")
+    return out
+
+
+def _random_node(rng, depth, counter):
+    counter[0] += 1
+    if depth > 3 or rng.random() < 0.6:
+        node = {
+            "type": "url",
+            "id": str(counter[0]),
+            "name": f't{counter[0]} é\\"q"',
+            "url": f"https://ex.com/{counter[0]}",
+        }
+    else:
+        node = {
+            "type": rng.choice(["folder", "folder", "folder", "other"]),
+            "children": [_random_node(rng, depth + 1, counter) for _ in range(rng.randint(0, 4))]
+            + ([7, None, "x"] if rng.random() < 0.2 else []),
+        }
+        if rng.random() < 0.9:
+            node["name"] = rng.choice(["", f"F{counter[0]}"])
+    node["date_added"] = "13370000000000000"
+    keys = list(node)
+    rng.shuffle(keys)
+    return {k: node[k] for k in keys}
+
+
+def test_stream_json_matches_reference_on_random_trees(tmp_path: Path):
+    rng = random.Random(7)
+    for trial in range(40):
+        counter = [0]
+        roots = {f"r{i}": _random_node(rng, 0, counter) for i in range(3)}
+        roots["weird"] = [1, 2]
+        data = {"checksum": "x", "roots": roots, "sync_metadata": "A" * 5000, "version": 1}
+        p = tmp_path / f"b{trial}.json"
+        p.write_text(json.dumps(data, sort_keys=trial % 2 == 0), encoding="utf-8")
+        got = [
+            (b.id, b.title, b.url, b.folder_path)
+            for b in iter_chrome_json(p, chunk_size=rng.choice([3, 17, 4096]))
+        ]
+        assert got == _reference(data)
+
+
+def test_stream_json_captures_metadata(tmp_path: Path):
+    p = tmp_path / "Bookmarks"
+    p.write_text(
+        json.dumps(
+            {
+                "roots": {
+                    "other": {
+                        "children": [
+                            {
+                                "date_added": "13370000000000000",
+                                "date_modified": "0",
+                                "guid": "a1b2",
+                                "id": "9",
+                                "meta_info": {"power_bookmark_meta": "x" * 100},
+                                "name": "Ex",
+                                "type": "url",
+                                "url": "https://ex.com/",
+                            }
+                        ],
+                        "name": "Other bookmarks",
+                        "type": "folder",
+                    }
+                },
+                "sync_metadata": "Zm9v" * 1000,
+            },
+            sort_keys=True,
+        ),
+        encoding="utf-8",
+    )
+    (b,) = read_chrome_json(p, profile="Profile 1")
+    assert b.guid == "a1b2" and b.profile == "Profile 1"
+    assert b.date_added == 13370000000000000 // 1_000_000 - 11_644_473_600
+    assert b.date_modified is None
+    assert b.folder_path == "Other bookmarks/Other bookmarks"
+
+
+def test_stream_json_deep_nesting_is_iterative(tmp_path: Path):
+    depth = 1500  # beyond the default recursion limit the old walk() hit
+    text = '{"roots": {"bar": ' + '{"type": "folder", "name": "d", "children": [' * depth
+    text += '{"type": "url", "id": "1", "name": "leaf", "url": "https://deep"}'
+    text += "]}" * depth + "}}"
+    p = tmp_path / "deep.json"
+    p.write_text(text, encoding="utf-8")
+    (b,) = read_chrome_json(p)
+    assert b.url == "https://deep"
+    assert b.folder_path.count("/") == depth
@@ -0,0 +1,62 @@
+from pathlib import Path
+from cbclean.apply import export_bookmarks_html
+from cbclean.chrome_reader import iter_bookmarks_html, read_bookmarks_html
+
+NESTED = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<DL><p>
+    <DT><H3 ADD_DATE="1732552130">Bookmarks Bar</H3>
+    <DL><p>
+        <DT><H3>Dev</H3>
+        <DL><p>
+            <DT><A HREF="https://docs.python.org/3/" ADD_DATE="1756313657"
+                LAST_MODIFIED="1756313700" ICON="data:image/png;base64,AAAA">Python Docs</A>
+        </DL><p>
+        <DT><A HREF="https://github.com/">GitHub</A>
+    </DL><p>
+    <DT><A HREF="https://top.example/">Top</A>
+</DL><p>
+"""
+
+
+def test_stream_reader_builds_folder_paths_and_metadata(tmp_path: Path):
+    html = tmp_path / "bk.html"
+    html.write_text(NESTED, encoding="utf-8")
+    items = read_bookmarks_html(html)
+    assert [(b.id, b.title, b.folder_path) for b in items] == [
+        ("1", "Python Docs", "Bookmarks/Bookmarks Bar/Dev"),
+        ("2", "GitHub", "Bookmarks/Bookmarks Bar"),
+        ("3", "Top", "Bookmarks"),
+    ]
+    first = items[0]
+    assert first.date_added == 1756313657
+    assert first.date_modified == 1756313700
+    assert first.icon == "data:image/png;base64,AAAA"
+    assert items[1].date_added is None and items[1].icon is None
+
+
+def test_stream_reader_small_chunks_match_whole_file(tmp_path: Path):
+    html = tmp_path / "bk.html"
+    html.write_text(NESTED, encoding="utf-8")
+    whole = [(b.title, b.url, b.folder_path) for b in iter_bookmarks_html(html)]
+    tiny = [(b.title, b.url, b.folder_path) for b in iter_bookmarks_html(html, chunk_size=7)]
+    assert whole == tiny
+
+
+def test_stream_reader_unclosed_anchors(tmp_path: Path):
+    html = tmp_path / "bk.html"
+    html.write_text('<DL><DT><A HREF="https://a">A<DT><A HREF="https://b">B</DL>', encoding="utf-8")
+    items = read_bookmarks_html(html)
+    assert [(b.title, b.url) for b in items] == [("A", "https://a"), ("B", "https://b")]
+
+
+def test_export_round_trips_metadata(tmp_path: Path):
+    html = tmp_path / "bk.html"
+    html.write_text(NESTED, encoding="utf-8")
+    out = tmp_path / "out.html"
+    export_bookmarks_html(read_bookmarks_html(html), out)
+    text = out.read_text(encoding="utf-8")
+    assert (
+        'ADD_DATE="1756313657" LAST_MODIFIED="1756313700" ICON="data:image/png;base64,AAAA"' in text
+    )
+    again = read_bookmarks_html(out)
+    assert {b.url: b.date_added for b in again}["https://docs.python.org/3/"] == 1756313657
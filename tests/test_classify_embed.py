@@ -0,0 +1,63 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from cbclean.classify_embed import select_top_labels  # noqa: E402
+
+
+def _reference(texts, labels, top_k, threshold):
+    out = []
+    for row in texts @ labels.T:
+        pairs = sorted(((float(s), j) for j, s in enumerate(row)), reverse=True)
+        out.append([j for s, j in pairs[:top_k] if s >= threshold])
+    return out
+
+
+@pytest.mark.parametrize("top_k", [1, 3, 8])
+def test_select_top_labels_matches_row_loop(top_k):
+    rng = np.random.default_rng(0)
+    texts = rng.normal(size=(257, 16)).astype(np.float32)
+    labels = rng.normal(size=(6, 16)).astype(np.float32)
+    got = select_top_labels(texts, labels, top_k=top_k, score_threshold=0.5, chunk_rows=50)
+    assert got == _reference(texts, labels, top_k, 0.5)
+
+
+def test_text_encoder_buckets_by_length_and_keeps_order():
+    from cbclean.classify_embed import TextEncoder
+
+    class FakeModel:
+        def __init__(self):
+            self.batches = []
+
+        def encode(self, texts, **kwargs):
+            self.batches.append(list(texts))
+            return np.array([[len(t.split()), len(t)] for t in texts], dtype=np.float32)
+
+    texts = ["a b c d", "a", "a b", "a b c d e f", "b", "a b c"]
+    model = FakeModel()
+    out = TextEncoder("fake", batch_size=2, workers=1, model=model)(texts)
+    assert out[:, 0].tolist() == [4, 1, 2, 6, 1, 3]
+    assert model.batches == [["a b c d", "a b c d e f"], ["a b", "a b c"], ["a", "b"]]
+
+
+def test_mean_pool_ignores_padding_and_normalizes():
+    from cbclean.embed_backends import load_model, mean_pool
+
+    hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+    assert mean_pool(hidden, mask, normalize=False).tolist() == [[2.0, 0.0]]
+    assert mean_pool(hidden, mask).tolist() == [[1.0, 0.0]]
+    with pytest.raises(ValueError):
+        load_model("m", backend="tensorflow")
+    with pytest.raises(ValueError):
+        load_model("m", backend="onnx")
+
+
+def test_scored_top_labels_returns_cosine_scores():
+    from cbclean.classify_embed import scored_top_labels
+
+    texts = np.array([[1.0, 0.0], [0.6, 0.8]], dtype=np.float32)
+    labels = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    got = scored_top_labels(texts, labels, top_k=2, score_threshold=0.5)
+    assert [[j for j, _ in row] for row in got] == [[0], [1, 0]]
+    assert got[1][0][1] == pytest.approx(0.8) and got[1][1][1] == pytest.approx(0.6)
@@ -31,3 +31,172 @@ def test_classify_llm_no_client_no_sdk():
     # Without SDK and API key, this should be a no-op
     classify_by_llm(items, labels=["Dev"], only_uncertain=True)
     assert items[0].tags == []
+
+
+class CountingClient(FakeClient):
+    def __init__(self):
+        self.prompts = []
+
+    def __call__(self, model: str, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return super().__call__(model, prompt)
+
+
+def test_classify_llm_cache_skips_answered_bookmarks(tmp_path):
+    from cbclean.storage import Storage
+
+    def run(labels, titles=("GitHub", "Python Docs")):
+        items = [
+            Bookmark(id="1", title=titles[0], url="https://github.com", tags=[]),
+            Bookmark(id="2", title=titles[1], url="https://docs.python.org", tags=[]),
+        ]
+        client = CountingClient()
+        with Storage(tmp_path / "c.sqlite") as storage:
+            classify_by_llm(items, labels=labels, client=client, storage=storage)
+        return items, client.prompts
+
+    items, prompts = run(["Dev", "Code", "Docs"])
+    assert len(prompts) == 1
+    # Unchanged profile: no calls, same tags
+    again, prompts = run(["Dev", "Code", "Docs"])
+    assert prompts == []
+    assert [b.tags for b in again] == [b.tags for b in items]
+    # A renamed bookmark is a miss; the other one stays cached
+    _, prompts = run(["Dev", "Code", "Docs"], titles=("GitHub Home", "Python Docs"))
+    assert len(prompts) == 1 and "GitHub Home" in prompts[0] and "Python Docs" not in prompts[0]
+    # Other labels invalidate everything
+    _, prompts = run(["Dev", "Docs"])
+    assert len(prompts) == 1 and "Python Docs" in prompts[0]
+
+
+def test_pack_batches_fills_token_budget():
+    from cbclean.classify_llm import _build_prompt, estimate_tokens, pack_batches
+
+    bare = [Bookmark(id=str(i), title=f"Title {i}", url=f"https://ex.com/{i}") for i in range(60)]
+    long = [
+        Bookmark(id=f"s{i}", title="Snippet", url="https://ex.com", content_snippet="word " * 400)
+        for i in range(6)
+    ]
+    base = _build_prompt([], ["Dev", "Docs"])
+    # Count only
+    assert [len(b) for b in pack_batches(bare, base, max_items=25, max_tokens=0)] == [25, 25, 10]
+    # Bare titles fill one request; long snippets get split up
+    assert [len(b) for b in pack_batches(bare, base, max_items=100, max_tokens=3000)] == [60]
+    batches = pack_batches(long + bare[:3], base, max_items=100, max_tokens=1500)
+    assert [len(b) for b in batches] == [2, 2, 5]
+    for batch in batches:
+        assert estimate_tokens(_build_prompt(batch, ["Dev", "Docs"])) <= 1500
+    # An item larger than the whole budget still goes out, alone
+    assert [len(b) for b in pack_batches(long[:3], base, max_items=10, max_tokens=300)] == [1, 1, 1]
+
+
+class ContextLimitedClient:
+    """Rejects prompts with more than `limit` bookmarks like an OpenAI 400."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.sizes = []
+
+    def __call__(self, model, prompt):
+        import re
+
+        idxs = [int(i) for i in re.findall(r"^- \[(\d+)\]", prompt, flags=re.M)]
+        self.sizes.append(len(idxs))
+        if len(idxs) > self.limit:
+            err = Exception("This model's maximum context length is 128 tokens")
+            err.status_code = 400
+            raise err
+        return str([{"index": i, "labels": ["Dev"]} for i in idxs]).replace("'", '"')
+
+
+def test_classify_llm_splits_rejected_batches():
+    items = [Bookmark(id=str(i), title=f"T{i}", url=f"https://ex.com/{i}") for i in range(10)]
+    client = ContextLimitedClient(limit=3)
+    classify_by_llm(items, labels=["Dev"], batch_size=10, client=client, max_prompt_tokens=0)
+    assert all(b.tags == ["Dev"] for b in items)
+    assert client.sizes == [10, 5, 2, 3, 5, 2, 3]
+
+
+def test_classify_llm_resumes_from_journal(tmp_path):
+    import json
+    import re
+
+    import pytest
+
+    journal = tmp_path / "llm-journal.jsonl"
+
+    def items():
+        return [Bookmark(id=str(i), title=f"Item {i}", url=f"https://x/{i}") for i in range(6)]
+
+    def client_factory(fail_at=None):
+        prompts = []
+
+        def client(model, prompt):
+            if len(prompts) == fail_at:
+                raise KeyboardInterrupt
+            prompts.append(prompt)
+            idx = [int(i) for i in re.findall(r"\] Item (\d+)", prompt)]
+            return json.dumps(
+                {
+                    "assignments": [{"index": j, "labels": [f"T{i}"]} for j, i in enumerate(idx)],
+                    "new_labels": [f"T{i}" for i in idx],
+                }
+            )
+
+        return client, prompts
+
+    # Killed during the third batch: two batches are checkpointed
+    client, prompts = client_factory(fail_at=2)
+    with pytest.raises(KeyboardInterrupt):
+        classify_by_llm(items(), labels=["Base"], batch_size=2, client=client, journal=journal)
+    resumed = items()
+    client, prompts = client_factory()
+    classify_by_llm(
+        resumed, labels=["Base"], batch_size=2, client=client, journal=journal, resume=True
+    )
+    assert len(prompts) == 1 and "Item 4" in prompts[0] and "Item 3" not in prompts[0]
+    # Labels learned before the interruption are still allowed
+    assert "T0" in prompts[0]
+    assert [b.tags for b in resumed] == [[f"T{i}"] for i in range(6)]
+    # Without --resume the journal starts over
+    client, prompts = client_factory()
+    classify_by_llm(items(), labels=["Base"], batch_size=2, client=client, journal=journal)
+    assert len(prompts) == 3
+
+
+def test_classify_llm_stream_resends_only_after_truncation():
+    import json
+    import re
+
+    prompts = []
+
+    def client(model, prompt):
+        prompts.append(prompt)
+        idx = [int(i) for i in re.findall(r"\] Item (\d+)", prompt)]
+        text = json.dumps(
+            {"assignments": [{"index": j, "labels": ["Dev"]} for j in range(len(idx))]}
+        )
+        if len(prompts) == 1:
+            # Hit the output limit in the middle of the fourth assignment
+            text = text[: text.index('{"index": 3') + 12]
+        # Streamed in small pieces
+        return (text[i : i + 5] for i in range(0, len(text), 5))
+
+    items = [Bookmark(id=str(i), title=f"Item {i}", url=f"https://x/{i}") for i in range(6)]
+    classify_by_llm(items, labels=["Dev"], batch_size=10, client=client, stream=True)
+    assert len(prompts) == 2
+    assert "Item 3" in prompts[1] and "Item 2" not in prompts[1]
+    assert all(b.tags == ["Dev"] for b in items)
+
+
+def test_classify_llm_reply_cut_before_any_answer_is_an_error():
+    import pytest
+
+    from cbclean.llm_reply import TruncatedReplyError
+
+    def client(model, prompt):
+        return '{"assignments": [{"index": 0, "lab'
+
+    items = [Bookmark(id=str(i), title=f"Item {i}", url=f"https://x/{i}") for i in range(3)]
+    with pytest.raises(TruncatedReplyError):
+        classify_by_llm(items, labels=["Dev"], client=client, max_retries=0)
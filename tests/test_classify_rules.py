@@ -10,3 +10,18 @@ def test_domain_rules(tmp_path: Path):
     bm = [Bookmark(id="1", title="Docs", url="https://docs.python.org/3/")]
     classify_by_rules(bm, rules)
     assert "Python" in bm[0].tags
+
+
+def test_domain_rules_match_subdomains_and_domain_lists(tmp_path: Path):
+    from cbclean.classify_rules import CompiledRules
+    from cbclean.domains import DomainIndex
+
+    rules = {"domains": {"github.com": ["Dev"]}, "keywords": {}}
+    feed = DomainIndex({"gist.github.com": ["Snippets"]})
+    bm = [
+        Bookmark(id="1", title="Gist", url="https://gist.github.com:443/u/1"),
+        Bookmark(id="2", title="Docs", url="https://docs.github.com/"),
+    ]
+    classify_by_rules(bm, CompiledRules(rules, [feed]))
+    assert bm[0].tags == ["Dev", "Snippets"]
+    assert bm[1].tags == ["Dev"]
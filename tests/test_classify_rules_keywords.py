@@ -21,3 +21,53 @@ keywords:
     classify_by_rules(bms, rules)
     assert "Dev" in bms[0].tags
     assert "Dev" in bms[1].tags
+
+
+def _reference_tags(b: Bookmark, keywords) -> list:
+    import re
+
+    tags = []
+    title_l, url_l = b.title.lower(), (b.url or "").lower()
+    for pat, tgs in keywords.items():
+        try:
+            if re.search(pat, title_l) or re.search(pat, url_l):
+                tags.extend(tgs)
+        except re.error:
+            if pat in title_l or pat in url_l:
+                tags.extend(tgs)
+    return sorted(set(tags))
+
+
+def test_compiled_rules_match_per_pattern_search():
+    import random
+
+    from cbclean.classify_rules import CompiledRules
+
+    keywords = {
+        "docker": ["A"],
+        "dock": ["B"],
+        "ocker": ["C"],
+        "er": ["D"],
+        "": ["E"],
+        "py(thon)?": ["F"],
+        "^learn": ["G"],
+        "(a)\\1": ["H"],
+        "(?i)DOCS": ["I"],
+        "[invalid": ["J"],
+        "(?P<x>o)c": ["K"],
+        "\\bgo\\b|rust$": ["L"],
+        "o": ["M"],
+        "o+c": ["N"],
+        "recipe|рецепт|": ["O"],
+        "learn|lean": ["P"],
+        "dock(er)?file": ["Q"],
+        "c\\+\\+": ["R"],
+    }
+    words = ["docker", "learn", "python", "py", "aa", "docs", "[invalid", "go", "rust", "x"]
+    words += ["dockerfile", "dockfile", "c++", "рецепт", "recipes", "lean"]
+    rng = random.Random(3)
+    engine = CompiledRules({"keywords": keywords})
+    for i in range(200):
+        title = " ".join(rng.choices(words, k=rng.randint(0, 4)))
+        b = Bookmark(id=str(i), title=title, url=f"https://ex.com/{rng.choice(words)}")
+        assert engine.tags_for(b) == _reference_tags(b, keywords), title
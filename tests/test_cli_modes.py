@@ -47,3 +47,27 @@ apply:
     )
     cli_process(config=str(cfg2))
     assert (tmp_path / "o2" / "bookmarks.cleaned.html").exists()
+
+    # Cascade: rules first; without embeddings backend or API key the later stages are no-ops
+    rules = tmp_path / "rules.yaml"
+    rules.write_text("domains:\n  example.com: [Example]\n", encoding="utf-8")
+    cfg3 = tmp_path / "cfg3.yaml"
+    cfg3.write_text(
+        f"""
+input:
+  import_html: "{html.as_posix()}"
+output:
+  export_dir: "{(tmp_path / 'o3').as_posix()}"
+categorize:
+  mode: "cascade"
+  rules_file: "{rules.as_posix()}"
+network:
+  enabled: false
+apply:
+  mode: "export_html"
+  group_by: "tag"
+        """,
+        encoding="utf-8",
+    )
+    cli_process(config=str(cfg3))
+    assert "Example" in (tmp_path / "o3" / "bookmarks.cleaned.html").read_text(encoding="utf-8")
@@ -0,0 +1,40 @@
+import pytest
+
+from cbclean.utils import Bookmark
+
+np = pytest.importorskip("numpy")
+
+from cbclean.cluster import cluster_bookmarks, knn_graph  # noqa: E402
+
+
+def _blobs(seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(4, 16))
+    x = np.concatenate([c + 0.1 * rng.normal(size=(30, 16)) for c in centers])
+    truth = np.repeat(np.arange(4), 30)
+    return x.astype(np.float32), truth
+
+
+@pytest.mark.parametrize("algo", ["hdbscan", "kmeans"])
+def test_cluster_bookmarks_recovers_blobs(algo):
+    x, truth = _blobs()
+    bms = [Bookmark(id=str(i), title=f"topic {t} item {i}") for i, t in enumerate(truth)]
+    cluster_bookmarks(bms, x, algo=algo, min_cluster_size=5, n_clusters=4)
+    ids = np.array([b.cluster_id for b in bms])
+    for t in range(4):
+        assert len(set(ids[truth == t].tolist())) == 1
+    assert len(set(ids.tolist())) == 4
+    # Each cluster is named after one of its own members
+    for b in bms:
+        assert b.cluster is not None and b.cluster.startswith(f"topic {truth[int(b.id)]} ")
+
+
+def test_knn_graph_chunks_match_dense():
+    x, _ = _blobs(1)
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    idx, dist = knn_graph(x, 3, chunk_rows=7)
+    sims = x @ x.T
+    np.fill_diagonal(sims, -np.inf)
+    expected = np.argsort(-sims, axis=1)[:, :3]
+    assert (idx == expected).all()
+    assert np.allclose(dist, 1 - np.take_along_axis(sims, expected, axis=1), atol=1e-6)
@@ -1,5 +1,7 @@
+import pytest
+
 from cbclean.utils import Bookmark
-from cbclean.dedup import deduplicate
+from cbclean.dedup import deduplicate, group_duplicates
 
 
 def test_deduplicate_by_normalized_url():
@@ -33,3 +35,279 @@ def test_deduplicate_skips_items_without_key():
     a = Bookmark(id="1", title="No URL")
     keep, dups = deduplicate([a], title_threshold=0.9, prefer_shorter_url=True)
     assert len(keep) == 0 or keep[0].url is None
+
+
+def _reference_groups(bookmarks, title_threshold):
+    # All-pairs closure the union-find build must reproduce
+    from cbclean.dedup import _title_sim
+
+    nodes = [b for b in bookmarks if b.normalized_url or b.url]
+    comp = list(range(len(nodes)))
+
+    def merge(i, j):
+        old, new = comp[j], comp[i]
+        for k, c in enumerate(comp):
+            if c == old:
+                comp[k] = new
+
+    for i, a in enumerate(nodes):
+        for j in range(i + 1, len(nodes)):
+            b = nodes[j]
+            same_url = (a.normalized_url or a.url) == (b.normalized_url or b.url)
+            similar = (
+                a.folder_path == b.folder_path
+                and a.url
+                and b.url
+                and _title_sim(a.title, b.title) >= title_threshold
+            )
+            if same_url or similar:
+                merge(i, j)
+    groups = {}
+    for b, c in zip(nodes, comp):
+        groups.setdefault(c, set()).add(b.id)
+    return sorted(sorted(g) for g in groups.values() if len(g) > 1)
+
+
+def test_group_duplicates_matches_all_pairs_closure():
+    import random
+
+    rng = random.Random(7)
+    parts = ["py", "thon", "git", "hub", "Hub", "doc", "s", "Java", "-", "|", "é", "\xa0"]
+
+    def title():
+        words = [
+            "".join(rng.choice(parts) for _ in range(rng.randint(1, 3)))
+            for _ in range(rng.randint(0, 4))
+        ]
+        return rng.choice(["", " ", "\xa0"]).join(words)
+
+    for _ in range(60):
+        bms = [
+            Bookmark(
+                id=str(k),
+                title=title(),
+                url=f"https://ex.com/{rng.randint(0, 40)}" + "x" * rng.randint(0, 4),
+                folder_path=rng.choice(["A", "B"]),
+            )
+            for k in range(rng.randint(2, 30))
+        ]
+        for threshold in (0.0, 0.6, 0.8, 0.9, 1.0):
+            groups = group_duplicates(bms, title_threshold=threshold, prefer_shorter_url=True)
+            got = sorted(sorted(b.id for b in g.members) for g in groups)
+            assert got == _reference_groups(bms, threshold)
+            for g in groups:
+                # Shortest URL wins, earliest bookmark on ties
+                best = min(g.members, key=lambda b: (len(b.url), int(b.id)))
+                assert g.survivor is best
+
+
+def test_group_duplicates_merges_chains_transitively():
+    a = Bookmark(id="1", title="Kubernetes docs", url="https://k8s.io/docs/")
+    b = Bookmark(id="2", title="docs", url="https://other.example/docs")
+    c = Bookmark(id="3", title="Kubernetes", url="https://k8s.io/")
+    d = Bookmark(id="4", title="Kubernetes", url="https://k8s.io/")
+    groups = group_duplicates([a, b, c, d], title_threshold=0.9, prefer_shorter_url=True)
+    assert len(groups) == 1
+    assert groups[0].survivor.id == "3"
+    assert sorted(x.id for x in groups[0].duplicates) == ["1", "2", "4"]
+    assert groups[0].reasons == {"url", "title"}
+    keep, dups = deduplicate([a, b, c, d], title_threshold=0.9, prefer_shorter_url=True)
+    assert [x.id for x in keep] == ["3"]
+    assert len(dups) == 3
+
+
+def test_group_duplicates_soft_edges_stay_within_folder():
+    a = Bookmark(id="1", title="Python Docs", url="https://a.example/", folder_path="X")
+    b = Bookmark(id="2", title="Python Docs", url="https://b.example/", folder_path="Y")
+    assert group_duplicates([a, b], title_threshold=0.9, prefer_shorter_url=True) == []
+
+
+def test_deduplicate_near_titles_without_common_token():
+    a = Bookmark(id="1", title="Kubernetes", url="https://a.example/")
+    b = Bookmark(id="2", title="Kubernetess", url="https://b.example/")
+    c = Bookmark(id="3", title="Terraform", url="https://c.example/")
+    keep, dups = deduplicate([a, b, c], title_threshold=0.9, prefer_shorter_url=True)
+    assert [x.id for x in keep] == ["1", "3"]
+    assert [x.id for x in dups] == ["2"]
+
+
+def test_deduplicate_no_break_space_is_not_a_token_separator():
+    # rapidfuzz keeps U+00A0 inside tokens, so these share no token
+    a = Bookmark(id="1", title="alpha\xa0beta", url="https://a.example/")
+    b = Bookmark(id="2", title="beta\xa0gamma", url="https://b.example/")
+    keep, dups = deduplicate([a, b], title_threshold=0.9, prefer_shorter_url=True)
+    assert len(keep) == 2 and not dups
+
+
+def test_cross_folder_near_duplicates_are_opt_in():
+    a = Bookmark(
+        id="1",
+        title="Understanding Python asyncio event loops",
+        url="https://blog.example/posts/understanding-python-asyncio-event-loops",
+        folder_path="Dev",
+    )
+    b = Bookmark(
+        id="2",
+        title="Understanding Python asyncio event loops | Example Blog",
+        url="https://www.blog.example/posts/understanding-python-asyncio-event-loops/",
+        folder_path="Read later",
+    )
+    c = Bookmark(
+        id="3",
+        title="Understanding Python's asyncio event loop",
+        url="https://blog.example/amp/understanding-python-asyncio-event-loops",
+        folder_path="Inbox",
+    )
+    other = Bookmark(
+        id="4",
+        title="Understanding Rust lifetimes",
+        url="https://rust.example/posts/lifetimes",
+        folder_path="Rust",
+    )
+    items = [a, b, c, other]
+    assert group_duplicates(items, title_threshold=0.9, prefer_shorter_url=True) == []
+    groups = group_duplicates(
+        items, title_threshold=0.9, prefer_shorter_url=True, cross_folder=True
+    )
+    assert [sorted(x.id for x in g.members) for g in groups] == [["1", "2", "3"]]
+    assert groups[0].reasons == {"near"}
+
+
+def test_minhash_signatures_same_with_and_without_numpy(monkeypatch):
+    import builtins
+
+    from cbclean.dedup import _minhash_signatures, _shingles
+
+    sets = [_shingles("python asyncio event loops"), _shingles("ab"), {1, 2, 3}]
+    fast = [tuple(int(v) for v in row) for row in _minhash_signatures(sets, 16)]
+    real_import = builtins.__import__
+
+    def no_numpy(name, *args, **kwargs):
+        if name == "numpy":
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_numpy)
+    assert _minhash_signatures(sets, 16) == fast
+
+
+def _article(seed: int, n: int = 80) -> str:
+    import random
+
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "delta", "kernel", "socket", "thread", "buffer", "cache"]
+    return " ".join(rng.choice(words) + str(rng.randint(0, 50)) for _ in range(n))
+
+
+def test_content_duplicates_match_mirrored_pages(tmp_path):
+    from cbclean.storage import Storage
+
+    text = _article(1)
+    items = [
+        Bookmark(id="1", title="Guide", url="https://a.example/guide", folder_path="Dev"),
+        Bookmark(id="2", title="Mirror", url="https://mirror.example/g", folder_path="Read"),
+        Bookmark(id="3", title="Other", url="https://b.example/other", folder_path="Dev"),
+        Bookmark(id="4", title="Login", url="https://c.example/login", folder_path="Dev"),
+        Bookmark(id="5", title="Login", url="https://d.example/login", folder_path="Read"),
+    ]
+    items[0].content_snippet = text
+    items[1].content_snippet = text + " footer"
+    items[2].content_snippet = _article(2)
+    # Too short to fingerprint: identical login walls must not merge
+    items[3].content_snippet = items[4].content_snippet = "Please sign in to continue"
+
+    kw = dict(title_threshold=0.9, prefer_shorter_url=True, content_threshold=0.9)
+    assert group_duplicates(items, title_threshold=0.9, prefer_shorter_url=True) == []
+    with Storage(tmp_path / "cache.sqlite") as st:
+        groups = group_duplicates(items, storage=st, **kw)
+        assert len(st.get_fingerprints(["https://a.example/guide"])) == 1
+        # Second run reuses the stored fingerprints
+        assert group_duplicates(items, storage=st, **kw) == groups
+    assert [sorted(x.id for x in g.members) for g in groups] == [["1", "2"]]
+    assert groups[0].reasons == {"content"}
+
+
+def test_content_dedup_fetches_one_page_per_group(tmp_path):
+    from cbclean.storage import Storage
+
+    pages = {"https://a.example/x": _article(1), "https://m.example/x": _article(1) + " end"}
+    items = [
+        Bookmark(id="1", title="Guide", url="https://a.example/x", folder_path="Dev"),
+        Bookmark(id="2", title="Guide", url="https://a.example/x?utm=1", folder_path="Dev"),
+        Bookmark(id="3", title="Mirror", url="https://m.example/x", folder_path="Read"),
+    ]
+    for b in items:
+        b.normalized_url = b.url.split("?")[0]
+    fetched = []
+
+    def fetch(batch):
+        fetched.extend(b.id for b in batch)
+        for b in batch:
+            b.content_snippet = pages[b.normalized_url]
+
+    with Storage(tmp_path / "cache.sqlite") as st:
+        groups = group_duplicates(
+            items,
+            title_threshold=0.9,
+            prefer_shorter_url=True,
+            content_threshold=0.9,
+            storage=st,
+            fetch_content=fetch,
+        )
+    # Bookmark 2 duplicates 1 by URL: its page is not downloaded
+    assert fetched == ["1", "3"]
+    assert [sorted(x.id for x in g.members) for g in groups] == [["1", "2", "3"]]
+
+
+def test_content_fingerprints_prefer_fresh_over_stored(tmp_path):
+    from cbclean.dedup import content_fingerprints, simhash
+    from cbclean.storage import Storage
+
+    b = Bookmark(id="1", title="t", url="https://a.example/")
+    b.content_snippet = _article(3)
+    with Storage(tmp_path / "cache.sqlite") as st:
+        content_fingerprints([b], [b.url], st)
+        twin = Bookmark(id="2", title="t", url="https://a.example/")
+        twin.content_snippet = _article(4)
+        # The page changed since it was stored; both copies share the URL key
+        fps = content_fingerprints([twin, b], [b.url, b.url], st)
+    assert fps == {0: simhash(_article(4)), 1: simhash(_article(3))}
+
+
+def test_group_duplicates_semantic_edges():
+    np = pytest.importorskip("numpy")
+    from cbclean.ann import AnnIndex
+
+    bms = [
+        Bookmark(id="1", title="Intro to asyncio", url="https://a.com/asyncio", folder_path="A"),
+        Bookmark(id="2", title="Asyncio tutorial", url="https://b.com/async", folder_path="B"),
+        Bookmark(id="3", title="Sourdough bread", url="https://c.com/bread", folder_path="C"),
+    ]
+    vecs = np.array([[1.0, 0.0], [0.99, 0.14], [0.0, 1.0]], dtype=np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    index = AnnIndex(2)
+    index.add(["k1", "k2", "k3"], vecs)
+    common = dict(title_threshold=0.95, prefer_shorter_url=False, ann=index)
+    common["ann_keys"] = ["k1", "k2", "k3"]
+    assert group_duplicates(bms, **common) == []
+    (group,) = group_duplicates(bms, semantic_threshold=0.95, **common)
+    assert [b.id for b in group.members] == ["1", "2"]
+    assert group.reasons == {"semantic"}
+
+
+def test_cross_folder_compares_all_pairs_of_large_buckets(monkeypatch):
+    from cbclean import dedup
+
+    # Every bookmark lands in one LSH bucket, its first member the odd one out
+    monkeypatch.setattr(dedup, "_band_keys", lambda sigs, start, rows: [0] * len(sigs))
+    words = "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo".split()
+    items = [
+        Bookmark(id=str(i), title=f"{w} notes", url=f"https://{w}.example/", folder_path=w)
+        for i, w in enumerate(words)
+    ]
+    items[1].title, items[1].url = "Deep dive into Postgres indexes", "https://db.example/indexes"
+    items[9].title, items[9].url = "Deep dive into Postgres indexes!", "https://db.example/indexes/"
+    groups = group_duplicates(
+        items, title_threshold=0.9, prefer_shorter_url=True, cross_folder=True, bands=1
+    )
+    assert [sorted(x.id for x in g.members) for g in groups] == [["1", "9"]]
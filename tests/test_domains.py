@@ -0,0 +1,52 @@
+import os
+from pathlib import Path
+
+from cbclean.domains import (
+    DomainIndex,
+    MappedDomainIndex,
+    compile_domain_index,
+    open_domain_index,
+)
+
+
+def test_longest_suffix_wins_and_port_is_ignored():
+    idx = DomainIndex({"github.com": ["Dev"], "gist.github.com": ["Snippets"], "*.ru": ["RU"]})
+    assert idx.match_url("https://GIST.github.com:8443/x") == ["Snippets"]
+    assert idx.match_url("https://docs.github.com/") == ["Dev"]
+    assert idx.match_url("http://user@habr.ru./post") == ["RU"]
+    assert idx.match_url("https://notgithub.com/") is None
+    assert idx.match_url("not a url") is None
+
+
+def test_compiled_index_matches_in_memory(tmp_path: Path):
+    mapping = {f"site{i}.example.org": [f"T{i % 7}"] for i in range(500)}
+    mapping.update({"example.org": ["Org"], "пример.рф": ["RU"]})
+    path = tmp_path / "domains.idx"
+    # Repeated domains merge their tags
+    entries = list(mapping.items()) + [("example.org", ["Org", "Extra"])]
+    assert compile_domain_index(entries, path) == len(mapping)
+    mem = DomainIndex({**mapping, "example.org": ["Org", "Extra"]})
+    with MappedDomainIndex(path) as idx:
+        assert len(idx) == len(mapping)
+        for host in ["a.site3.example.org", "site499.example.org", "x.example.org", "пример.рф"]:
+            assert idx.lookup(host) == mem.lookup(host)
+        assert idx.lookup("example.com") is None
+
+
+def test_open_domain_index_recompiles_stale_feed(tmp_path: Path):
+    feed = tmp_path / "feed.tsv"
+    feed.write_text("# category feed\nads.example\tAds\nnews.example,News,Daily\n", "utf-8")
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    with open_domain_index(feed, cache) as idx:
+        assert idx.lookup("cdn.ads.example") == ["Ads"]
+        assert idx.lookup("news.example") == ["News", "Daily"]
+        compiled = idx.path
+    feed.write_text("ads.example\tTracking\n", "utf-8")
+    os.utime(feed, (compiled.stat().st_mtime + 10,) * 2)
+    with open_domain_index(feed, cache) as idx:
+        assert idx.lookup("ads.example") == ["Tracking"]
+        assert idx.lookup("news.example") is None
+    # A compiled file is mapped directly
+    with open_domain_index(compiled, tmp_path) as idx:
+        assert idx.path == compiled
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import pytest
+
+from cbclean.storage import Storage
+
+np = pytest.importorskip("numpy")
+
+from cbclean.embed_cache import EmbeddingCache, index_directory  # noqa: E402
+
+
+class FakeEncoder:
+    def __init__(self, dim: int = 4) -> None:
+        self.dim = dim
+        self.seen: list = []
+
+    def __call__(self, texts):
+        self.seen.append(list(texts))
+        return np.array([[len(t) + k for k in range(self.dim)] for t in texts], dtype=np.float32)
+
+
+def test_embedding_cache_encodes_only_misses(tmp_path: Path):
+    enc = FakeEncoder()
+    with Storage(tmp_path / "cache.sqlite") as st:
+        cache = EmbeddingCache(st, tmp_path / "emb")
+        first = cache.encode("m", ["a", "bb", "a"], enc)
+        assert enc.seen == [["a", "bb"]]
+        assert first.shape == (3, 4) and first[0].tolist() == first[2].tolist() == [1, 2, 3, 4]
+    with Storage(tmp_path / "cache.sqlite") as st:
+        cache = EmbeddingCache(st, tmp_path / "emb")
+        again = cache.encode("m", ["bb", "ccc", "a"], enc)
+    assert enc.seen[1:] == [["ccc"]]
+    assert again.tolist() == [first[1].tolist(), [3, 4, 5, 6], first[0].tolist()]
+
+
+def test_embedding_cache_evicts_old_models_and_survives_dim_change(tmp_path: Path):
+    with Storage(tmp_path / "cache.sqlite") as st:
+        ann = tmp_path / "ann"
+        cache = EmbeddingCache(st, tmp_path / "emb", max_models=1, index_root=ann)
+        cache.encode("old", ["a"], FakeEncoder())
+        index_directory(ann, "old").mkdir(parents=True)
+        (index_directory(ann, "old") / "meta.json").write_text("{}")
+        cache.encode("new", ["a"], FakeEncoder())
+        assert [m for m, _, _ in st.embedding_models()] == ["new"]
+        assert len(list((tmp_path / "emb").iterdir())) == 1
+        # The evicted model's ANN index goes with its vectors
+        assert not index_directory(ann, "old").exists()
+
+        # Same model name, different vector size: cached rows are discarded
+        enc = FakeEncoder(dim=2)
+        out = cache.encode("new", ["a", "b"], enc)
+        assert out.shape == (2, 2)
+        assert enc.seen == [["b"], ["a", "b"]]
@@ -1,4 +1,10 @@
-from cbclean.fetch import check_liveness, extract_text_from_html
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cbclean.fetch import check_liveness, enrich_with_content, extract_text_from_html, fetch_texts
 from cbclean.utils import Bookmark
 
 
@@ -21,3 +27,100 @@ def test_extract_text_from_html_basic():
     """
     text = extract_text_from_html(html, max_chars=50)
     assert "Header" in text and "Hello world" in text
+
+
+class _Pages(BaseHTTPRequestHandler):
+    """/big: endless paragraphs; /n/<i>: small page; /cp1251: charset in <meta>
+    only, sent after the rest of the head; /missing: 404."""
+
+    lock = threading.Lock()
+    live = [0, 0]  # in flight, peak
+    big_sent = [0]
+
+    def do_GET(self):  # noqa: N802
+        with self.lock:
+            self.live[0] += 1
+            self.live[1] = max(self.live[1], self.live[0])
+        try:
+            if self.path == "/missing":
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            if self.path == "/cp1251":
+                self.send_header("Content-Type", "text/html")
+                self.end_headers()
+                # The start of the head arrives on its own, before the <meta>
+                self.wfile.write(b"<!doctype html><html><head>")
+                self.wfile.flush()
+                time.sleep(0.05)
+                page = '<meta charset="windows-1251"><title>Закладки</title>Привет'
+                self.wfile.write(page.encode("cp1251"))
+                return
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.end_headers()
+            if self.path == "/big":
+                para = ("<p>" + "lorem ipsum " * 50 + "</p>\n").encode()
+                try:
+                    for _ in range(40000):  # ~24 MB
+                        self.wfile.write(para)
+                        self.big_sent[0] += len(para)
+                except OSError:
+                    pass  # client stopped reading
+                return
+            time.sleep(0.01)
+            i = self.path.rsplit("/", 1)[1]
+            self.wfile.write(f"<title>Page {i}</title><script>x()</script>Body {i}".encode())
+        finally:
+            with self.lock:
+                self.live[0] -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def pages():
+    pytest.importorskip("aiohttp")
+    _Pages.live[:] = [0, 0]
+    _Pages.big_sent[0] = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Pages)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_texts_bounded_workers_and_streamed_results(pages):
+    seen = []
+
+    def urls():
+        for i in range(60):
+            # Inputs are pulled lazily, a few ahead of the workers
+            assert i - len(seen) <= 3 * 4 + 1
+            yield i, f"{pages}/n/{i}"
+        yield "gone", f"{pages}/missing"
+
+    fetch_texts(urls(), lambda key, text: seen.append((key, text)), concurrent=4)
+    assert sorted(seen, key=lambda kv: str(kv[0])) == sorted(
+        ((i, f"Page {i} Body {i}") for i in range(60)), key=lambda kv: str(kv[0])
+    )
+    assert _Pages.live[1] <= 4
+
+
+def test_enrich_with_content_stops_reading_long_pages(pages):
+    items = [Bookmark(id="1", title="t", url=f"{pages}/big")]
+    enrich_with_content(
+        items, enabled=True, timeout_sec=10, concurrent=2, user_agent="t", max_chars=500
+    )
+    assert len(items[0].content_snippet) == 500
+    assert items[0].content_snippet.startswith("lorem ipsum")
+    time.sleep(0.2)
+    assert _Pages.big_sent[0] < 8 * 2**20
+
+
+def test_fetch_texts_uses_meta_charset_without_header_charset(pages):
+    seen = []
+    fetch_texts([("ru", f"{pages}/cp1251")], lambda key, text: seen.append(text))
+    assert seen == ["Закладки Привет"]
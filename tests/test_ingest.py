@@ -0,0 +1,46 @@
+import shutil
+from pathlib import Path
+
+from cbclean.ingest import discover_profiles, iter_profiles, load_profiles
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data/samples/bookmarks.sample.json"
+
+
+def _make_profiles(root: Path) -> None:
+    for name in ("Profile 2", "Default", "Profile 1"):
+        (root / name).mkdir()
+        shutil.copy(SAMPLE, root / name / "Bookmarks")
+    (root / "System Profile").mkdir()  # no Bookmarks file: ignored
+
+
+def test_discover_profiles_sorted(tmp_path: Path):
+    _make_profiles(tmp_path)
+    paths = discover_profiles(str(tmp_path / "*" / "Bookmarks"))
+    assert [p.parent.name for p in paths] == ["Default", "Profile 1", "Profile 2"]
+
+
+def test_parallel_ingestion_is_deterministic_and_tagged(tmp_path: Path):
+    _make_profiles(tmp_path)
+    pattern = str(tmp_path / "*" / "Bookmarks")
+    backups = tmp_path / "backups"
+    parallel = load_profiles(pattern, backup_dir=backups, workers=3)
+    serial = list(iter_profiles(discover_profiles(pattern), workers=1))
+    key = [(b.profile, b.id, b.url, b.folder_path) for b in parallel]
+    assert key == [(b.profile, b.id, b.url, b.folder_path) for b in serial]
+    profiles = [b.profile for b in parallel]
+    assert profiles == sorted(profiles) and set(profiles) == {"Default", "Profile 1", "Profile 2"}
+    # One backup per profile, no name collisions between profiles
+    assert sorted(p.parent.name for p in backups.glob("*/backup-*")) == [
+        "Default",
+        "Profile 1",
+        "Profile 2",
+    ]
+
+
+def test_merged_profiles_have_unique_ids(tmp_path: Path):
+    _make_profiles(tmp_path)
+    items = load_profiles(str(tmp_path / "*" / "Bookmarks"), workers=1)
+    ids = [b.id for b in items]
+    # Every profile is a copy of the sample, so the raw Chrome ids all overlap
+    assert len(set(ids)) == len(ids)
+    assert all(b.id.startswith(f"{b.profile}:") for b in items)
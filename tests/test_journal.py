@@ -0,0 +1,42 @@
+from cbclean.journal import Journal, read_journal
+
+HEADER = {"model": "m", "labels": "abc"}
+
+
+def test_journal_resumes_after_torn_tail(tmp_path):
+    path = tmp_path / "j.jsonl"
+    with Journal(path, HEADER) as j:
+        j.append({"k": 0})
+        j.append({"k": 1})
+    # A crash in the middle of a write leaves half a line
+    with open(path, "ab") as fh:
+        fh.write(b'{"k": 2, "ite')
+    assert read_journal(path, HEADER) == [{"k": 0}, {"k": 1}]
+    with Journal(path, HEADER, append=True) as j:
+        assert j.records == [{"k": 0}, {"k": 1}]
+        j.append({"k": 3})
+    assert read_journal(path, HEADER) == [{"k": 0}, {"k": 1}, {"k": 3}]
+    # Another run's journal is not replayed, and a fresh one replaces it
+    assert read_journal(path, {"model": "other", "labels": "abc"}) == []
+    with Journal(path, {"model": "other", "labels": "abc"}, append=True) as j:
+        assert j.records == []
+    assert read_journal(path, HEADER) == []
+    assert read_journal(tmp_path / "missing.jsonl", HEADER) == []
+
+
+def test_journal_batches_fsync(tmp_path, monkeypatch):
+    import cbclean.journal as journal
+
+    syncs = []
+    monkeypatch.setattr(journal.os, "fsync", lambda fd: syncs.append(fd))
+    now = [0.0]
+    with Journal(tmp_path / "j.jsonl", HEADER, sync_every=4, clock=lambda: now[0]) as j:
+        for k in range(10):
+            j.append({"k": k})
+        assert len(syncs) == 2
+        now[0] = 5.0
+        j.append({"k": 10})
+        assert len(syncs) == 3
+        j.append({"k": 11})
+    # Close syncs what is pending
+    assert len(syncs) == 4
@@ -0,0 +1,226 @@
+import json
+import random
+import re
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cbclean.classify_llm import classify_by_llm
+from cbclean.llm_dispatch import RetryPolicy, TokenBucket, dispatch, is_retryable
+from cbclean.utils import Bookmark
+
+
+class HttpError(Exception):
+    def __init__(self, status_code):
+        super().__init__(status_code)
+        self.status_code = status_code
+
+
+def test_token_bucket_waits_for_refill():
+    now = [0.0]
+    bucket = TokenBucket(60, clock=lambda: now[0])  # 1 unit per second
+    assert bucket.wait_time(60) == 0
+    bucket.take(60)
+    assert bucket.wait_time(3) == pytest.approx(3)
+    now[0] = 2.0
+    assert bucket.wait_time(3) == pytest.approx(1)
+    # Larger than the bucket: waits for a full bucket, then goes into debt
+    now[0] = 100.0
+    assert bucket.wait_time(500) == 0
+    bucket.take(500)
+    assert bucket.wait_time(1) == pytest.approx(441)
+    assert TokenBucket(0).wait_time(10**9) == 0
+
+
+def test_dispatch_overlaps_batches_and_finishes_in_order():
+    lock = threading.Lock()
+    live = [0, 0]  # current, peak
+
+    def send(k):
+        with lock:
+            live[0] += 1
+            live[1] = max(live[1], live[0])
+        time.sleep(0.05 * (1 + k % 3))
+        with lock:
+            live[0] -= 1
+        return f"r{k}"
+
+    finished = []
+    t0 = time.perf_counter()
+    dispatch(12, lambda k: (k, 1), send, lambda k, r: finished.append((k, r)), concurrency=4)
+    assert finished == [(k, f"r{k}") for k in range(12)]
+    assert live[1] == 4
+    assert time.perf_counter() - t0 < 0.6 * 12 * 0.1
+
+
+def test_dispatch_ordered_prepares_after_window():
+    finished = []
+
+    def prepare(k):
+        # Batch k starts only after k - concurrency was merged
+        assert len(finished) >= k - 1
+        return k, 1
+
+    def send(k):
+        time.sleep(random.uniform(0, 0.02))
+        return k
+
+    dispatch(10, prepare, send, lambda k, r: finished.append(k), concurrency=2, ordered=True)
+    assert finished == list(range(10))
+
+
+def test_dispatch_retries_rate_limits_and_server_errors():
+    calls = {}
+
+    def send(k):
+        calls[k] = calls.get(k, 0) + 1
+        if calls[k] == 1:
+            raise HttpError(429 if k % 2 else 503)
+        return k
+
+    out = []
+    retry = RetryPolicy(retries=2, base_delay=0.01)
+    dispatch(4, lambda k: (k, 1), send, lambda k, r: out.append(r), concurrency=2, retry=retry)
+    assert out == [0, 1, 2, 3] and calls == {0: 2, 1: 2, 2: 2, 3: 2}
+
+
+def test_dispatch_raises_client_errors_without_retry():
+    calls = []
+
+    def send(k):
+        calls.append(k)
+        raise HttpError(400)
+
+    with pytest.raises(HttpError):
+        dispatch(1, lambda k: (k, 1), send, lambda k, r: None, retry=RetryPolicy(base_delay=0))
+    assert calls == [0]
+    assert is_retryable(ConnectionResetError()) and not is_retryable(ValueError())
+
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """POST /v1/chat/completions: 429 on a prompt's first try, else labels by keyword."""
+
+    requests = 0
+    seen: set = set()
+    lock = threading.Lock()
+
+    def do_POST(self):  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        with self.lock:
+            type(self).requests += 1
+            throttle = prompt not in self.seen
+            self.seen.add(prompt)
+        if throttle:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        items = re.findall(r"^- \[(\d+)\] (.*)$", prompt, flags=re.M)
+        assignments = [
+            {"index": int(i), "labels": ["Dev" if "git" in line.lower() else "Docs"]}
+            for i, line in items
+        ]
+        content = json.dumps({"assignments": assignments, "new_labels": []})
+        reply = {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+        data = json.dumps(reply).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openai():
+    FakeOpenAI.requests = 0
+    FakeOpenAI.seen = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAI)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+class UrllibClient:
+    """Minimal chat-completions client: client(model, prompt) -> content."""
+
+    def __init__(self, base):
+        self.base = base
+
+    def __call__(self, model, prompt):
+        body = {"model": model, "messages": [{"role": "user", "content": prompt}]}
+        req = urllib.request.Request(
+            f"{self.base}/chat/completions",
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req) as resp:  # HTTPError carries .code
+            return json.loads(resp.read())["choices"][0]["message"]["content"]
+
+
+def _bookmarks(n):
+    return [
+        Bookmark(id=str(i), title=f"{'GitHub' if i % 2 else 'Manual'} {i}", url=f"https://x/{i}")
+        for i in range(n)
+    ]
+
+
+def test_classify_llm_against_fake_server(fake_openai):
+    items = _bookmarks(20)
+    classify_by_llm(
+        items,
+        labels=["Dev", "Docs"],
+        batch_size=3,
+        only_uncertain=False,
+        allow_new_labels=False,
+        client=UrllibClient(fake_openai),
+        concurrency=4,
+    )
+    assert [b.tags for b in items] == [["Dev"] if i % 2 else ["Docs"] for i in range(20)]
+    # Each batch was throttled once and retried
+    assert FakeOpenAI.requests == 2 * 7
+
+
+def test_classify_llm_openai_sdk_against_fake_server(fake_openai):
+    openai = pytest.importorskip("openai")
+    items = _bookmarks(6)
+    client = openai.OpenAI(api_key="sk-test", base_url=fake_openai, max_retries=0)
+    classify_by_llm(
+        items, labels=["Dev", "Docs"], batch_size=2, only_uncertain=False, client=client
+    )
+    assert items[1].tags == ["Dev"] and items[2].tags == ["Docs"]
+
+
+def test_classify_llm_new_labels_do_not_depend_on_timing():
+    def run(seed):
+        rng = random.Random(seed)
+        prompts = {}
+
+        def client(model, prompt):
+            time.sleep(rng.uniform(0, 0.02))
+            k = int(re.search(r"\] Item (\d+)", prompt).group(1)) // 2
+            prompts[k] = re.search(r"Allowed labels: \[(.*)\]", prompt).group(1)
+            return json.dumps(
+                {
+                    "assignments": [{"index": 0, "labels": [f"Topic{k}"]}],
+                    "new_labels": [f"Topic{k}"],
+                }
+            )
+
+        items = [Bookmark(id=str(i), title=f"Item {i}", url=f"https://x/{i}") for i in range(12)]
+        classify_by_llm(items, labels=["Base"], batch_size=2, client=client, concurrency=3)
+        return prompts, [b.tags for b in items]
+
+    prompts, tags = run(1)
+    assert (prompts, tags) == run(2)
+    # Batch 5 sees the labels of batches 0..2 only
+    assert prompts[5] == "Base, Topic0, Topic1, Topic2"
+    assert tags[0] == ["Topic0"] and tags[10] == ["Topic5"]
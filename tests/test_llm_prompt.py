@@ -0,0 +1,65 @@
+import json
+import re
+
+from cbclean.classify_llm import classify_by_llm
+from cbclean.llm_prompt import build_compact_prompt, compact_system, factor_hosts, trim_snippet
+from cbclean.utils import Bookmark
+
+
+def test_trim_snippet_keeps_informative_sentences_in_order():
+    text = (
+        "Accept cookies to continue. Skip to content. "
+        "Tokio is an asynchronous runtime for the Rust programming language. "
+        "Sign in. "
+        "It provides the building blocks needed for writing network applications. "
+        "Sign in."
+    )
+    out = trim_snippet(text, 150, title="Tokio")
+    assert out == (
+        "Tokio is an asynchronous runtime for the Rust programming language. "
+        "It provides the building blocks needed for writing network applications."
+    )
+    assert trim_snippet("short text", 100) == "short text"
+    # A single overlong sentence is cut at a word boundary
+    assert trim_snippet("alpha beta gamma delta epsilon", 12) == "alpha beta"
+
+
+def test_factor_hosts_aliases_repeated_hosts_only():
+    urls, legend = factor_hosts(
+        ["https://www.github.com/a/b", "https://github.com/c/", "http://docs.python.org/3/", "x:y"]
+    )
+    assert legend == {"github.com": 1}
+    assert urls == ["~1/a/b", "~1/c", "docs.python.org/3", "x:y"]
+
+
+def test_compact_prompt_keeps_labels_in_a_shared_system_message():
+    items = [
+        Bookmark(id="1", title="Repo", url="https://github.com/a/b"),
+        Bookmark(id="2", title="Other", url="https://github.com/c/d", content_snippet="x " * 10),
+    ]
+    system = compact_system(["Dev", "Docs"], allow_new_labels=False)
+    assert "[Dev, Docs]" in system and "invent" not in system
+    prompt = build_compact_prompt(items, ["Learned"], snippet_chars=100)
+    assert prompt.splitlines() == [
+        "Also allowed: [Learned]",
+        "Hosts: ~1=github.com",
+        "[0] Repo | ~1/a/b",
+        "[1] Other | ~1/c/d",
+        "  > " + "x " * 9 + "x",
+    ]
+
+
+def test_classify_llm_compact_prompt_round_trip():
+    seen = []
+
+    def client(model, prompt):
+        seen.append(prompt)
+        idxs = [int(i) for i in re.findall(r"^\[(\d+)\]", prompt, flags=re.M)]
+        return json.dumps({"assignments": [{"index": i, "labels": ["Dev"]} for i in idxs]})
+
+    items = [Bookmark(id=str(i), title=f"T{i}", url=f"https://ex.com/{i}") for i in range(5)]
+    classify_by_llm(items, labels=["Dev"], batch_size=2, client=client, compact_prompt=True)
+    assert all(b.tags == ["Dev"] for b in items)
+    # Callable clients get the system prefix in front of every prompt
+    prefix = seen[0].split("\n\n", 1)[0]
+    assert len(seen) == 3 and all(p.startswith(prefix + "\n\n") for p in seen)
@@ -0,0 +1,60 @@
+import json
+import random
+
+from cbclean.llm_dispatch import is_retryable
+from cbclean.llm_reply import ReplyParser, TruncatedReplyError, parse_reply
+
+REPLY = json.dumps(
+    {
+        "assignments": [
+            {"index": 0, "labels": ["Dev", "Code"]},
+            {"index": 1, "labels": ["Docs {draft]"]},
+            {"index": 2, "labels": ['He said "hi" \\ bye']},
+        ],
+        "new_labels": ["Docs {draft]"],
+        "note": "[not assignments]",
+    }
+)
+
+
+def test_reply_parser_matches_json_for_any_chunking():
+    rng = random.Random(0)
+    expected = json.loads(REPLY)
+    for _ in range(50):
+        parser = ReplyParser()
+        pos = 0
+        while pos < len(REPLY):
+            step = rng.randint(1, 7)
+            parser.feed(REPLY[pos : pos + step])
+            pos += step
+        assert parser.complete
+        assert parser.assignments == expected["assignments"]
+        assert parser.new_labels == expected["new_labels"]
+
+
+def test_reply_parser_yields_assignments_as_they_close():
+    parser = ReplyParser()
+    assert parser.feed('Sure!\n```json\n{"assignments": [{"index": 0, "labels": ["A"]}') == [
+        {"index": 0, "labels": ["A"]}
+    ]
+    assert parser.feed(', {"index": 1, "labels": ["B"') == []
+    assert parser.feed("]}") == [{"index": 1, "labels": ["B"]}]
+    assert not parser.complete
+
+
+def test_reply_parser_salvages_truncated_and_bare_lists():
+    cut = parse_reply(REPLY[: REPLY.index('{"index": 2')] + '{"index": 2, "lab')
+    assert not cut.complete and [a["index"] for a in cut.assignments] == [0, 1]
+    assert cut.new_labels == []
+    bare = parse_reply('[{"index": 0, "labels": ["X"]}, {"index": 1, "labels": []}]')
+    assert bare.complete and len(bare.assignments) == 2
+    assert parse_reply("{}").assignments == [] and parse_reply("no json").assignments == []
+
+
+def test_reply_parser_skips_brackets_in_leading_prose():
+    prose = parse_reply('Here are [the] labels: {"assignments": [{"index": 0, "labels": ["A"]}]}')
+    assert prose.complete and prose.assignments == [{"index": 0, "labels": ["A"]}]
+    fenced = parse_reply('Result:\n```json\n[{"index": 0, "labels": ["B"]}]\n```')
+    assert fenced.complete and fenced.assignments == [{"index": 0, "labels": ["B"]}]
+    assert not parse_reply("See [1] and [2].").complete
+    assert is_retryable(TruncatedReplyError("cut off"))
@@ -12,3 +12,32 @@ def test_normalize_bookmarks_skips_missing_url():
     b = [Bookmark(id="1", title="t", url=None)]
     normalize_bookmarks(b, strip_params=["utm_*"], strip_fragments=True, strip_www=True)
     assert b[0].normalized_url is None
+
+
+def test_url_normalizer_matches_normalize_url():
+    import random
+
+    from cbclean.normalize import UrlNormalizer
+    from cbclean.utils import normalize_url
+
+    patterns = ["utm_*", "gclid", "ref", "ref_src", "x*", "*"]
+    keys = ["utm_source", "utm", "gclid", "gclidx", "ref", "ref_src", "refs", "id", "x", "", "xy"]
+    rng = random.Random(0)
+    for _ in range(300):
+        pats = rng.sample(patterns, rng.randint(0, 3))
+        query = "&".join(f"{k}=1" if rng.random() < 0.8 else k for k in rng.sample(keys, 4))
+        url = f"HTTPS://www.ex.com//a/{rng.randint(0, 3)}?{query}&#frag"
+        flags = dict(strip_fragments=rng.random() < 0.5)
+        n = UrlNormalizer(strip_params=pats, strip_www=True, **flags)
+        expected = normalize_url(url, strip_params=pats, strip_www_flag=True, **flags)
+        assert n.normalize_many([url, None]) == [expected, None]
+
+
+def test_url_normalizer_caches_repeated_urls():
+    from cbclean.config import NormalizeCfg
+    from cbclean.normalize import UrlNormalizer
+
+    n = UrlNormalizer.from_config(NormalizeCfg(), cache_size=2)
+    n.normalize_many(["https://a/?utm_x=1"] * 3 + ["https://b/", "https://c/"])
+    info = n.normalize.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 3, 2)
@@ -0,0 +1,48 @@
+from cbclean.propagate import classify_by_groups, group_key
+from cbclean.utils import Bookmark
+
+
+def _bm(i, url, title):
+    return Bookmark(id=str(i), title=title, url=url)
+
+
+def test_group_key_uses_host_and_path_directories():
+    b = _bm(0, "https://www.docs.python.org/3/library/os.html", "os")
+    assert group_key(b) == "docs.python.org/3/library"
+    assert group_key(b, depth=1) == "docs.python.org/3"
+    assert group_key(_bm(1, "https://github.com/user/repo", "x")) == "github.com/user"
+    assert group_key(_bm(2, "not a url", "x")) == ""
+
+
+def test_classify_by_groups_samples_sections_and_rechecks_outliers():
+    items = [
+        _bm(i, f"https://docs.python.org/3/library/m{i}.html", f"m{i} — Python documentation")
+        for i in range(20)
+    ]
+    items.append(_bm(20, "https://docs.python.org/3/library/zz.html", "Page not found"))
+    # Same host and section, but the sample disagrees: nothing propagated
+    items += [_bm(30 + i, f"https://youtube.com/watch{i}", f"Video {i}") for i in range(8)]
+    items += [_bm(40, "https://small.example/a/b", "Lonely")]
+    calls = []
+
+    def classify(batch):
+        calls.append([b.id for b in batch])
+        for b in batch:
+            if "python" in b.url:
+                b.tags = ["Python"]
+            elif "youtube" in b.url:
+                b.tags = [f"Topic{b.id}"]
+
+    counts = classify_by_groups(items, classify, sample=3)
+    assert counts == {"groups": 1, "sampled": 6, "propagated": 17, "rechecked": 1}
+    assert len(calls) == 2
+    # First call: two samples of three plus the small group
+    assert len(calls[0]) == 7 and "40" in calls[0]
+    # Second call: the disagreeing section's rest and the outlier
+    assert sorted(calls[1], key=int) == ["20"] + [
+        str(30 + i) for i in range(8) if str(30 + i) not in calls[0]
+    ]
+    assert all(b.tags == ["Python"] for b in items[:21])
+    # Propagated labels are scored with the share of the sample that agreed
+    assert sum(b.tag_scores == {"Python": 1.0} for b in items[:21]) == 17
+    assert all(b.tags == [f"Topic{b.id}"] for b in items[21:29])
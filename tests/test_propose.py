@@ -21,3 +21,13 @@ def test_propose_includes_duplicates_and_normalized_updates():
     actions = [p.action for p in plan]
     assert "move_to/_Trash" in actions
     assert "update_url" in actions
+
+
+def test_propose_points_duplicates_at_group_survivor():
+    from cbclean.dedup import DuplicateGroup
+
+    keep = Bookmark(id="1", title="A", url="https://ex.com/a")
+    dup = Bookmark(id="2", title="A", url="https://ex.com/a")
+    group = DuplicateGroup(survivor=keep, duplicates=[dup], reasons={"url"})
+    plan = propose_changes([keep, dup], [keep], [dup], groups=[group])
+    assert [(p.action, p.bookmark_id, p.target_id) for p in plan] == [("move_to/_Trash", "2", "1")]
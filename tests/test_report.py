@@ -17,3 +17,42 @@ def test_render_reports_creates_files(tmp_path: Path):
     )
     assert (tmp_path / "report.html").exists()
     assert (tmp_path / "report.md").exists()
+
+
+def test_render_reports_lists_duplicate_groups(tmp_path: Path):
+    from cbclean.dedup import DuplicateGroup
+
+    keep = Bookmark(id="1", title="Python Docs", url="https://docs.python.org/")
+    dup = Bookmark(id="2", title="python docs", url="https://docs.python.org/3/")
+    render_reports(
+        bookmarks=[keep],
+        duplicates=[dup],
+        plan=[],
+        out_dir=tmp_path,
+        formats=["md"],
+        templates_dir=Path("templates"),
+        groups=[DuplicateGroup(survivor=keep, duplicates=[dup], reasons={"title"})],
+    )
+    md = (tmp_path / "report.md").read_text(encoding="utf-8")
+    assert "## Duplicate Groups" in md
+    assert "| 1 | Python Docs | https://docs.python.org/ | 2 | title | 2 |" in md
+
+
+def test_render_reports_lists_related_bookmarks(tmp_path: Path):
+    a = Bookmark(id="1", title="NumPy", url="https://numpy.org/")
+    b = Bookmark(id="2", title="SciPy", url="https://scipy.org/")
+    render_reports(
+        bookmarks=[a, b],
+        duplicates=[],
+        plan=[],
+        out_dir=tmp_path,
+        formats=["html", "md"],
+        templates_dir=Path("templates"),
+        related={"1": [(b, 0.8123)]},
+    )
+    md = (tmp_path / "report.md").read_text(encoding="utf-8")
+    assert "## Related Bookmarks" in md
+    assert "| 1 | NumPy | SciPy (2, 0.81) |" in md
+    assert '<a href="https://scipy.org/">SciPy</a>' in (tmp_path / "report.html").read_text(
+        encoding="utf-8"
+    )
@@ -11,3 +11,22 @@ def test_storage_initializes_table(tmp_path: Path):
         )
         row = cur.fetchone()
         assert row and row[0] == "fetch_cache"
+
+
+def test_storage_fingerprints_roundtrip_unsigned(tmp_path: Path):
+    with Storage(tmp_path / "cache.sqlite") as st:
+        st.put_fingerprints([("https://a/", "h1", (1 << 64) - 1), ("https://b/", "h2", 5)])
+        got = st.get_fingerprints(["https://a/", "https://b/", "https://c/"])
+    assert got == {"https://a/": ("h1", (1 << 64) - 1), "https://b/": ("h2", 5)}
+
+
+def test_storage_llm_labels_prune(tmp_path: Path):
+    with Storage(tmp_path / "c.sqlite") as st:
+        st.put_llm_labels("m", "set1", [("u1", "t1", ["Dev"]), ("u2", "t2", [])], 100.0)
+        st.put_llm_labels("m", "set2", [("u3", "t3", ["News"])], 200.0)
+        keys = [("u1", "t1"), ("u2", "t2"), ("u2", "other")]
+        assert st.get_llm_labels("m", "set1", keys) == {("u1", "t1"): ["Dev"], ("u2", "t2"): []}
+        assert st.get_llm_labels("other-model", "set1", keys) == {}
+        # Expired and other-label-set rows go
+        assert st.prune_llm_labels("m", "set2", before=150.0) == 2
+        assert st.get_llm_labels("m", "set2", [("u3", "t3")]) == {("u3", "t3"): ["News"]}